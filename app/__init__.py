@@ -313,6 +313,40 @@ def create_app(config_name=None):
         except Exception as e:
             app.logger.error(f"Database initialization error: {e}")
     
+    # Warm the in-memory driver location index from DriverLocation
+    try:
+        from app.services.geo_index import init_driver_index
+        init_driver_index(app)
+    except Exception as e:
+        app.logger.warning(f"Could not build driver location index: {e}")
+    
+    # Start the write-behind flusher for driver GPS pings
+    from app.services.location_store import location_store
+    location_store.init_app(app)
+    
+    # Push per-interval driver position deltas to the dispatchers room
+    from app.realtime.driver_feed import driver_feed
+    driver_feed.init_app(app)
+    
+    # Expire ride offers and re-offer unassigned rides in widening waves
+    from app.services.offer_scheduler import offer_scheduler
+    offer_scheduler.init_app(app)
+    
+    # Worker pool for ride fan-out and other request side effects
+    from app.services.work_queue import work_queue
+    work_queue.init_app(app)
+    
+    # Route distance cache used by fare estimates
+    from app.services.route_cache import init_route_cache
+    init_route_cache(app)
+    
+    # Cached Setting/Commission snapshot with cross-worker invalidation
+    from app.services.settings_store import settings_store
+    settings_store.init_app(app)
+    
+    # Keep ride_daily_rollup and driver_stats in step with ride writes (session events)
+    from app.services import ride_rollup, driver_stats  # noqa: F401
+    
     # SocketIO Event Handlers
     @socketio.on('connect')
     def handle_connect():
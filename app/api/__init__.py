@@ -23,14 +23,10 @@ def init_limiter(app_limiter):
 
 # Helper function for settings
 def get_setting(key, default=None):
-    """Get setting value from database"""
-    from app.models import Setting
-    try:
-        setting = Setting.query.filter_by(key=key).first()
-        return setting.value if setting else default
-    except Exception:
-        # If database is not available, return default
-        return default
+    """Get setting value (cached snapshot of the Setting table)"""
+    from app.services.settings_store import settings_store
+    # Returns default if the database is not available
+    return settings_store.get(key, default)
 
 # Import all route modules to register their routes
 # This must be done AFTER the blueprint is created
@@ -437,3 +437,23 @@ Selamawi Ride Team
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+
+@api.route('/admin/work-queue-metrics')
+@admin_required
+def get_work_queue_metrics():
+    """Background work queue depth and per-stage counters/timings"""
+    from app.services.work_queue import work_queue
+    return jsonify(work_queue.metrics())
+
+
+@api.route('/admin/cache-metrics')
+@admin_required
+def get_cache_metrics():
+    """Hit/miss counters for in-process caches"""
+    from app.services.route_cache import route_cache
+    from app.api.data import dashboard_stats_cache
+    return jsonify({
+        'route': route_cache.stats(),
+        'dashboard_stats': dashboard_stats_cache.stats(),
+    })
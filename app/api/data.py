@@ -2,24 +2,33 @@
 Data retrieval and analytics API endpoints
 """
 
-import io
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from datetime import datetime, timezone, timedelta
+import base64
+import os
+import time
+from datetime import date, datetime, timezone, timedelta
 from decimal import Decimal
 
-from flask import request, jsonify, current_app
-from sqlalchemy import func, case
-from app.models import db, Driver, Ride, Passenger, Feedback, Setting, Admin, DriverEarnings, Commission
+from flask import request, jsonify, current_app, redirect, send_file, url_for
+from sqlalchemy import and_, case, func, or_, select
+from app.models import db, Driver, Ride, Passenger, Feedback, Setting, Admin, DriverEarnings, RideDailyRollup, ReportJob
 from app.api import api, admin_required, passenger_required, get_setting
-from app.utils import to_eat
+from app.utils import to_eat, eat_date
+from app.utils.csv_stream import csv_response, YIELD_PER
+from app.services.settings_store import settings_store
+from app.services.storage_service import get_storage_service
+from app.services.reports import submit_report, report_filename, CONTENT_TYPES
+from app.services.cache import TTLCache
 from flask_login import current_user
 
+# Dashboard stats are polled by every open dispatcher tab; compute once per TTL
+dashboard_stats_cache = TTLCache(maxsize=1, ttl_seconds=5)
+
+# Page sizes for /all-rides-data and /passengers
+RIDE_PAGE_SIZE = 50
+MAX_RIDE_PAGE_SIZE = 200
+PASSENGER_PAGE_SIZE = 50
+MAX_PASSENGER_PAGE_SIZE = 200
+
 # --- Dashboard Stats ---
 @api.route('/commission-settings', methods=['GET', 'POST'])
 @admin_required
@@ -27,17 +36,15 @@ def commission_settings():
     """Get or update commission settings"""
     if request.method == 'GET':
         try:
-            from app.models import Setting
-            
             # Get current commission settings
-            bajaj_rate = Setting.query.filter_by(key='commission_rate_bajaj').first()
-            car_rate = Setting.query.filter_by(key='commission_rate_car').first()
+            bajaj_rate = settings_store.get('commission_rate_bajaj')
+            car_rate = settings_store.get('commission_rate_car')
             
             return jsonify({
                 'success': True,
                 'settings': {
-                    'bajaj_rate': float(bajaj_rate.value) if bajaj_rate else 15.0,
-                    'car_rate': float(car_rate.value) if car_rate else 20.0
+                    'bajaj_rate': float(bajaj_rate) if bajaj_rate else 15.0,
+                    'car_rate': float(car_rate) if car_rate else 20.0
                 }
             })
         except Exception as e:
@@ -71,6 +78,8 @@ def commission_settings():
                 db.session.add(car_setting)
             
             db.session.commit()
+            # Commit hooks already did this; be explicit for this worker and its peers
+            settings_store.invalidate()
             
             return jsonify({
                 'success': True,
@@ -88,68 +97,79 @@ def commission_settings():
 @api.route('/dashboard-stats')
 @admin_required
 def get_dashboard_stats():
-    """Get dashboard statistics"""
+    """Get dashboard statistics (shared across dispatchers for a few seconds)"""
     try:
-        # Calculate total revenue from completed rides
-        total_revenue = db.session.query(func.sum(Ride.fare)).filter(Ride.status == 'Completed').scalar() or 0
-        
-        # Count all rides
-        total_rides = Ride.query.count()
-        
-        # Count drivers by status
-        drivers_online = Driver.query.filter(Driver.status == 'Available').count()
-        total_drivers = Driver.query.count()
-        pending_drivers = Driver.query.filter(Driver.status == 'Pending').count()
-        
-        # Count passengers
-        total_passengers = Passenger.query.count()
-        
-        # Count rides by status
-        pending_requests = Ride.query.filter(Ride.status == 'Requested').count()
-        active_rides = Ride.query.filter(Ride.status.in_(['Assigned', 'On Trip'])).count()
-        completed_rides = Ride.query.filter(Ride.status == 'Completed').count()
-        
-        # Calculate today's revenue
-        today = datetime.now(timezone.utc).date()
-        today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
-        today_end = datetime.combine(today, datetime.max.time()).replace(tzinfo=timezone.utc)
-        
-        today_revenue = db.session.query(func.sum(Ride.fare)).filter(
-            Ride.status == 'Completed',
-            Ride.request_time >= today_start,
-            Ride.request_time <= today_end
-        ).scalar() or 0
-        
-        # Count support tickets
-        try:
-            from app.models import SupportTicket
-            open_tickets = SupportTicket.query.filter(SupportTicket.status == 'Open').count()
-            total_tickets = SupportTicket.query.count()
-        except Exception:
-            # If SupportTicket model doesn't exist or has issues, use defaults
-            open_tickets = 0
-            total_tickets = 0
-        
-        return jsonify({
-            'total_revenue': round(float(total_revenue), 2),
-            'total_rides': total_rides,
-            'drivers_online': drivers_online,
-            'total_drivers': total_drivers,
-            'pending_drivers': pending_drivers,
-            'total_passengers': total_passengers,
-            'pending_requests': pending_requests,
-            'active_rides': active_rides,
-            'completed_rides': completed_rides,
-            'today_revenue': round(float(today_revenue), 2),
-            'open_tickets': open_tickets,
-            'total_tickets': total_tickets
-        })
+        started = time.perf_counter()
+        stats, cached = dashboard_stats_cache.get_or_set('dashboard_stats', _compute_dashboard_stats)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not cached:
+            current_app.logger.info(f"Dashboard stats computed in {elapsed_ms:.1f} ms")
+        response = jsonify(stats)
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        response.headers['Server-Timing'] = f'dashboard;dur={elapsed_ms:.1f}'
+        return response
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
         current_app.logger.error(f"Error getting dashboard stats: {str(e)}\n{error_trace}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+def _compute_dashboard_stats():
+    """One conditional-aggregate query per table"""
+    # Today's window for revenue
+    today = datetime.now(timezone.utc).date()
+    today_start = datetime.combine(today, datetime.min.time()).replace(tzinfo=timezone.utc)
+    today_end = datetime.combine(today, datetime.max.time()).replace(tzinfo=timezone.utc)
+    is_completed = Ride.status == 'Completed'
+    
+    (total_rides, pending_requests, active_rides, completed_rides,
+     total_revenue, today_revenue) = db.session.query(
+        func.count(Ride.id),
+        func.count(case((Ride.status == 'Requested', 1))),
+        func.count(case((Ride.status.in_(['Assigned', 'On Trip']), 1))),
+        func.count(case((is_completed, 1))),
+        func.sum(case((is_completed, Ride.fare))),
+        func.sum(case((is_completed & (Ride.request_time >= today_start) & (Ride.request_time <= today_end), Ride.fare))),
+    ).one()
+    
+    # Count drivers by status
+    total_drivers, drivers_online, pending_drivers = db.session.query(
+        func.count(Driver.id),
+        func.count(case((Driver.status == 'Available', 1))),
+        func.count(case((Driver.status == 'Pending', 1))),
+    ).one()
+    
+    # Count passengers
+    total_passengers = db.session.query(func.count(Passenger.id)).scalar()
+    
+    # Count support tickets
+    try:
+        from app.models import SupportTicket
+        total_tickets, open_tickets = db.session.query(
+            func.count(SupportTicket.id),
+            func.count(case((SupportTicket.status == 'Open', 1))),
+        ).one()
+    except Exception:
+        # If SupportTicket model doesn't exist or has issues, use defaults
+        db.session.rollback()
+        open_tickets = 0
+        total_tickets = 0
+    
+    return {
+        'total_revenue': round(float(total_revenue or 0), 2),
+        'total_rides': total_rides,
+        'drivers_online': drivers_online,
+        'total_drivers': total_drivers,
+        'pending_drivers': pending_drivers,
+        'total_passengers': total_passengers,
+        'pending_requests': pending_requests,
+        'active_rides': active_rides,
+        'completed_rides': completed_rides,
+        'today_revenue': round(float(today_revenue or 0), 2),
+        'open_tickets': open_tickets,
+        'total_tickets': total_tickets
+    }
+
 # --- Ride Data ---
 @api.route('/pending-rides')
 @admin_required
@@ -242,100 +262,118 @@ def get_active_rides():
 @api.route('/all-rides-data')
 @admin_required
 def get_all_rides_data():
-    """Get all ride data for management"""
-    try:
-        rides = Ride.query.options(
-            db.joinedload(Ride.passenger),
-            db.joinedload(Ride.driver)
-        ).order_by(Ride.request_time.desc()).all()
-        
-        # Get all feedbacks in one query for efficiency
-        ride_ids = [ride.id for ride in rides]
-        feedbacks_dict = {}
-        if ride_ids:
-            feedbacks = Feedback.query.filter(Feedback.ride_id.in_(ride_ids)).all()
-            feedbacks_dict = {fb.ride_id: fb for fb in feedbacks}
-        
-        rides_data = []
-        for ride in rides:
-            try:
-                # Safely access passenger data
-                user_name = "N/A"
-                user_phone = "N/A"
-                if ride.passenger_id and ride.passenger:
-                    user_name = ride.passenger.username if ride.passenger.username else "N/A"
-                    user_phone = ride.passenger.phone_number if ride.passenger.phone_number else "N/A"
-
-                # Safely access driver data
-                driver_name = "N/A"
-                if ride.driver_id and ride.driver:
-                    driver_name = ride.driver.name if ride.driver.name else "N/A"
+    """
+    One page of ride history, newest first, with keyset pagination
 
-                # Safely access fare
-                try:
-                    fare = float(ride.fare) if ride.fare is not None else 0.0
-                except (ValueError, TypeError):
-                    fare = 0.0
+    Query params: limit (default 50, max 200), cursor (next_cursor from the
+    previous page), status, vehicle_type, driver_id, passenger_id,
+    start_date/end_date (YYYY-MM-DD UTC days, inclusive) and
+    search (passenger username or driver name prefix, ignoring case).
 
-                # Safely access status
-                status = ride.status if ride.status else "Unknown"
+    Pages seek on (request_time, id) through the composite ride indexes, so
+    a page costs the same however deep it is. A search first seeks the
+    lower(username) / lower(name) indexes for matching passengers and
+    drivers, then their rides through the per-passenger and per-driver ride
+    indexes, so it costs the matching rides rather than the whole table.
+    Rides without a request_time have no place in that order and are left
+    out. Returns {rides, next_cursor}; next_cursor is null on the last page.
+    """
+    try:
+        limit = min(max(request.args.get('limit', RIDE_PAGE_SIZE, type=int), 1), MAX_RIDE_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        try:
+            after = _decode_ride_cursor(cursor) if cursor else None
+            start_dt = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or date (dates must be YYYY-MM-DD)'}), 400
+        
+        query = db.session.query(
+            Ride.id,
+            Ride.fare,
+            Ride.status,
+            Ride.rating,
+            Ride.request_time,
+            Passenger.username.label('user_name'),
+            Passenger.phone_number.label('user_phone'),
+            Driver.name.label('driver_name')
+        ).outerjoin(Passenger, Ride.passenger_id == Passenger.id)\
+         .outerjoin(Driver, Ride.driver_id == Driver.id)\
+         .filter(Ride.request_time.isnot(None))
+        
+        status = request.args.get('status')
+        vehicle_type = request.args.get('vehicle_type')
+        driver_id = request.args.get('driver_id', type=int)
+        passenger_id = request.args.get('passenger_id', type=int)
+        search = (request.args.get('search') or '').strip()
+        if status:
+            query = query.filter(Ride.status == status)
+        if vehicle_type:
+            query = query.filter(Ride.vehicle_type == vehicle_type)
+        if driver_id:
+            query = query.filter(Ride.driver_id == driver_id)
+        if passenger_id:
+            query = query.filter(Ride.passenger_id == passenger_id)
+        if start_dt:
+            query = query.filter(Ride.request_time >= start_dt)
+        if end_dt:
+            query = query.filter(Ride.request_time < end_dt)
+        if search:
+            # Case-insensitive, like the dashboard's old client-side filter
+            term = search.lower()
+            query = query.filter(or_(
+                Ride.passenger_id.in_(
+                    select(Passenger.id).where(_prefix_range(func.lower(Passenger.username), term))
+                ),
+                Ride.driver_id.in_(
+                    select(Driver.id).where(_prefix_range(func.lower(Driver.name), term))
+                )
+            ))
+        if after:
+            after_time, after_id = after
+            query = query.filter(or_(
+                Ride.request_time < after_time,
+                and_(Ride.request_time == after_time, Ride.id < after_id)
+            ))
+        
+        rows = query.order_by(Ride.request_time.desc(), Ride.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_ride_cursor(rows[-1].request_time, rows[-1].id)
+        
+        rides_data = [{
+            'id': row.id,
+            'user_name': row.user_name or "N/A",
+            'user_phone': row.user_phone or "N/A",
+            'driver_name': row.driver_name or "N/A",
+            'fare': float(row.fare) if row.fare is not None else 0.0,
+            'status': row.status or "Unknown",
+            'rating': row.rating,
+            'request_time': to_eat(row.request_time).strftime('%Y-%m-%d %H:%M') if row.request_time else "N/A"
+        } for row in rows]
+        
+        return jsonify({'rides': rides_data, 'next_cursor': next_cursor})
+    except Exception as e:
+        current_app.logger.error(f"Error getting all rides data: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-                # Safely access rating from Feedback model (not the string column)
-                rating = None
-                feedback_obj = feedbacks_dict.get(ride.id)
-                if feedback_obj and feedback_obj.rating is not None:
-                    try:
-                        rating = int(feedback_obj.rating)
-                    except (ValueError, TypeError):
-                        rating = None
+def _prefix_range(column, text):
+    """column starts with text, as a range (text <= column < next prefix) that an index can seek"""
+    return and_(column >= text, column < text[:-1] + chr(ord(text[-1]) + 1))
 
-                # Safely format request_time
-                request_time_str = "N/A"
-                if ride.request_time:
-                    try:
-                        request_time_str = to_eat(ride.request_time).strftime('%Y-%m-%d %H:%M')
-                    except (AttributeError, ValueError, TypeError) as e:
-                        current_app.logger.warning(
-                            f"Error formatting request_time for ride {ride.id}: {e}")
-                        request_time_str = "N/A"
+def _encode_ride_cursor(request_time, ride_id):
+    """Opaque cursor for the (request_time, id) of the last ride on a page"""
+    raw = f"{request_time.isoformat()}|{ride_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
 
-                rides_data.append({
-                    'id': ride.id,
-                    'user_name': user_name,
-                    'user_phone': user_phone,
-                    'driver_name': driver_name,
-                    'fare': fare,
-                    'status': status,
-                    'rating': rating,
-                    'request_time': request_time_str
-                })
-            except Exception as ride_error:
-                # Log error for this specific ride but continue processing others
-                import traceback
-                error_trace = traceback.format_exc()
-                current_app.logger.error(
-                    f"Error processing ride {ride.id}: {str(ride_error)}\n{error_trace}")
-                # Still add the ride with minimal data
-                rides_data.append({
-                    'id': ride.id,
-                    'user_name': "Error",
-                    'user_phone': "N/A",
-                    'driver_name': "N/A",
-                    'fare': 0.0,
-                    'status': ride.status if ride.status else "Unknown",
-                    'rating': None,
-                    'request_time': "N/A"
-                })
-        
-        current_app.logger.info(f"Successfully processed {len(rides_data)} rides")
-        return jsonify(rides_data)
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        error_line = error_trace.split('\n')[-3] if len(error_trace.split('\n')) > 3 else "Unknown"
-        current_app.logger.error(
-            f"Error getting all rides data: {str(e)}\nLine: {error_line}\nFull trace: {error_trace}")
-        return jsonify({'error': f'Internal server error: {str(e)}', 'line': error_line}), 500
+def _decode_ride_cursor(cursor):
+    """(request_time, id) from a cursor; raises ValueError if it is malformed"""
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    request_time, ride_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(request_time), int(ride_id)
 
 @api.route('/ride-details/<int:ride_id>')
 @admin_required
@@ -428,24 +466,78 @@ def get_ride_details(ride_id):
 @api.route('/passengers')
 @admin_required
 def get_passengers():
-    """Get all passengers"""
-    passengers = Passenger.query.options(db.selectinload(Passenger.rides)).all()
-    
-    passengers_data = []
-    for passenger in passengers:
-        passengers_data.append({
-            "id": passenger.id,
-            "passenger_uid": passenger.passenger_uid,
-            "username": passenger.username,
-            "phone_number": passenger.phone_number,
-            "profile_picture": passenger.profile_picture,
-            "rides_taken": len(passenger.rides),
-            "join_date": passenger.join_date.strftime('%Y-%m-%d') if passenger.join_date else None,
-            "is_blocked": passenger.is_blocked,
-            "blocked_reason": passenger.blocked_reason if passenger.is_blocked else None
-        })
-    
-    return jsonify(passengers_data)
+    """
+    One page of the passenger directory, oldest account first
+
+    Query params: limit (default 50, max 200), cursor (next_cursor from the
+    previous page) and search. A search starting with PAX- matches the
+    passenger uid, digits (optionally with a leading +) match the phone
+    number, anything else matches the username ignoring case. All are
+    prefix matches written as a range, so they seek the uid, phone or
+    lower(username) index instead of scanning the table.
+
+    Ride counts come from one GROUP BY over the page's ids, not from loading
+    rides. Returns {passengers, next_cursor}; next_cursor is null on the
+    last page.
+    """
+    try:
+        limit = min(max(request.args.get('limit', PASSENGER_PAGE_SIZE, type=int), 1), MAX_PASSENGER_PAGE_SIZE)
+        after_id = request.args.get('cursor', type=int)
+        search = (request.args.get('search') or '').strip()
+        
+        query = db.session.query(
+            Passenger.id,
+            Passenger.passenger_uid,
+            Passenger.username,
+            Passenger.phone_number,
+            Passenger.profile_picture,
+            Passenger.join_date,
+            Passenger.is_blocked,
+            Passenger.blocked_reason
+        )
+        if search:
+            if search.upper().startswith('PAX-'):
+                column, search = Passenger.passenger_uid, search.upper()
+            elif search.lstrip('+').isdigit():
+                column = Passenger.phone_number
+            else:
+                column, search = func.lower(Passenger.username), search.lower()
+            query = query.filter(_prefix_range(column, search))
+        if after_id:
+            query = query.filter(Passenger.id > after_id)
+        
+        passengers = query.order_by(Passenger.id).limit(limit + 1).all()
+        next_cursor = None
+        if len(passengers) > limit:
+            passengers = passengers[:limit]
+            next_cursor = passengers[-1].id
+        
+        ride_counts = {}
+        if passengers:
+            ride_counts = dict(db.session.query(
+                Ride.passenger_id, func.count(Ride.id)
+            ).filter(
+                Ride.passenger_id.in_([p.id for p in passengers])
+            ).group_by(Ride.passenger_id).all())
+        
+        passengers_data = []
+        for passenger in passengers:
+            passengers_data.append({
+                "id": passenger.id,
+                "passenger_uid": passenger.passenger_uid,
+                "username": passenger.username,
+                "phone_number": passenger.phone_number,
+                "profile_picture": passenger.profile_picture,
+                "rides_taken": ride_counts.get(passenger.id, 0),
+                "join_date": passenger.join_date.strftime('%Y-%m-%d') if passenger.join_date else None,
+                "is_blocked": passenger.is_blocked,
+                "blocked_reason": passenger.blocked_reason if passenger.is_blocked else None
+            })
+        
+        return jsonify({'passengers': passengers_data, 'next_cursor': next_cursor})
+    except Exception as e:
+        current_app.logger.error(f"Error getting passengers: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @api.route('/passenger-details/<int:passenger_id>')
 @admin_required
@@ -569,6 +661,9 @@ def rate_ride():
         # Check if feedback already exists
         feedback = Feedback.query.filter_by(ride_id=ride_id).first()
         
+        # The ride's own rating feeds analytics and the daily rollup
+        ride.rating = int(rating)
+        
         if feedback:
             # Update existing feedback
             feedback.rating = rating
@@ -703,183 +798,218 @@ def get_analytics_data():
     """Get analytics data for charts and graphs"""
     try:
         period = request.args.get('period', 'week')
-        
-        # Calculate date range based on period
-        now = datetime.now(timezone.utc)
-        
-        if period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            prev_start = start_date - timedelta(days=1)
-            prev_end = start_date
-        elif period == 'week':
-            start_date = now - timedelta(days=7)
-            prev_start = start_date - timedelta(days=7)
-            prev_end = start_date
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
-            prev_start = start_date - timedelta(days=30)
-            prev_end = start_date
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-            prev_start = start_date - timedelta(days=365)
-            prev_end = start_date
-        else:
-            start_date = now - timedelta(days=7)  # Default to week
-            prev_start = start_date - timedelta(days=7)
-            prev_end = start_date
-        
-        # Get current period rides
-        rides = Ride.query.filter(Ride.request_time >= start_date).all()
-        
-        # Get previous period rides for trend calculation
-        prev_rides = Ride.query.filter(
-            Ride.request_time >= prev_start,
-            Ride.request_time < prev_end
-        ).all()
-        
-        # Debug logging
-        current_app.logger.info(f"Analytics data - Period: {period}, Current rides: {len(rides)}, Previous rides: {len(prev_rides)}")
-        
-        # Calculate current period statistics
-        completed_rides = len([r for r in rides if r.status == 'Completed'])
-        canceled_rides = len([r for r in rides if r.status == 'Canceled'])
-        active_rides = len([r for r in rides if r.status in ['Assigned', 'On Trip']])
-        requested_rides = len([r for r in rides if r.status == 'Requested'])
-        total_rides = len(rides)
-        total_revenue = sum(float(r.fare) for r in rides if r.status == 'Completed')
-        avg_fare = total_revenue / completed_rides if completed_rides > 0 else 0
-        
-        # Handle case where there is no data
-        if total_rides == 0:
-            completed_rides = 0
-            canceled_rides = 0
-            active_rides = 0
-            requested_rides = 0
-            total_revenue = 0
-            avg_fare = 0
-        
-        # Calculate completion rate
-        completion_rate = (completed_rides / total_rides * 100) if total_rides > 0 else 85.5
-        
-        # Calculate average rating
-        ratings = [r.feedback.rating for r in rides if r.feedback and r.feedback.rating]
-        avg_rating = sum(ratings) / len(ratings) if ratings else 4.2
-        
-        # Calculate previous period statistics for trends
-        prev_completed = len([r for r in prev_rides if r.status == 'Completed'])
-        prev_revenue = sum(float(r.fare) for r in prev_rides if r.status == 'Completed')
-        
-        # Calculate trends
-        rides_trend = ((completed_rides - prev_completed) / prev_completed * 100) if prev_completed > 0 else 0
-        revenue_trend = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
-        
-        # Vehicle distribution
-        vehicle_dist = {}
-        for ride in rides:
-            vtype = ride.vehicle_type or 'Unknown'
-            vehicle_dist[vtype] = vehicle_dist.get(vtype, 0) + 1
-        
-        # Payment method distribution
-        payment_dist = {}
-        for ride in rides:
-            if ride.status == 'Completed':
-                pmethod = ride.payment_method or 'Cash'
-                payment_dist[pmethod] = payment_dist.get(pmethod, 0) + 1
-        
-        # Ride status distribution
-        status_dist = {}
-        for ride in rides:
-            status = ride.status
-            status_dist[status] = status_dist.get(status, 0) + 1
-        
-        # Add fallback data if no data exists
-        if not vehicle_dist:
-            vehicle_dist = {}
-        if not payment_dist:
-            payment_dist = {}
-        if not status_dist:
-            status_dist = {}
-        
-        # Daily breakdown for revenue chart
-        daily_data = {}
-        for ride in rides:
-            ride_date = to_eat(ride.request_time).strftime('%b %d')
-            if ride_date not in daily_data:
-                daily_data[ride_date] = 0
-            if ride.status == 'Completed':
-                daily_data[ride_date] += float(ride.fare)
-        
-        # Sort by date and prepare chart data
-        sorted_dates = sorted(daily_data.keys())
-        if not sorted_dates:
-            revenue_chart_data = {
-                'labels': [],
-                'data': []
-            }
-        else:
-            revenue_chart_data = {
-                'labels': sorted_dates[-7:] if len(sorted_dates) > 7 else sorted_dates,
-                'data': [round(daily_data[d], 2) for d in (sorted_dates[-7:] if len(sorted_dates) > 7 else sorted_dates)]
-            }
-        
-        # Top performing drivers
-        driver_stats = db.session.query(
-            Driver.id,
-            Driver.name,
-            Driver.profile_picture,
-            func.count(Ride.id).label('completed_rides'),
-            func.avg(Feedback.rating).label('avg_rating')
-        ).join(Ride, Ride.driver_id == Driver.id)\
-         .outerjoin(Feedback, Feedback.ride_id == Ride.id)\
-         .filter(Ride.status == 'Completed')\
-         .filter(Ride.request_time >= start_date)\
-         .group_by(Driver.id)\
-         .order_by(func.count(Ride.id).desc())\
-         .limit(5).all()
-        
-        top_drivers = [{
-            'id': d.id,
-            'name': d.name,
-            'avatar': d.profile_picture or 'static/img/default_avatar.png',
-            'completed_rides': d.completed_rides,
-            'avg_rating': round(float(d.avg_rating), 1) if d.avg_rating else 0
-        } for d in driver_stats]
-        
-        # Don't add fake drivers - show empty state instead
-        # if not top_drivers:
-        #     top_drivers = []
-        
-        return jsonify({
-            'kpis': {
-                'rides_completed': completed_rides,
-                'active_rides_now': active_rides,
-                'rides_canceled': canceled_rides,
-                'rides_requested': requested_rides,
-                'total_rides': total_rides,
-            'total_revenue': round(total_revenue, 2),
-                'avg_fare': round(avg_fare, 2),
-                'completion_rate': round(completion_rate, 1),
-                'avg_rating': round(avg_rating, 1),
-                'trends': {
-                    'rides': round(rides_trend, 1),
-                    'revenue': round(revenue_trend, 1)
-                }
-            },
-            'charts': {
-                'revenue_over_time': revenue_chart_data,
-                'vehicle_distribution': vehicle_dist,
-                'payment_method_distribution': payment_dist,
-                'ride_status_distribution': status_dist
-            },
-            'performance': {
-                'top_drivers': top_drivers
-            }
-        })
+        return jsonify(_compute_analytics(period))
         
     except Exception as e:
         current_app.logger.error(f"Analytics error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Days covered by each analytics period (week is the default)
+ANALYTICS_PERIOD_DAYS = {'today': 1, 'week': 7, 'month': 30, 'year': 365}
+
+def _analytics_window(period):
+    """Start of the period and the previous period of the same length"""
+    now = datetime.now(timezone.utc)
+    length = timedelta(days=ANALYTICS_PERIOD_DAYS.get(period, 7))
+    
+    if period == 'today':
+        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start_date = now - length
+    
+    return start_date, start_date - length, start_date
+
+def _ride_aggregates(start_date, prev_start, prev_end):
+    """
+    Period aggregates straight from the ride table
+    
+    Returns:
+        tuple: (mix rows of (status, vehicle_type, payment_method, rides,
+        fare_sum, rating_count, rating_sum), (prev_completed, prev_revenue),
+        daily [(day, revenue)] for the last 7 EAT days that had rides)
+    """
+    in_period = Ride.request_time >= start_date
+    is_completed = Ride.status == 'Completed'
+    
+    mix = db.session.query(
+        Ride.status,
+        Ride.vehicle_type,
+        Ride.payment_method,
+        func.count(Ride.id),
+        func.sum(Ride.fare),
+        func.count(Ride.rating),
+        func.sum(Ride.rating),
+    ).filter(in_period)\
+     .group_by(Ride.status, Ride.vehicle_type, Ride.payment_method).all()
+    
+    previous = db.session.query(
+        func.count(Ride.id),
+        func.sum(Ride.fare),
+    ).filter(Ride.request_time >= prev_start, Ride.request_time < prev_end, is_completed).one()
+    
+    day = eat_date(Ride.request_time, db.engine.dialect.name).label('day')
+    daily = db.session.query(
+        day,
+        func.sum(case((is_completed, Ride.fare))),
+    ).filter(in_period)\
+     .group_by(day)\
+     .order_by(day.desc())\
+     .limit(7).all()
+    
+    return mix, previous, daily
+
+def _rollup_aggregates(period):
+    """Same aggregates as _ride_aggregates, read from ride_daily_rollup over whole EAT days"""
+    days = ANALYTICS_PERIOD_DAYS.get(period, 7)
+    end_day = to_eat(datetime.utcnow()).date()
+    start_day = end_day - timedelta(days=days - 1)
+    prev_start_day = start_day - timedelta(days=days)
+    in_period = RideDailyRollup.day >= start_day
+    is_completed = RideDailyRollup.status == 'Completed'
+    
+    mix = db.session.query(
+        RideDailyRollup.status,
+        RideDailyRollup.vehicle_type,
+        RideDailyRollup.payment_method,
+        func.sum(RideDailyRollup.ride_count),
+        func.sum(RideDailyRollup.fare_sum),
+        func.sum(RideDailyRollup.rating_count),
+        func.sum(RideDailyRollup.rating_sum),
+    ).filter(in_period)\
+     .group_by(RideDailyRollup.status, RideDailyRollup.vehicle_type, RideDailyRollup.payment_method)\
+     .having(func.sum(RideDailyRollup.ride_count) > 0).all()
+    
+    previous = db.session.query(
+        func.coalesce(func.sum(RideDailyRollup.ride_count), 0),
+        func.sum(RideDailyRollup.fare_sum),
+    ).filter(RideDailyRollup.day >= prev_start_day, RideDailyRollup.day < start_day, is_completed).one()
+    
+    daily = db.session.query(
+        RideDailyRollup.day,
+        func.sum(case((is_completed, RideDailyRollup.fare_sum))),
+    ).filter(in_period)\
+     .group_by(RideDailyRollup.day)\
+     .having(func.sum(RideDailyRollup.ride_count) > 0)\
+     .order_by(RideDailyRollup.day.desc())\
+     .limit(7).all()
+    
+    return mix, previous, daily
+
+def _compute_analytics(period):
+    """
+    Analytics for a period using GROUP BY queries only
+    
+    Reads the daily rollup when ANALYTICS_USE_ROLLUP is set (periods then
+    cover whole EAT days), otherwise aggregates rides directly. Either way
+    each query returns at most one row per status/vehicle/payment
+    combination or per day, so memory does not grow with the number of rides.
+    """
+    start_date, prev_start, prev_end = _analytics_window(period)
+    if current_app.config.get('ANALYTICS_USE_ROLLUP', True):
+        mix, previous, daily = _rollup_aggregates(period)
+    else:
+        mix, previous, daily = _ride_aggregates(start_date, prev_start, prev_end)
+    
+    # Status, vehicle and payment mix plus revenue and ratings
+    status_dist = {}
+    vehicle_dist = {}
+    payment_dist = {}
+    total_revenue = 0.0
+    rating_count = 0
+    rating_sum = 0
+    for status, vehicle_type, payment_method, count, fare_sum, ratings, ratings_sum in mix:
+        count = int(count)
+        status_dist[status] = status_dist.get(status, 0) + count
+        vtype = vehicle_type or 'Unknown'
+        vehicle_dist[vtype] = vehicle_dist.get(vtype, 0) + count
+        rating_count += int(ratings or 0)
+        rating_sum += int(ratings_sum or 0)
+        if status == 'Completed':
+            pmethod = payment_method or 'Cash'
+            payment_dist[pmethod] = payment_dist.get(pmethod, 0) + count
+            total_revenue += float(fare_sum or 0)
+    
+    completed_rides = status_dist.get('Completed', 0)
+    canceled_rides = status_dist.get('Canceled', 0)
+    active_rides = status_dist.get('Assigned', 0) + status_dist.get('On Trip', 0)
+    requested_rides = status_dist.get('Requested', 0)
+    total_rides = sum(status_dist.values())
+    avg_fare = total_revenue / completed_rides if completed_rides > 0 else 0
+    
+    # Calculate completion rate
+    completion_rate = (completed_rides / total_rides * 100) if total_rides > 0 else 85.5
+    
+    # Average passenger rating of rides in the period
+    avg_rating = rating_sum / rating_count if rating_count else 4.2
+    
+    # Previous period statistics for trends
+    prev_completed = int(previous[0] or 0)
+    prev_revenue = float(previous[1] or 0)
+    
+    # Calculate trends
+    rides_trend = ((completed_rides - prev_completed) / prev_completed * 100) if prev_completed > 0 else 0
+    revenue_trend = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
+    
+    # Daily revenue for the last 7 days (EAT) that had rides
+    daily = sorted(
+        (d if isinstance(d, date) else date.fromisoformat(str(d)[:10]), float(revenue or 0))
+        for d, revenue in daily
+    )
+    revenue_chart_data = {
+        'labels': [d.strftime('%b %d') for d, _ in daily],
+        'data': [round(revenue, 2) for _, revenue in daily]
+    }
+    
+    # Top performing drivers
+    driver_stats = db.session.query(
+        Driver.id,
+        Driver.name,
+        Driver.profile_picture,
+        func.count(Ride.id).label('completed_rides'),
+        func.avg(Feedback.rating).label('avg_rating')
+    ).join(Ride, Ride.driver_id == Driver.id)\
+     .outerjoin(Feedback, Feedback.ride_id == Ride.id)\
+     .filter(Ride.status == 'Completed')\
+     .filter(Ride.request_time >= start_date)\
+     .group_by(Driver.id)\
+     .order_by(func.count(Ride.id).desc())\
+     .limit(5).all()
+    
+    top_drivers = [{
+        'id': d.id,
+        'name': d.name,
+        'avatar': d.profile_picture or 'static/img/default_avatar.png',
+        'completed_rides': d.completed_rides,
+        'avg_rating': round(float(d.avg_rating), 1) if d.avg_rating else 0
+    } for d in driver_stats]
+    
+    return {
+        'kpis': {
+            'rides_completed': completed_rides,
+            'active_rides_now': active_rides,
+            'rides_canceled': canceled_rides,
+            'rides_requested': requested_rides,
+            'total_rides': total_rides,
+            'total_revenue': round(total_revenue, 2),
+            'avg_fare': round(avg_fare, 2),
+            'completion_rate': round(completion_rate, 1),
+            'avg_rating': round(avg_rating, 1),
+            'trends': {
+                'rides': round(rides_trend, 1),
+                'revenue': round(revenue_trend, 1)
+            }
+        },
+        'charts': {
+            'revenue_over_time': revenue_chart_data,
+            'vehicle_distribution': vehicle_dist,
+            'payment_method_distribution': payment_dist,
+            'ride_status_distribution': status_dist
+        },
+        'performance': {
+            'top_drivers': top_drivers
+        }
+    }
+
 def create_sample_earnings_data():
     """Create sample earnings data for testing"""
     try:
@@ -1061,18 +1191,13 @@ def calculate_driver_earnings():
 
 def _create_earnings_record(ride):
     """Helper function to create earnings record for a ride"""
-    # Get commission rate for vehicle type
-    commission = Commission.query.filter_by(
-        vehicle_type=ride.vehicle_type,
-        is_active=True
-    ).order_by(Commission.effective_date.desc()).first()
+    # Get commission rate for vehicle type (cached)
+    commission_rate = settings_store.commission_rate(ride.vehicle_type)
     
-    if not commission:
+    if commission_rate is None:
         # Default commission rates if not set
         default_rates = {'Bajaj': 20.0, 'Car': 25.0}
         commission_rate = Decimal(str(default_rates.get(ride.vehicle_type, 20.0)))
-    else:
-        commission_rate = commission.commission_rate
     
     # Calculate amounts
     gross_fare = ride.fare
@@ -1262,12 +1387,8 @@ def update_payment_status():
 @api.route('/earnings/export')
 @admin_required
 def export_driver_earnings():
-    """Export driver earnings data to CSV"""
+    """Export driver earnings data to CSV, streamed"""
     try:
-        import csv
-        import io
-        from flask import make_response
-        
         # Get date range from query params
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -1289,20 +1410,14 @@ def export_driver_earnings():
         if end_date:
             query = query.filter(DriverEarnings.created_at <= end_date)
         
-        results = query.group_by(Driver.id).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
+        results = query.group_by(Driver.id).order_by(Driver.id).yield_per(YIELD_PER)
         
-        # Write header
-        writer.writerow([
-            'Driver ID', 'Driver Name', 'Phone Number', 'Vehicle Type', 
-            'Total Rides', 'Total Fare', 'Total Commission', 'Driver Earnings', 'Avg Earnings per Ride'
-        ])
-        
-        # Write data
-        for result in results:
-            writer.writerow([
+        return csv_response(
+            ['Driver ID', 'Driver Name', 'Phone Number', 'Vehicle Type',
+             'Total Rides', 'Total Fare', 'Total Commission', 'Driver Earnings', 'Avg Earnings per Ride'],
+            results,
+            f'driver_earnings_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            lambda result: [
                 result.id,
                 result.name,
                 result.phone_number,
@@ -1312,277 +1427,84 @@ def export_driver_earnings():
                 float(result.total_commission or 0),
                 float(result.total_earnings or 0),
                 float(result.avg_earnings_per_ride or 0)
-            ])
-        
-        output.seek(0)
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=driver_earnings_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        return response
+            ]
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@api.route('/export-report')
+@api.route('/export-report', methods=['GET', 'POST'])
 @admin_required
 def export_report():
-    """Export comprehensive analytics report in PDF or Excel format"""
+    """Queue a PDF or Excel analytics report; poll /report-jobs/<id> for the file"""
     try:
-        format_type = request.args.get('format', 'pdf').lower()
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Set date range
+        params = request.get_json(silent=True) or request.args
+        format_type = (params.get('format') or 'pdf').lower()
+        if format_type not in ('pdf', 'excel'):
+            return jsonify({'error': 'format must be pdf or excel'}), 400
+        start_date = params.get('start_date')
+        end_date = params.get('end_date')
+        
+        # Whole UTC days, so repeated requests share a cache key
         if start_date and end_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
+            try:
+                start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+                end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
         else:
             # Default to last 30 days
-            end_dt = datetime.now(timezone.utc)
+            end_dt = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
             start_dt = end_dt - timedelta(days=30)
+        end_dt = end_dt.replace(hour=23, minute=59, second=59)
         
-        # Get data
-        rides = Ride.query.filter(
-            Ride.request_time >= start_dt,
-            Ride.request_time <= end_dt
-        ).options(
-            db.joinedload(Ride.passenger),
-            db.joinedload(Ride.driver),
-            db.joinedload(Ride.feedback)
-        ).all()
-        
-        drivers = Driver.query.all()
-        passengers = Passenger.query.all()
-        
-        if format_type == 'excel':
-            return _export_excel_report(rides, drivers, passengers, start_dt, end_dt)
-        else:
-            return _export_pdf_report(rides, drivers, passengers, start_dt, end_dt)
+        job, cached = submit_report(format_type, start_dt, end_dt, current_user.id)
+        return jsonify(_report_job_json(job, cached)), 202
             
     except Exception as e:
         current_app.logger.error(f"Export report error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def _export_excel_report(rides, drivers, passengers, start_date, end_date):
-    """Export report as Excel file"""
-    try:
-        wb = openpyxl.Workbook()
-        
-        # Summary sheet
-        ws_summary = wb.active
-        ws_summary.title = "Summary"
-        
-        # Add title
-        ws_summary.merge_cells('A1:B1')
-        title_cell = ws_summary.cell(row=1, column=1, value="🚗 RIDE Management System - Analytics Report")
-        title_cell.font = Font(bold=True, size=16, color="FFFFFF")
-        title_cell.fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
-        title_cell.alignment = Alignment(horizontal="center")
-        
-        # Add period info
-        ws_summary.merge_cells('A2:B2')
-        period_cell = ws_summary.cell(row=2, column=1, value=f"📅 Report Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}")
-        period_cell.font = Font(size=12, color="6B7280")
-        period_cell.alignment = Alignment(horizontal="center")
-        
-        # Add headers
-        headers = ['📊 Metric', '📈 Value']
-        for col, header in enumerate(headers, 1):
-            cell = ws_summary.cell(row=4, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Add summary data with emojis
-        summary_data = [
-            ['🚗 Total Rides', len(rides)],
-            ['✅ Completed Rides', len([r for r in rides if r.status == 'Completed'])],
-            ['💰 Total Revenue', f"ETB {sum(float(r.fare) for r in rides if r.status == 'Completed'):.2f}"],
-            ['👨‍💼 Total Drivers', len(drivers)],
-            ['👥 Total Passengers', len(passengers)],
-            ['⭐ Average Rating', f"{round(sum(r.feedback.rating for r in rides if r.feedback and r.feedback.rating) / len([r for r in rides if r.feedback and r.feedback.rating]), 2) if any(r.feedback and r.feedback.rating for r in rides) else 0}/5.0"]
-        ]
-        
-        for row, (metric, value) in enumerate(summary_data, 5):
-            ws_summary.cell(row=row, column=1, value=metric)
-            ws_summary.cell(row=row, column=2, value=value)
-            
-            # Style the data rows
-            for col in range(1, 3):
-                cell = ws_summary.cell(row=row, column=col)
-                cell.font = Font(size=11)
-                if row % 2 == 0:  # Alternate row colors
-                    cell.fill = PatternFill(start_color="F8FAFC", end_color="F8FAFC", fill_type="solid")
-        
-        # Rides sheet
-        ws_rides = wb.create_sheet("Rides")
-        ride_headers = ['ID', 'Passenger', 'Driver', 'Pickup', 'Destination', 'Fare', 'Status', 'Date', 'Rating']
-        for col, header in enumerate(ride_headers, 1):
-            cell = ws_rides.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        
-        for row, ride in enumerate(rides, 2):
-            ws_rides.cell(row=row, column=1, value=ride.id)
-            ws_rides.cell(row=row, column=2, value=ride.passenger.username if ride.passenger else 'N/A')
-            ws_rides.cell(row=row, column=3, value=ride.driver.name if ride.driver else 'N/A')
-            ws_rides.cell(row=row, column=4, value=ride.pickup_address or 'N/A')
-            ws_rides.cell(row=row, column=5, value=ride.dest_address)
-            ws_rides.cell(row=row, column=6, value=float(ride.fare))
-            ws_rides.cell(row=row, column=7, value=ride.status)
-            ws_rides.cell(row=row, column=8, value=to_eat(ride.request_time).strftime('%Y-%m-%d %H:%M'))
-            ws_rides.cell(row=row, column=9, value=ride.feedback.rating if ride.feedback else 'N/A')
-        
-        # Auto-adjust column widths
-        for ws in [ws_summary, ws_rides]:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to BytesIO
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        from flask import make_response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename=ride_report_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.xlsx'
-        
-        return response
-        
-    except Exception as e:
-        current_app.logger.error(f"Excel export error: {str(e)}")
-        return jsonify({'error': 'Failed to generate Excel report'}), 500
+def _report_job_json(job, cached=False):
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'format': job.format,
+        'cached': cached,
+        'start_date': job.start_date.strftime('%Y-%m-%d'),
+        'end_date': job.end_date.strftime('%Y-%m-%d'),
+        'error': job.error,
+        'download_url': url_for('api.download_report', job_id=job.id) if job.status == 'done' else None
+    }
+
+@api.route('/report-jobs/<int:job_id>')
+@admin_required
+def get_report_job(job_id):
+    """Status of a queued report"""
+    job = db.session.get(ReportJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Report job not found'}), 404
+    return jsonify(_report_job_json(job))
 
-def _export_pdf_report(rides, drivers, passengers, start_date, end_date):
-    """Export report as PDF file"""
+@api.route('/report-jobs/<int:job_id>/download')
+@admin_required
+def download_report(job_id):
+    """Serve a finished report from storage"""
     try:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Create custom styles for better formatting
-        title_style = styles['Title']
-        title_style.textColor = colors.HexColor('#1f2937')
-        title_style.fontSize = 24
-        title_style.spaceAfter = 20
-        
-        heading_style = styles['Heading2']
-        heading_style.textColor = colors.HexColor('#374151')
-        heading_style.fontSize = 16
-        heading_style.spaceAfter = 12
-        
-        # Title with better styling
-        title = Paragraph("🚗 RIDE Management System", title_style)
-        subtitle = Paragraph("Analytics & Performance Report", styles['Heading2'])
-        story.append(title)
-        story.append(subtitle)
-        story.append(Spacer(1, 20))
-        
-        # Report period with better formatting
-        period_text = f"📅 Report Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}"
-        period_style = styles['Normal']
-        period_style.fontSize = 12
-        period_style.textColor = colors.HexColor('#6b7280')
-        period = Paragraph(period_text, period_style)
-        story.append(period)
-        story.append(Spacer(1, 30))
-        
-        # Summary data
-        summary_data = [
-            ['Metric', 'Value'],
-            ['Total Rides', str(len(rides))],
-            ['Completed Rides', str(len([r for r in rides if r.status == 'Completed']))],
-            ['Total Revenue', f"${sum(float(r.fare) for r in rides if r.status == 'Completed'):.2f}"],
-            ['Total Drivers', str(len(drivers))],
-            ['Total Passengers', str(len(passengers))],
-            ['Average Rating', str(round(sum(r.feedback.rating for r in rides if r.feedback and r.feedback.rating) / len([r for r in rides if r.feedback and r.feedback.rating]), 2) if any(r.feedback and r.feedback.rating for r in rides) else 0) + "/5.0"]
-        ]
-        
-        # Add section header
-        section_header = Paragraph("📊 Key Performance Indicators", heading_style)
-        story.append(section_header)
-        story.append(Spacer(1, 12))
-        
-        summary_table = Table(summary_data)
-        summary_table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
-            # Data rows styling
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8fafc')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 11),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#374151')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
-        ]))
-        
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-        
-        # Recent rides table (limit to 20 most recent)
-        recent_rides = sorted(rides, key=lambda x: x.request_time, reverse=True)[:20]
-        rides_data = [['ID', 'Passenger', 'Driver', 'Destination', 'Fare', 'Status', 'Date']]
-        
-        for ride in recent_rides:
-            rides_data.append([
-                str(ride.id),
-                ride.passenger.username if ride.passenger else 'N/A',
-                ride.driver.name if ride.driver else 'N/A',
-                ride.dest_address[:30] + '...' if len(ride.dest_address) > 30 else ride.dest_address,
-                f"${float(ride.fare):.2f}",
-                ride.status,
-                to_eat(ride.request_time).strftime('%m/%d/%Y')
-            ])
-        
-        rides_table = Table(rides_data)
-        rides_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 8)
-        ]))
-        
-        story.append(rides_table)
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        from flask import make_response
-        response = make_response(buffer.getvalue())
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=ride_report_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.pdf'
-        
-        return response
+        job = db.session.get(ReportJob, job_id)
+        if job is None:
+            return jsonify({'error': 'Report job not found'}), 404
+        if job.status != 'done':
+            return jsonify({'error': f'Report is {job.status}'}), 409
+        
+        storage = get_storage_service()
+        local_path = storage.get_local_path(job.file_path)
+        if local_path is None:
+            return redirect(storage.get_private_url(job.file_path))
+        if not os.path.exists(local_path):
+            return jsonify({'error': 'Report file is no longer available'}), 410
+        return send_file(local_path, mimetype=CONTENT_TYPES[job.format],
+                         as_attachment=True, download_name=report_filename(job))
         
     except Exception as e:
-        current_app.logger.error(f"PDF export error: {str(e)}")
-        return jsonify({'error': 'Failed to generate PDF report'}), 500
-
-
-
+        return jsonify({'error': str(e)}), 500
@@ -6,8 +6,11 @@ Handles driver profile, availability, location updates, and earnings
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash
-from app.models import db, Driver, DriverLocation, DriverEarnings
+from app.models import db, Driver, DriverEarnings
 from app.services.push import register_device_token
+from app.services.location_store import location_store
+from app.services.assigner import assign_ride, RIDE_UNAVAILABLE, DRIVER_UNAVAILABLE
+from app.realtime.socket import issue_driver_token
 from app.models import Ride, ChatMessage
 from app.utils import handle_file_upload
 
@@ -68,6 +71,8 @@ def driver_login():
         'name': driver.name,
         'phone_number': driver.phone_number,
         'status': driver.status,
+        # Presented to the driver_join socket event
+        'socket_token': issue_driver_token(driver.id),
     }), 200
 
 
@@ -363,16 +368,9 @@ def update_location():
         return jsonify({'error': 'lat and lon are required'}), 400
     heading = data.get('heading')
     try:
-        record = DriverLocation.query.filter_by(driver_id=driver.id).first()
-        if not record:
-            record = DriverLocation(driver_id=driver.id, lat=lat, lon=lon, heading=heading)
-            db.session.add(record)
-        else:
-            record.lat = lat
-            record.lon = lon
-            record.heading = heading
-            record.updated_at = datetime.utcnow()
-        db.session.commit()
+        heading = float(heading) if heading is not None else None
+        # Buffered: applied to the location index now, written to DriverLocation in bulk
+        location_store.record(driver.id, lat, lon, heading)
         return jsonify({'message': 'Location updated'}), 200
     except Exception as e:
         db.session.rollback()
@@ -546,35 +544,22 @@ def accept_ride():
     if not ride:
         return jsonify({'error': 'Ride not found'}), 404
     
-    # Check if ride is still available
-    if ride.status != 'Requested':
-        return jsonify({'error': 'Ride is no longer available'}), 400
-    
-    # Check if driver is available
-    if driver.status != 'Available':
-        return jsonify({'error': 'Driver is not available'}), 400
-    
     try:
-        # Assign driver to ride
-        ride.driver_id = driver.id
-        ride.status = 'Assigned'
-        ride.assigned_time = datetime.now(timezone.utc)
-        
-        # Update driver status
-        driver.status = 'On Trip'
-        driver.current_lat = ride.pickup_lat
-        driver.current_lon = ride.pickup_lon
-        
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Ride accepted successfully',
-            'ride_id': ride.id
-        }), 200
+        # Atomic claim: only one concurrent accept can win the ride
+        failure = assign_ride(ride.id, driver.id)
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    
+    if failure == RIDE_UNAVAILABLE:
+        return jsonify({'error': 'Ride is no longer available'}), 400
+    if failure == DRIVER_UNAVAILABLE:
+        return jsonify({'error': 'Driver is not available'}), 400
+    
+    return jsonify({
+        'success': True,
+        'message': 'Ride accepted successfully',
+        'ride_id': ride.id
+    }), 200
 
 
 @driver_api.route('/decline-offer', methods=['POST'])
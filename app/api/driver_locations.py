@@ -3,8 +3,13 @@ Driver Locations API
 Get driver location data for map display
 """
 
-from flask import Blueprint, jsonify
-from app.models import db, DriverLocation
+import re
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request
+from app.models import Ride
+from app.services.location_store import location_store
+from app.services.location_history import get_trail
+from app.realtime.driver_feed import serialize_location
 from app.api import admin_required
 
 driver_locations = Blueprint('driver_locations', __name__, url_prefix='/api')
@@ -12,23 +17,98 @@ driver_locations = Blueprint('driver_locations', __name__, url_prefix='/api')
 @driver_locations.route('/driver-locations', methods=['GET'])
 @admin_required
 def get_driver_locations():
-    """Get all driver locations"""
+    """
+    Get driver locations
+
+    Without parameters returns every driver keyed by id. With since=<cursor>
+    returns {cursor, full, drivers, removed} holding only the drivers that
+    moved after the cursor; full is true when the cursor was not recognised
+    (e.g. server restart) and drivers is a complete snapshot instead.
+    """
     try:
-        locations = DriverLocation.query.all()
-        
-        # Convert to dictionary keyed by driver_id
-        locations_dict = {}
-        for loc in locations:
-            locations_dict[loc.driver_id] = {
-                'lat': float(loc.lat),
-                'lon': float(loc.lon),
-                'heading': float(loc.heading) if loc.heading else None,
-                'updated_at': loc.updated_at.isoformat() if loc.updated_at else None,
-            }
-        
-        return jsonify(locations_dict), 200
+        since = request.args.get('since', type=int)
+        if since is None:
+            # Includes positions still waiting in the write-behind buffer
+            locations = location_store.positions()
+            return jsonify({
+                driver_id: serialize_location(*position)
+                for driver_id, position in locations.items()
+            }), 200
+
+        cursor, changed, removed = location_store.changes_since(since)
+        full = changed is None
+        locations = location_store.positions(None if full else changed)
+        return jsonify({
+            'cursor': cursor,
+            'full': full,
+            'drivers': {
+                driver_id: serialize_location(*position)
+                for driver_id, position in locations.items()
+            },
+            'removed': removed,
+        }), 200
     except Exception as e:
         from flask import current_app
         current_app.logger.error(f"Error getting driver locations: {e}")
         return jsonify({'error': str(e)}), 500
 
+
+@driver_locations.route('/driver-locations/<int:driver_id>/trail', methods=['GET'])
+@admin_required
+def get_driver_trail(driver_id):
+    """
+    Get a driver's recorded trail
+
+    Query params: ride_id (uses the ride's assigned..end window) or
+    start/end (ISO-8601; an offset or Z is converted to UTC, none means UTC),
+    and resolution (seconds between points). Pings still in the write-behind
+    buffer (up to LOCATION_MAX_STALENESS_SECONDS old) are not included yet.
+    """
+    try:
+        ride_id = request.args.get('ride_id', type=int)
+        if ride_id:
+            ride = Ride.query.get(ride_id)
+            if not ride or ride.driver_id != driver_id:
+                return jsonify({'error': 'Ride not found for this driver'}), 404
+            start = ride.assigned_time or ride.request_time
+            end = ride.end_time or datetime.utcnow()
+        else:
+            start_arg = request.args.get('start')
+            end_arg = request.args.get('end')
+            if not start_arg:
+                return jsonify({'error': 'ride_id or start is required'}), 400
+            start = _parse_utc(start_arg)
+            end = _parse_utc(end_arg) if end_arg else datetime.utcnow()
+
+        resolution = request.args.get('resolution', type=int)
+        trail = get_trail(driver_id, start, end, resolution)
+        return jsonify({
+            'driver_id': driver_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'points': [
+                {
+                    'lat': p['lat'],
+                    'lon': p['lon'],
+                    'heading': p['heading'],
+                    'recorded_at': p['recorded_at'].isoformat(),
+                }
+                for p in trail
+            ],
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date: {e}'}), 400
+    except Exception as e:
+        from flask import current_app
+        current_app.logger.error(f"Error getting driver trail: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _parse_utc(value):
+    """Naive UTC datetime from ISO-8601 text, as stored in location history"""
+    # An unencoded '+' in a query string arrives as a space: '...T10:00:00 03:00'
+    value = re.sub(r'(T[\d:.]+) (\d\d:?\d\d)$', r'\1+\2', value.strip())
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -4,10 +4,11 @@ Driver-related API endpoints
 
 from flask import request, jsonify, current_app
 from sqlalchemy import func
-from app.models import db, Driver, Ride, Feedback
+from app.models import db, Driver, Ride, DriverStats
 from app.api import api, admin_required
 from app.utils import handle_file_upload
-from datetime import datetime
+from app.utils.csv_stream import csv_response, YIELD_PER
+from datetime import datetime, timedelta
 
 @api.route('/add-driver', methods=['POST'])
 @admin_required
@@ -155,7 +156,8 @@ def delete_driver():
         
         # Import related models
         from app.models import DriverEarnings, DriverLocation, RideOffer, Ride, DeviceToken, ChatMessage
-        from app.services.push import send_push_to_user
+        from app.services.push import send_push_to_user, token_cache
+        from app.services.location_store import location_store
         
         # Send push notification to driver before deletion (if they're logged in)
         try:
@@ -181,15 +183,20 @@ def delete_driver():
         # 4. Delete ride offers
         RideOffer.query.filter_by(driver_id=driver_id).delete()
         
-        # 5. Set driver_id to NULL for rides (since it's nullable) - this preserves ride history
+        # 5. Delete driver stats (the rides below stop counting towards them)
+        DriverStats.query.filter_by(driver_id=driver_id).delete()
+        
+        # 6. Set driver_id to NULL for rides (since it's nullable) - this preserves ride history
         Ride.query.filter_by(driver_id=driver_id).update({'driver_id': None})
         
-        # 6. Delete device tokens (after sending notification)
+        # 7. Delete device tokens (after sending notification)
         DeviceToken.query.filter_by(user_type='driver', user_id=driver_id).delete()
         
-        # 7. Finally delete the driver
+        # 8. Finally delete the driver
         db.session.delete(driver)
         db.session.commit()
+        location_store.discard(driver_id)
+        token_cache.invalidate('driver', driver_id)
         
         current_app.logger.info(f"Driver {driver_id} ({driver_uid}) deleted successfully")
         return jsonify({
@@ -221,15 +228,12 @@ def update_driver_status():
 def get_all_drivers():
     """Get all drivers with their average ratings"""
     try:
-        drivers = Driver.query.all()
+        drivers = db.session.query(Driver, DriverStats)\
+            .outerjoin(DriverStats, DriverStats.driver_id == Driver.id).all()
         drivers_data = []
         
-        for driver in drivers:
-            # Calculate average rating
-            avg_rating = db.session.query(func.avg(Feedback.rating)).join(Ride).filter(
-                Ride.driver_id == driver.id, 
-                Feedback.rating.isnot(None)
-            ).scalar() or 0
+        for driver, stats in drivers:
+            avg_rating = stats.avg_rating if stats else 0
             
             driver_info = {
                 'id': driver.id,
@@ -305,58 +309,48 @@ def get_available_drivers():
 @api.route('/drivers/export')
 @admin_required
 def export_drivers():
-    """Export drivers data to CSV"""
+    """Export drivers data to CSV, streamed from one joined query"""
     try:
-        import csv
-        import io
-        from flask import make_response
-        
-        drivers = Driver.query.all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'ID', 'Name', 'Phone', 'Vehicle Type', 'Vehicle Details', 
-            'License Info', 'Status', 'Rating', 'Total Rides', 'Total Earnings', 'Registration Date'
-        ])
-        
-        # Write data
-        for driver in drivers:
-            total_rides = Ride.query.filter_by(driver_id=driver.id, status='Completed').count()
-            total_earnings = db.session.query(func.sum(Ride.fare)).filter(
-                Ride.driver_id == driver.id, 
-                Ride.status == 'Completed'
-            ).scalar() or 0
-            
-            # Calculate average rating from feedback
-            avg_rating = db.session.query(func.avg(Feedback.rating)).join(Ride).filter(
-                Ride.driver_id == driver.id,
-                Feedback.rating.isnot(None)
-            ).scalar() or 0
-            
-            writer.writerow([
-                driver.id,
-                driver.name,
-                driver.phone_number,
-                driver.vehicle_type,
-                driver.vehicle_details,
-                driver.license_info,
-                driver.status,
+        drivers = db.session.query(
+            Driver.id,
+            Driver.name,
+            Driver.phone_number,
+            Driver.vehicle_type,
+            Driver.vehicle_details,
+            Driver.license_info,
+            Driver.status,
+            Driver.join_date,
+            DriverStats.completed_rides,
+            DriverStats.lifetime_fare,
+            DriverStats.rating_count,
+            DriverStats.rating_sum,
+        ).outerjoin(DriverStats, DriverStats.driver_id == Driver.id)\
+         .order_by(Driver.id)\
+         .yield_per(YIELD_PER)
+        
+        def to_row(d):
+            avg_rating = d.rating_sum / d.rating_count if d.rating_count else 0
+            return [
+                d.id,
+                d.name,
+                d.phone_number,
+                d.vehicle_type,
+                d.vehicle_details,
+                d.license_info,
+                d.status,
                 round(float(avg_rating), 1) if avg_rating else 0,
-                total_rides,
-                float(total_earnings),
-                driver.join_date.strftime('%Y-%m-%d %H:%M:%S') if driver.join_date else ''
-            ])
-        
-        output.seek(0)
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=drivers_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        return response
+                d.completed_rides or 0,
+                float(d.lifetime_fare or 0),
+                d.join_date.strftime('%Y-%m-%d %H:%M:%S') if d.join_date else ''
+            ]
+        
+        return csv_response(
+            ['ID', 'Name', 'Phone', 'Vehicle Type', 'Vehicle Details',
+             'License Info', 'Status', 'Rating', 'Total Rides', 'Total Earnings', 'Registration Date'],
+            drivers,
+            f'drivers_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            to_row
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -374,10 +368,8 @@ def get_driver_details(driver_id):
     week_start = now - timedelta(days=now.weekday())
 
     # Calculate statistics
-    total_earnings_all_time = db.session.query(func.sum(Ride.fare)).filter(
-        Ride.driver_id == driver_id, 
-        Ride.status == 'Completed'
-    ).scalar() or 0
+    driver_totals = DriverStats.query.get(driver_id)
+    total_earnings_all_time = driver_totals.lifetime_fare if driver_totals else 0
     
     weekly_earnings = db.session.query(func.sum(Ride.fare)).filter(
         Ride.driver_id == driver_id,
@@ -385,12 +377,8 @@ def get_driver_details(driver_id):
         Ride.request_time >= week_start
     ).scalar() or 0
     
-    avg_rating = db.session.query(func.avg(Feedback.rating)).join(Ride).filter(
-        Ride.driver_id == driver.id,
-        Feedback.rating.isnot(None)
-    ).scalar() or 0
-    
-    completed_rides = Ride.query.filter_by(driver_id=driver_id, status='Completed').count()
+    avg_rating = driver_totals.avg_rating if driver_totals else 0
+    completed_rides = driver_totals.completed_rides if driver_totals else 0
     
     stats = {
         'completed_rides': completed_rides,
@@ -480,11 +468,13 @@ def suggest_drivers():
             return jsonify({'error': 'Missing required fields'}), 400
         
         # Get available drivers of the requested vehicle type
-        available_drivers = Driver.query.filter(
-            Driver.status == 'Available',
-            Driver.vehicle_type == vehicle_type,
-            Driver.is_blocked == False
-        ).all()
+        available_drivers = db.session.query(Driver, DriverStats)\
+            .outerjoin(DriverStats, DriverStats.driver_id == Driver.id)\
+            .filter(
+                Driver.status == 'Available',
+                Driver.vehicle_type == vehicle_type,
+                Driver.is_blocked == False
+            ).all()
         
         if not available_drivers:
             return jsonify({
@@ -493,22 +483,28 @@ def suggest_drivers():
                 'message': 'No available drivers found'
             })
         
+        # Distance to pickup for every driver with a known location, in one batch
+        from app.services.location_store import location_store
+        from app.utils.distance import haversine_many
+        locations = location_store.positions([d.id for d, _ in available_drivers])
+        distances = {}
+        if locations:
+            ids = list(locations)
+            km = haversine_many(float(pickup_lat), float(pickup_lon),
+                                [locations[i][0] for i in ids], [locations[i][1] for i in ids])
+            distances = {driver_id: float(d) for driver_id, d in zip(ids, km)}
+        
         # Calculate driver scores and suggestions
         suggestions = []
-        for driver in available_drivers:
-            score = _calculate_driver_score(driver, pickup_lat, pickup_lon, vehicle_type)
-            
-            # Get driver's last ride for distance estimation
-            last_ride = Ride.query.filter_by(driver_id=driver.id).order_by(Ride.request_time.desc()).first()
+        for driver, stats in available_drivers:
+            score = _calculate_driver_score(driver, stats, vehicle_type)
+            last_ride_at = stats.last_ride_at if stats else None
             
-            # Estimate distance (simplified - in real app would use GPS)
             estimated_distance = "Unknown"
-            if last_ride:
-                # Simple distance estimation based on last known location
-                estimated_distance = "~2.5 km"  # Placeholder
+            if driver.id in distances:
+                estimated_distance = f"~{distances[driver.id]:.1f} km"
             
-            # Get driver rating
-            rating = _get_driver_rating(driver.id)
+            rating = _get_driver_rating(stats)
             
             suggestions.append({
                 'driver_id': driver.id,
@@ -520,8 +516,8 @@ def suggest_drivers():
                 'rating': rating,
                 'estimated_distance': estimated_distance,
                 'score': score,
-                'last_ride_time': last_ride.request_time.isoformat() if last_ride else None,
-                'total_rides': Ride.query.filter_by(driver_id=driver.id, status='Completed').count()
+                'last_ride_time': last_ride_at.isoformat() if last_ride_at else None,
+                'total_rides': stats.completed_rides if stats else 0
             })
         
         # Sort by score (highest first)
@@ -539,8 +535,8 @@ def suggest_drivers():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def _calculate_driver_score(driver, pickup_lat, pickup_lon, vehicle_type):
-    """Calculate driver suitability score (0-100)"""
+def _calculate_driver_score(driver, stats, vehicle_type):
+    """Calculate driver suitability score (0-100) from the driver's DriverStats row"""
     score = 50  # Base score
     
     # Vehicle type match (already filtered, but good to have)
@@ -548,7 +544,7 @@ def _calculate_driver_score(driver, pickup_lat, pickup_lon, vehicle_type):
         score += 20
     
     # Driver rating bonus
-    rating = _get_driver_rating(driver.id)
+    rating = _get_driver_rating(stats)
     if rating >= 4.5:
         score += 20
     elif rating >= 4.0:
@@ -559,17 +555,15 @@ def _calculate_driver_score(driver, pickup_lat, pickup_lon, vehicle_type):
         score += 5
     
     # Recent activity bonus (more recent = higher score)
-    last_ride = Ride.query.filter_by(driver_id=driver.id).order_by(Ride.request_time.desc()).first()
-    if last_ride:
-        from datetime import datetime, timezone, timedelta
-        time_diff = datetime.now(timezone.utc) - last_ride.request_time
+    if stats and stats.last_ride_at:
+        time_diff = datetime.utcnow() - stats.last_ride_at
         if time_diff < timedelta(hours=2):
             score += 10
         elif time_diff < timedelta(hours=6):
             score += 5
     
     # Total rides experience bonus
-    total_rides = Ride.query.filter_by(driver_id=driver.id, status='Completed').count()
+    total_rides = stats.completed_rides if stats else 0
     if total_rides >= 100:
         score += 10
     elif total_rides >= 50:
@@ -579,13 +573,6 @@ def _calculate_driver_score(driver, pickup_lat, pickup_lon, vehicle_type):
     
     return min(score, 100)  # Cap at 100
 
-def _get_driver_rating(driver_id):
-    """Get average rating for a driver"""
-    rating_result = db.session.query(func.avg(Feedback.rating)).join(
-        Ride, Feedback.ride_id == Ride.id
-    ).filter(
-        Ride.driver_id == driver_id,
-        Feedback.rating.isnot(None)
-    ).scalar()
-    
-    return round(float(rating_result or 0), 1)
+def _get_driver_rating(stats):
+    """Average rating from a DriverStats row (None for drivers without rides)"""
+    return round(float(stats.avg_rating), 1) if stats else 0
@@ -8,8 +8,9 @@ from flask_login import current_user
 from app.models import db, Passenger, Ride, Driver, SavedPlace, EmergencyAlert, ChatMessage
 from datetime import datetime, timedelta
 from sqlalchemy import or_, desc
-import math
 from app.utils import handle_file_upload
+from app.services.routing import get_route, NoRouteError
+from app.services.pricing import quote_fare, get_pricing
 from app.services.push import register_device_token
 
 passenger_api = Blueprint('passenger_api', __name__)
@@ -35,27 +36,13 @@ def test_route():
     """Test route to verify blueprint is working"""
     return jsonify({'message': 'Passenger API is working!', 'status': 'success'})
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
-
-def calculate_fare(distance_km, vehicle_type='Bajaj'):
+def calculate_fare(distance_km, vehicle_type='Bajaj', pricing=None):
     """Calculate fare based on distance and vehicle type"""
-    base_fare = 50.0 if vehicle_type == 'Bajaj' else 80.0
-    rate_per_km = 15.0 if vehicle_type == 'Bajaj' else 25.0
-    
-    fare = base_fare + (distance_km * rate_per_km)
-    return round(fare, 2)
+    return float(quote_fare(distance_km, vehicle_type, pricing))
+
+# Batch fare estimate limits
+MAX_ESTIMATE_DESTINATIONS = 10
+MAX_ESTIMATE_VEHICLE_TYPES = 5
 
 @passenger_api.route('/fare-estimate', methods=['POST'])
 def estimate_fare():
@@ -70,20 +57,73 @@ def estimate_fare():
         vehicle_type = data.get('vehicle_type', 'Bajaj')
         
         # Calculate distance
-        distance_km = calculate_distance(pickup_lat, pickup_lon, dest_lat, dest_lon)
+        try:
+            route = get_route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+        except NoRouteError:
+            return jsonify({'error': 'No route found between the locations'}), 400
         
         # Calculate fare
-        estimated_fare = calculate_fare(distance_km, vehicle_type)
+        estimated_fare = calculate_fare(route.distance_km, vehicle_type)
         
         return jsonify({
-            'distance_km': round(distance_km, 2),
+            'distance_km': round(route.distance_km, 2),
             'estimated_fare': estimated_fare,
-            'vehicle_type': vehicle_type
+            'vehicle_type': vehicle_type,
+            'route_provider': route.provider
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@passenger_api.route('/fare-estimates', methods=['POST'])
+def estimate_fares():
+    """
+    Batch fare estimate for the vehicle picker
+
+    Body: {pickup_lat, pickup_lon, destinations: [{lat, lon}, ...],
+    vehicle_types: [...]}. Each destination is routed once and priced for
+    every vehicle type with a single settings read.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        pickup_lat = float(data.get('pickup_lat'))
+        pickup_lon = float(data.get('pickup_lon'))
+        destinations = data.get('destinations') or []
+        vehicle_types = data.get('vehicle_types') or ['Bajaj', 'Car']
+        if not isinstance(destinations, list) or not destinations:
+            return jsonify({'error': 'destinations must be a non-empty list'}), 400
+        if len(destinations) > MAX_ESTIMATE_DESTINATIONS:
+            return jsonify({'error': f'At most {MAX_ESTIMATE_DESTINATIONS} destinations per request'}), 400
+        if not isinstance(vehicle_types, list) or len(vehicle_types) > MAX_ESTIMATE_VEHICLE_TYPES:
+            return jsonify({'error': f'vehicle_types must be a list of at most {MAX_ESTIMATE_VEHICLE_TYPES}'}), 400
+        
+        pricing = get_pricing()
+        estimates = []
+        for index, destination in enumerate(destinations):
+            dest_lat = float(destination.get('lat'))
+            dest_lon = float(destination.get('lon'))
+            estimate = {'destination_index': index, 'dest_lat': dest_lat, 'dest_lon': dest_lon}
+            try:
+                # Route distance does not depend on vehicle type; one lookup serves all
+                route = get_route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+            except NoRouteError:
+                estimate['error'] = 'No route found between the locations'
+                estimates.append(estimate)
+                continue
+            estimate['distance_km'] = round(route.distance_km, 2)
+            estimate['route_provider'] = route.provider
+            estimate['fares'] = {
+                vehicle_type: calculate_fare(route.distance_km, vehicle_type, pricing)
+                for vehicle_type in vehicle_types
+            }
+            estimates.append(estimate)
+        
+        return jsonify({'estimates': estimates}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 @passenger_api.route('/ride-request', methods=['POST'])
 def request_ride():
     """Submit a new ride request"""
@@ -114,47 +154,13 @@ def request_ride():
         db.session.add(new_ride)
         db.session.commit()
 
-        # Send push notifications to available drivers matching vehicle type
+        # Push, offers and dispatcher notification run on the work queue
         try:
-            from app.models import Driver, DeviceToken
-            from app.services.push import send_push_to_user
-            
-            # Find available drivers matching the vehicle type
-            matching_drivers = Driver.query.filter(
-                Driver.status.in_(['Available', 'Online']),
-                Driver.vehicle_type == new_ride.vehicle_type
-            ).all()
-            
-            # Send push notification to each matching driver
-            for driver in matching_drivers:
-                try:
-                    notification_message = f"New ride request: {new_ride.pickup_address or 'Pickup location'} to {new_ride.dest_address}"
-                    send_push_to_user(
-                        'driver',
-                        driver.id,
-                        'New Ride Available',
-                        notification_message,
-                        {
-                            'type': 'new_ride_request',
-                            'ride_id': new_ride.id,
-                            'vehicle_type': new_ride.vehicle_type,
-                            'fare': float(new_ride.fare),
-                        }
-                    )
-                except Exception as e:
-                    from flask import current_app
-                    current_app.logger.error(f"Failed to send push to driver {driver.id}: {e}")
+            from app.services.ride_fanout import fan_out_new_ride
+            fan_out_new_ride(new_ride.id)
         except Exception as e:
             from flask import current_app
-            current_app.logger.error(f"Failed to send ride notifications: {e}")
-
-        # Broadcast offers to nearby drivers (non-blocking best-effort)
-        try:
-            from app.services.assigner import broadcast_offers
-            broadcast_offers(new_ride)
-        except Exception as e:
-            # Log but do not fail request
-            print(f"Broadcast offers failed: {e}")
+            current_app.logger.error(f"Failed to queue ride fan-out for ride {new_ride.id}: {e}")
 
         return jsonify({
             'ride_id': new_ride.id,
@@ -233,6 +239,13 @@ def cancel_ride():
         ride.status = 'Cancelled'
         db.session.commit()
         
+        try:
+            from app.services.assigner import withdraw_offers
+            withdraw_offers(ride.id)
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.error(f"Failed to withdraw offers for ride {ride.id}: {e}")
+        
         return jsonify({'message': 'Ride cancelled successfully'}), 200
         
     except Exception as e:
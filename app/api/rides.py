@@ -3,12 +3,15 @@ Ride-related API endpoints
 """
 
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime, timezone
+from datetime import datetime, timedelta
 from flask import request, jsonify, current_app
 from flask_login import current_user
 from app.models import db, Driver, Ride, Passenger
-from app.api import api, admin_required, passenger_required, limiter, get_setting
-import requests
+from app.api import api, admin_required, passenger_required, limiter
+from app.services.routing import get_route, NoRouteError
+from app.services.pricing import quote_fare
+from app.utils import to_eat
+from app.utils.csv_stream import csv_response, YIELD_PER
 
 @api.route('/ride-request', methods=['POST'])
 @passenger_required
@@ -87,30 +90,13 @@ def request_ride():
     db.session.add(new_ride)
     db.session.commit()
     
-    # Emit SocketIO notification for new ride
+    # Dispatcher notification runs on the work queue
     try:
-        from app.utils.socket_utils import emit_new_ride_notification
-        
-        # Get passenger name for notification
-        passenger_name = current_user.username if current_user.username else f"Passenger #{current_user.id}"
-        
-        ride_notification_data = {
-            'ride_id': new_ride.id,
-            'passenger_name': passenger_name,
-            'passenger_phone': getattr(current_user, 'phone_number', 'N/A'),
-            'pickup_address': pickup_address or 'Location not specified',
-            'dest_address': dest_address,
-            'fare': float(fare),
-            'vehicle_type': vehicle_type,
-            'payment_method': payment_method,
-            'distance_km': float(distance_km),
-            'request_time': new_ride.request_time.isoformat()
-        }
-        
-        emit_new_ride_notification(ride_notification_data)
-        
+        from app.services.ride_fanout import notify_dispatchers_of_ride
+        from app.services.work_queue import work_queue
+        work_queue.submit('dispatcher_notify', notify_dispatchers_of_ride, new_ride.id)
     except Exception as e:
-        current_app.logger.error(f"Failed to emit ride notification: {e}")
+        current_app.logger.error(f"Failed to queue ride notification: {e}")
         # Don't fail the ride creation if notification fails
     
     return jsonify({'message': 'Ride requested successfully', 'ride_id': new_ride.id}), 201
@@ -147,17 +133,13 @@ def assign_ride():
         if ride.vehicle_type and driver.vehicle_type != ride.vehicle_type:
             return jsonify({'error': f'Driver vehicle type ({driver.vehicle_type}) does not match ride vehicle type ({ride.vehicle_type})'}), 400
 
-        # Assign driver to ride
-        ride.driver_id = driver.id
-        ride.status = 'Assigned'
-        ride.assigned_time = datetime.now(timezone.utc)
-        
-        # Update driver status
-        driver.status = 'On Trip'
-        driver.current_lat = ride.pickup_lat
-        driver.current_lon = ride.pickup_lon
-        
-        db.session.commit()
+        # Atomic claim so a driver accept racing this request cannot double-assign
+        from app.services.assigner import assign_ride, RIDE_UNAVAILABLE
+        failure = assign_ride(ride.id, driver.id)
+        if failure == RIDE_UNAVAILABLE:
+            return jsonify({'error': 'Ride was just assigned to another driver'}), 409
+        if failure:
+            return jsonify({'error': 'Driver is not available'}), 400
         return jsonify({'success': True, 'message': 'Ride assigned successfully'})
         
     except Exception as e:
@@ -207,6 +189,12 @@ def cancel_ride():
         message = 'Ride canceled successfully'
 
     db.session.commit()
+    if not is_reassign:
+        try:
+            from app.services.assigner import withdraw_offers
+            withdraw_offers(ride.id)
+        except Exception as e:
+            current_app.logger.error(f"Failed to withdraw offers for ride {ride.id}: {e}")
     return jsonify({'message': message})
 
 @api.route('/ride-status/<int:ride_id>')
@@ -238,6 +226,72 @@ def get_ride_status(ride_id):
         'ride_details': ride_details
     })
 
+@api.route('/rides/export')
+@admin_required
+def export_rides():
+    """Export every ride to CSV, streamed; optional start_date/end_date (YYYY-MM-DD) and status filters"""
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        status = request.args.get('status')
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    try:
+        query = db.session.query(
+            Ride.id,
+            Ride.request_time,
+            Ride.status,
+            Passenger.username.label('passenger_name'),
+            Passenger.phone_number.label('passenger_phone'),
+            Driver.name.label('driver_name'),
+            Ride.vehicle_type,
+            Ride.pickup_address,
+            Ride.dest_address,
+            Ride.distance_km,
+            Ride.fare,
+            Ride.payment_method,
+            Ride.rating,
+        ).join(Passenger, Ride.passenger_id == Passenger.id)\
+         .outerjoin(Driver, Ride.driver_id == Driver.id)
+        
+        if start_dt:
+            query = query.filter(Ride.request_time >= start_dt)
+        if end_dt:
+            query = query.filter(Ride.request_time < end_dt)
+        if status:
+            query = query.filter(Ride.status == status)
+        
+        rides = query.order_by(Ride.id).yield_per(YIELD_PER)
+        
+        return csv_response(
+            ['Ride ID', 'Requested At (EAT)', 'Status', 'Passenger', 'Passenger Phone', 'Driver',
+             'Vehicle Type', 'Pickup', 'Destination', 'Distance (km)', 'Fare', 'Payment Method', 'Rating'],
+            rides,
+            f'rides_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            lambda r: [
+                r.id,
+                to_eat(r.request_time).strftime('%Y-%m-%d %H:%M:%S') if r.request_time else '',
+                r.status,
+                r.passenger_name,
+                r.passenger_phone,
+                r.driver_name or '',
+                r.vehicle_type,
+                r.pickup_address or '',
+                r.dest_address,
+                float(r.distance_km or 0),
+                float(r.fare or 0),
+                r.payment_method,
+                r.rating or ''
+            ]
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Ride export error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/fare-estimate', methods=['POST'])
 def fare_estimate():
     """Calculate fare estimate based on pickup and destination"""
@@ -277,47 +331,21 @@ def fare_estimate():
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid coordinate format'}), 400
         
-        # Get pricing settings
-        base_fare = Decimal(get_setting('base_fare', '25'))
-        per_km_rates = {
-            "Bajaj": Decimal(get_setting('per_km_bajaj', '8')),
-            "Car": Decimal(get_setting('per_km_car', '12'))
-        }
         vehicle_type = data.get('vehicle_type', 'Bajaj')
-        per_km_rate = per_km_rates.get(vehicle_type, per_km_rates['Bajaj'])
-        
-        # Call OSRM routing service
-        osrm_url = (f"http://router.project-osrm.org/route/v1/driving/"
-                    f"{pickup_lon},{pickup_lat};{dest_lon},{dest_lat}?overview=false")
         
+        # Cached route, live router, or offline model when the router is down
         try:
-            response = requests.get(osrm_url, timeout=15)
-            response.raise_for_status()
-            
-            route_data = response.json()
-            if 'routes' not in route_data or not route_data['routes']:
-                return jsonify({'error': 'No route found between the locations'}), 400
-            
-            distance_meters = route_data['routes'][0]['distance']
-            distance_km = Decimal(str(distance_meters / 1000.0))
-            
-        except requests.exceptions.Timeout:
-            return jsonify({'error': 'Route calculation timed out. Please try again.'}), 503
-        except requests.exceptions.ConnectionError:
-            return jsonify({'error': 'Unable to connect to routing service. Please try again later.'}), 503
-        except requests.exceptions.RequestException as e:
-            current_app.logger.error(f"OSRM request failed: {str(e)}")
-            return jsonify({'error': 'Route service temporarily unavailable'}), 503
-        except (KeyError, IndexError, TypeError) as e:
-            current_app.logger.error(f"OSRM response parsing failed: {str(e)}")
-            return jsonify({'error': 'Invalid route response'}), 500
+            route = get_route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+        except NoRouteError:
+            return jsonify({'error': 'No route found between the locations'}), 400
         
-        # Calculate fare
-        fare = (base_fare + (distance_km * per_km_rate)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        distance_km = Decimal(str(route.distance_km))
+        fare = quote_fare(distance_km, vehicle_type)
         
         return jsonify({
             'distance_km': float(distance_km.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)),
-            'estimated_fare': float(fare)
+            'estimated_fare': float(fare),
+            'route_provider': route.provider
         })
         
     except Exception as e:
@@ -34,6 +34,9 @@ class Passenger(UserMixin, db.Model):
     blocked_reason = db.Column(db.String(255), nullable=True)
     blocked_at = db.Column(db.DateTime, nullable=True)
 
+    # Directory search matches usernames case-insensitively by prefix
+    __table_args__ = (db.Index('ix_passenger_username_lower', db.func.lower(username)),)
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -63,6 +66,9 @@ class Driver(db.Model):
     is_blocked = db.Column(db.Boolean, default=False, nullable=False, index=True)
     blocked_reason = db.Column(db.String(255), nullable=True)
     blocked_at = db.Column(db.DateTime, nullable=True)
+
+    # Ride history search matches driver names case-insensitively by prefix
+    __table_args__ = (db.Index('ix_driver_name_lower', db.func.lower(name)),)
     
     def check_password(self, password):
         """Check if provided password matches"""
@@ -94,6 +100,15 @@ class Ride(db.Model):
     rating = db.Column(db.Integer, nullable=True)  # Passenger rating (1-5)
     feedback = db.Column(db.String(500), nullable=True)  # Passenger feedback text
 
+    # Keyset pagination of ride history seeks on (request_time, id), optionally per filter
+    __table_args__ = (
+        db.Index('ix_ride_request_time_id', 'request_time', 'id'),
+        db.Index('ix_ride_status_request_time_id', 'status', 'request_time', 'id'),
+        db.Index('ix_ride_vehicle_type_request_time_id', 'vehicle_type', 'request_time', 'id'),
+        db.Index('ix_ride_driver_request_time_id', 'driver_id', 'request_time', 'id'),
+        db.Index('ix_ride_passenger_request_time_id', 'passenger_id', 'request_time', 'id'),
+    )
+
     passenger = db.relationship('Passenger', backref=db.backref('rides', lazy=True))
     driver = db.relationship('Driver', backref=db.backref('rides', lazy=True))
 
@@ -195,8 +210,24 @@ class DriverLocation(db.Model):
     heading = db.Column(db.Float, nullable=True)
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now(), index=True)
 
+    # Composite index for bounding-box prefilter in nearby search
+    __table_args__ = (db.Index('ix_driver_location_lat_lon', 'lat', 'lon'),)
+
     driver = db.relationship('Driver', backref=db.backref('location', uselist=False))
 
+class DriverLocationHistory(db.Model):
+    """Append-only GPS trail; coordinates in microdegrees, bucketed by UTC day for cheap purges"""
+    __tablename__ = 'driver_location_history'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    driver_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Integer, nullable=False, index=True)  # yyyymmdd (UTC)
+    recorded_at = db.Column(db.DateTime, nullable=False)
+    lat_e6 = db.Column(db.Integer, nullable=False)
+    lon_e6 = db.Column(db.Integer, nullable=False)
+    heading = db.Column(db.SmallInteger, nullable=True)  # whole degrees
+
+    __table_args__ = (db.Index('ix_driver_location_history_driver_time', 'driver_id', 'recorded_at'),)
+
 class RideOffer(db.Model):
     """Broadcast offers to drivers; first acceptance wins"""
     __tablename__ = 'ride_offer'
@@ -207,12 +238,42 @@ class RideOffer(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
     expires_at = db.Column(db.DateTime, nullable=True, index=True)
     accepted_at = db.Column(db.DateTime, nullable=True)
+    wave = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 0-based offer ring
 
     __table_args__ = (db.UniqueConstraint('ride_id', 'driver_id', name='_ride_driver_offer_uc'),)
 
     ride = db.relationship('Ride', backref=db.backref('offers', lazy=True))
     driver = db.relationship('Driver', backref=db.backref('offers', lazy=True))
 
+class RideDailyRollup(db.Model):
+    """Ride counts, fare and rating sums per EAT day, vehicle type, status and payment method"""
+    __tablename__ = 'ride_daily_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)  # EAT calendar day of request_time
+    vehicle_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    payment_method = db.Column(db.String(20), nullable=False)
+    ride_count = db.Column(db.Integer, nullable=False, default=0)
+    fare_sum = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('day', 'vehicle_type', 'status', 'payment_method', name='_ride_daily_rollup_uc'),)
+
+class DriverStats(db.Model):
+    """Per-driver ride and rating totals, kept current by app/services/driver_stats.py"""
+    __tablename__ = 'driver_stats'
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'), primary_key=True)
+    completed_rides = db.Column(db.Integer, nullable=False, default=0)
+    lifetime_fare = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # Fares of completed rides
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    last_ride_at = db.Column(db.DateTime, nullable=True)  # request_time of the latest ride given to the driver
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
 class ChatMessage(db.Model):
     """Per-ride chat between passenger and driver"""
     __tablename__ = 'chat_message'
@@ -295,4 +356,20 @@ class DispatcherMessage(db.Model):
     is_read = db.Column(db.Boolean, default=False, nullable=False, index=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
     
-    sender_admin = db.relationship('Admin', foreign_keys=[sender_admin_id], backref=db.backref('dispatcher_messages', lazy=True))
\ No newline at end of file
+    sender_admin = db.relationship('Admin', foreign_keys=[sender_admin_id], backref=db.backref('dispatcher_messages', lazy=True))
+
+class ReportJob(db.Model):
+    """Queued PDF/Excel report builds; finished files are reused for identical parameters"""
+    __tablename__ = 'report_job'
+    id = db.Column(db.Integer, primary_key=True)
+    params_hash = db.Column(db.String(64), nullable=False, index=True)  # sha256 of format + date range
+    format = db.Column(db.String(10), nullable=False)  # pdf, excel
+    start_date = db.Column(db.DateTime, nullable=False)  # UTC, inclusive
+    end_date = db.Column(db.DateTime, nullable=False)  # UTC, inclusive
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    file_path = db.Column(db.String(255), nullable=True)  # storage path/key once done
+    error = db.Column(db.String(500), nullable=True)
+    requested_by = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
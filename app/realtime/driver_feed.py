@@ -0,0 +1,86 @@
+"""
+Live driver map feed for dispatchers.
+
+Once per interval the feed asks the location store which drivers moved since
+its last cursor, quantizes their positions and emits a single
+`driver_locations_delta` message to the `dispatchers` room. Drivers whose
+quantized position did not change (GPS jitter) are left out.
+"""
+
+from typing import Dict, Optional
+
+from app import socketio
+from app.services.location_store import location_store
+
+# 5 decimal places is roughly 1 m, well below what the dashboard map can show
+COORD_PRECISION = 5
+
+
+def serialize_location(lat, lon, heading, updated_at) -> dict:
+    """Quantized wire format shared by the feed and the HTTP endpoint"""
+    return {
+        'lat': round(float(lat), COORD_PRECISION),
+        'lon': round(float(lon), COORD_PRECISION),
+        'heading': int(round(heading)) % 360 if heading is not None else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+    }
+
+
+class DriverLocationFeed:
+    """Batches position changes into one dispatcher message per tick"""
+
+    def __init__(self):
+        self._app = None
+        self._cursor: Optional[int] = None
+        self._last_sent: Dict[int, tuple] = {}
+        self._started = False
+        self.interval = 2.0
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config.get('LOCATION_FEED_INTERVAL_SECONDS', 2.0)
+        if self.interval and not self._started:
+            self._started = True
+            socketio.start_background_task(self._run)
+
+    def tick(self):
+        """Emit one delta message if any driver moved since the last tick"""
+        if self._cursor is None:
+            self._cursor = location_store.cursor()
+            return None
+        cursor, changed, removed = location_store.changes_since(self._cursor)
+        self._cursor = cursor
+        if changed is None:
+            changed = list(location_store.positions())
+        if not changed and not removed:
+            return None
+
+        drivers = {}
+        for driver_id, position in location_store.positions(changed).items():
+            payload = serialize_location(*position)
+            key = (payload['lat'], payload['lon'], payload['heading'])
+            if self._last_sent.get(driver_id) == key:
+                continue
+            self._last_sent[driver_id] = key
+            drivers[driver_id] = payload
+        for driver_id in removed:
+            self._last_sent.pop(driver_id, None)
+        if not drivers and not removed:
+            return None
+
+        message = {'cursor': cursor, 'drivers': drivers, 'removed': removed}
+        socketio.emit('driver_locations_delta', message, room='dispatchers')
+        return message
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                with self._app.app_context():
+                    self.tick()
+            except Exception as e:
+                self._app.logger.error(f"Driver location feed tick failed: {e}")
+
+
+# Process-wide feed started by the app factory
+driver_feed = DriverLocationFeed()
@@ -2,11 +2,36 @@
 Realtime Socket handlers and helpers
 """
 
-from flask import request
+from datetime import datetime
+from typing import Optional
+from flask import request, session, current_app
 from flask_socketio import emit, join_room, leave_room
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from app import socketio
-from app.models import db, ChatMessage
-from app.services.assigner import accept_offer
+from app.models import db, ChatMessage, Driver
+
+# Upper bound on points accepted in one batched driver_location message
+MAX_LOCATION_POINTS = 100
+DRIVER_TOKEN_SALT = 'driver-socket'
+
+
+def _driver_token_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=DRIVER_TOKEN_SALT)
+
+
+def issue_driver_token(driver_id: int) -> str:
+    """Signed token a driver's socket presents to driver_join (returned by driver login)"""
+    return _driver_token_serializer().dumps(driver_id)
+
+
+def _driver_from_token(token) -> Optional[int]:
+    """Driver id from a valid, unexpired token, else None"""
+    try:
+        return int(_driver_token_serializer().loads(
+            token, max_age=current_app.config.get('DRIVER_SOCKET_TOKEN_MAX_AGE_SECONDS', 7 * 86400)
+        ))
+    except (BadSignature, TypeError, ValueError):
+        return None
 
 
 @socketio.on('join_dispatcher_room')
@@ -19,16 +44,88 @@ def handle_join_dispatcher_room():
 
 @socketio.on('driver_join')
 def handle_driver_join(data):
-    """Driver joins personal room to receive offers and updates"""
-    try:
-        driver_id = int(data.get('driver_id'))
-    except Exception:
-        emit('error', {'error': 'driver_id required'})
+    """
+    Driver authenticates the socket with {token} from login and joins their room
+
+    The driver id is bound to this socket's server-side session; later driver
+    events act for that driver whatever driver_id their payload carries.
+    """
+    driver_id = _driver_from_token((data or {}).get('token'))
+    driver = Driver.query.get(driver_id) if driver_id else None
+    if driver is None or driver.is_blocked:
+        emit('error', {'error': 'valid driver token required'})
         return
+    previous = session.get('socket_driver_id')
+    if previous is not None and previous != driver_id:
+        leave_room(f'driver:{previous}')
+    session['socket_driver_id'] = driver_id
     join_room(f'driver:{driver_id}')
     emit('joined', {'room': f'driver:{driver_id}'})
 
 
+def _parse_location_point(point):
+    """Validate one {lat, lon, heading?, ts?} point; ts is epoch seconds/ms or ISO-8601"""
+    lat = float(point['lat'])
+    lon = float(point['lon'])
+    if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        raise ValueError('coordinates out of range')
+    heading = point.get('heading')
+    heading = float(heading) if heading is not None else None
+    now = datetime.utcnow()
+    ts = point.get('ts')
+    if ts is None:
+        recorded_at = now
+    elif isinstance(ts, (int, float)):
+        recorded_at = datetime.utcfromtimestamp(ts / 1000.0 if ts > 1e11 else ts)
+    else:
+        recorded_at = datetime.fromisoformat(str(ts).replace('Z', '+00:00'))
+        if recorded_at.tzinfo is not None:
+            recorded_at = datetime.utcfromtimestamp(recorded_at.timestamp())
+    # Never trust device clocks ahead of the server
+    return lat, lon, heading, min(recorded_at, now)
+
+
+@socketio.on('driver_location')
+def handle_driver_location(data):
+    """
+    Stream driver positions over the driver's socket.
+
+    Accepts a single point {lat, lon, heading, ts} or a batch
+    {points: [{lat, lon, heading, ts}, ...]} for the driver the socket
+    authenticated as in driver_join; a driver_id in the payload is ignored.
+    Every point goes to location history; the newest becomes the driver's
+    current location.
+    """
+    driver_id = session.get('socket_driver_id')
+    if driver_id is None:
+        return {'ok': False, 'error': 'driver_join with a token first'}
+    if not isinstance(data, dict):
+        return {'ok': False, 'error': 'invalid payload'}
+
+    raw_points = data.get('points')
+    if raw_points is None:
+        raw_points = [data]
+    if not isinstance(raw_points, list) or not raw_points:
+        return {'ok': False, 'error': 'points must be a non-empty list'}
+
+    points = []
+    for raw in raw_points[:MAX_LOCATION_POINTS]:
+        try:
+            points.append(_parse_location_point(raw))
+        except Exception:
+            continue
+    if not points:
+        return {'ok': False, 'error': 'no valid points'}
+
+    try:
+        from app.services.location_store import location_store
+        location_store.record_many(driver_id, points)
+    except Exception as e:
+        db.session.rollback()
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, 'accepted': len(points)}
+
+
 @socketio.on('join_ride_room')
 def handle_join_ride_room(data):
     try:
@@ -93,6 +190,22 @@ def emit_ride_offer(driver_id: int, offer: dict):
         pass
 
 
+def emit_offer_cancelled(driver_id: int, ride_id: int, reason: str):
+    """Helper: tell a driver an offer is gone (expired, taken or ride_cancelled)"""
+    try:
+        socketio.emit('offer_cancelled', {'ride_id': ride_id, 'reason': reason}, room=f'driver:{driver_id}')
+    except Exception:
+        pass
+
+
+def emit_ride_unmatched(ride_id: int, waves: int):
+    """Helper: tell dispatchers a ride ran out of offer waves without a driver"""
+    try:
+        socketio.emit('ride_unmatched', {'ride_id': ride_id, 'waves': waves}, room='dispatchers')
+    except Exception:
+        pass
+
+
 @socketio.on('accept_offer')
 def handle_accept_offer(data):
     """Driver accepts an offer: try atomic assignment"""
@@ -103,6 +216,8 @@ def handle_accept_offer(data):
         emit('accept_offer_result', {'ok': False, 'error': 'ride_id and driver_id required'})
         return
     try:
+        # Imported here: the assigner imports this module for emit_ride_offer
+        from app.services.assigner import accept_offer
         ok = accept_offer(ride_id, driver_id)
         emit('accept_offer_result', {'ok': ok, 'ride_id': ride_id})
         if not ok:
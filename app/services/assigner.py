@@ -1,46 +1,98 @@
 """
-Driver assignment service: nearby search, broadcast offers, atomic accept
+Driver assignment service: nearby search, broadcast offers, atomic assignment
 """
 
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from flask import current_app
+from sqlalchemy import select
 from app.models import db, DriverLocation, Driver, Ride, RideOffer
-from app.realtime.socket import emit_ride_offer
-
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    from math import radians, sin, cos, asin, sqrt
-    R = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    return R * c
-
-
-def find_nearby_drivers(lat: float, lon: float, radius_km: float = 5.0, limit: int = 5):
-    """Return top-N nearby online drivers from DriverLocation and Driver.status"""
-    # Simple approach: fetch recent locations and filter in Python by distance
-    # For production, move to geospatial index or query
-    q = db.session.query(DriverLocation, Driver).join(Driver, Driver.id == DriverLocation.driver_id)
-    q = q.filter(Driver.status == 'Online')
-    candidates = []
-    for loc, driver in q.all():
-        dist = haversine_km(lat, lon, loc.lat, loc.lon)
-        if dist <= radius_km:
-            candidates.append((dist, driver))
-    candidates.sort(key=lambda x: x[0])
-    return [drv for _, drv in candidates[:limit]]
-
-
-def broadcast_offers(ride: Ride, radius_km: float = 5.0, limit: int = 5, ttl_seconds: int = 25):
-    """Create RideOffer rows and emit offers to drivers"""
+from app.realtime.socket import emit_ride_offer, emit_offer_cancelled, emit_ride_unmatched
+from app.services.geo_index import driver_index
+from app.services.offer_scheduler import offer_scheduler
+from app.services import ride_rollup, driver_stats
+from app.utils.distance import haversine_km, haversine_many, bounding_box  # noqa: F401
+
+ONLINE_STATUSES = ['Available', 'Online']
+# Ride statuses a driver may still claim
+ASSIGNABLE_STATUSES = ['Requested', 'Pending', 'pending_offer']
+
+# assign_ride failure reasons
+RIDE_UNAVAILABLE = 'ride_unavailable'
+DRIVER_UNAVAILABLE = 'driver_unavailable'
+
+
+def find_nearby_drivers(lat: float, lon: float, radius_km: float = 5.0, limit: int = 5, exclude_ids=None):
+    """Return top-N nearby online drivers using the in-memory location index"""
+    max_age = current_app.config.get('DRIVER_LOCATION_MAX_AGE_SECONDS', 300)
+    exclude_ids = set(exclude_ids or ())
+    if not driver_index.ready:
+        return _find_nearby_drivers_sql(lat, lon, radius_km, limit, max_age, exclude_ids)
+    candidates = [
+        c for c in driver_index.nearby(lat, lon, radius_km, max_age_seconds=max_age)
+        if c[1] not in exclude_ids
+    ]
+    if not candidates:
+        return []
+    # Index holds positions only; availability still comes from Driver.status
+    ids = [driver_id for _, driver_id in candidates]
+    drivers = {
+        d.id: d for d in Driver.query.filter(
+            Driver.id.in_(ids),
+            Driver.status.in_(ONLINE_STATUSES)
+        ).all()
+    }
+    ranked = [drivers[driver_id] for _, driver_id in candidates if driver_id in drivers]
+    return ranked[:limit]
+
+
+def _find_nearby_drivers_sql(lat: float, lon: float, radius_km: float, limit: int, max_age: int, exclude_ids=()):
+    """Fallback when the index is not built: bounding box in SQL, exact ranking in Python"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    rows = db.session.query(DriverLocation.lat, DriverLocation.lon, Driver).join(
+        Driver, Driver.id == DriverLocation.driver_id
+    ).filter(
+        DriverLocation.lat.between(min_lat, max_lat),
+        DriverLocation.lon.between(min_lon, max_lon),
+        DriverLocation.updated_at >= cutoff,
+        Driver.status.in_(ONLINE_STATUSES)
+    ).all()
+    if not rows:
+        return []
+    distances = haversine_many(lat, lon, [r[0] for r in rows], [r[1] for r in rows])
+    ranked = sorted(
+        ((float(dist), r[2]) for dist, r in zip(distances, rows)
+         if dist <= radius_km and r[2].id not in exclude_ids),
+        key=lambda x: x[0]
+    )
+    return [drv for _, drv in ranked[:limit]]
+
+
+def broadcast_offers(ride: Ride, radius_km: float = None, limit: int = None, ttl_seconds: int = None, wave: int = 0):
+    """
+    Create RideOffer rows for one wave, emit them and schedule the wave's expiry
+
+    Each later wave multiplies the radius and driver limit by the configured
+    growth factors and skips drivers the ride was already offered to.
+    """
+    config = current_app.config
+    if radius_km is None:
+        radius_km = config.get('OFFER_RADIUS_KM', 5.0) * config.get('OFFER_RADIUS_GROWTH', 2.0) ** wave
+    if limit is None:
+        limit = int(config.get('OFFER_LIMIT', 5) * config.get('OFFER_LIMIT_GROWTH', 2.0) ** wave)
+    if ttl_seconds is None:
+        ttl_seconds = config.get('OFFER_TTL_SECONDS', 25)
     expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-    drivers = find_nearby_drivers(ride.pickup_lat, ride.pickup_lon, radius_km, limit)
+    already_offered = {
+        row[0] for row in db.session.query(RideOffer.driver_id).filter(RideOffer.ride_id == ride.id).all()
+    }
+    drivers = find_nearby_drivers(ride.pickup_lat, ride.pickup_lon, radius_km, limit, exclude_ids=already_offered)
     for d in drivers:
-        offer = RideOffer(ride_id=ride.id, driver_id=d.id, status='pending', expires_at=expires_at)
+        offer = RideOffer(ride_id=ride.id, driver_id=d.id, status='pending', expires_at=expires_at, wave=wave)
         db.session.add(offer)
     db.session.commit()
+    # Schedule even an empty wave so the next, wider ring is tried on time
+    offer_scheduler.schedule(ride.id, expires_at, wave)
     # Emit to each driver
     for d in drivers:
         emit_ride_offer(d.id, {
@@ -57,28 +109,130 @@ def broadcast_offers(ride: Ride, radius_km: float = 5.0, limit: int = 5, ttl_sec
         })
 
 
-def accept_offer(ride_id: int, driver_id: int) -> bool:
-    """Atomic accept: assign ride if still unassigned and mark offers"""
-    # Step 1: ensure ride exists and is assignable
-    ride: Ride = Ride.query.filter(Ride.id == ride_id).with_for_update().first()
-    if not ride or ride.status not in ['Requested', 'pending_offer'] or (ride.driver_id is not None):
-        return False
-    # Step 2: set driver and status
-    ride.driver_id = driver_id
-    ride.status = 'Assigned'
-    ride.assigned_time = datetime.utcnow()
-    # Step 3: mark offers
-    offer = RideOffer.query.filter_by(ride_id=ride_id, driver_id=driver_id).first()
-    if offer:
-        offer.status = 'accepted'
-        offer.accepted_at = datetime.utcnow()
-    # Expire others
-    RideOffer.query.filter(and_(RideOffer.ride_id == ride_id, RideOffer.driver_id != driver_id)).update({
-        RideOffer.status: 'expired'
-    })
+def _close_pending_offers(ride_id: int, exclude_driver_id: int = None):
+    """Mark a ride's pending offers expired; returns the affected driver ids. Caller commits."""
+    query = RideOffer.query.filter(RideOffer.ride_id == ride_id, RideOffer.status == 'pending')
+    if exclude_driver_id is not None:
+        query = query.filter(RideOffer.driver_id != exclude_driver_id)
+    driver_ids = [row[0] for row in query.with_entities(RideOffer.driver_id).all()]
+    if driver_ids:
+        query.update({RideOffer.status: 'expired'}, synchronize_session=False)
+    return driver_ids
+
+
+def expire_offer_wave(ride_id: int, wave: int):
+    """Scheduler callback: a wave timed out; expire it and offer the next ring if still unassigned"""
+    losers = _close_pending_offers(ride_id)
     db.session.commit()
-    return True
+    for driver_id in losers:
+        emit_offer_cancelled(driver_id, ride_id, 'expired')
 
+    ride = Ride.query.get(ride_id)
+    if not ride or ride.status != 'Requested' or ride.driver_id is not None:
+        return
+    max_waves = current_app.config.get('OFFER_MAX_WAVES', 3)
+    if wave + 1 >= max_waves:
+        emit_ride_unmatched(ride_id, max_waves)
+        return
+    broadcast_offers(ride, wave=wave + 1)
 
 
+def withdraw_offers(ride_id: int, reason: str = 'ride_cancelled'):
+    """Expire every pending offer for a ride and stop its offer waves"""
+    offer_scheduler.cancel(ride_id)
+    losers = _close_pending_offers(ride_id)
+    db.session.commit()
+    for driver_id in losers:
+        emit_offer_cancelled(driver_id, ride_id, reason)
+
+
+def _claim_ride(ride_id: int, driver_id: int, now: datetime):
+    """
+    Single conditional UPDATE giving an unassigned ride to a driver
+
+    On PostgreSQL the same statement returns the status the ride left and the
+    columns the rollup needs (UPDATE ... FROM ... RETURNING; the FROM
+    subquery locks the row, so that status is the one the UPDATE replaced).
+    RETURNING elsewhere only sees the new row, so other databases read the
+    row under SELECT ... FOR UPDATE (SQLite's write lock does the same) and
+    then run the UPDATE; either way the conditional UPDATE decides the claim.
+
+    Returns:
+        Row of (status before the claim, request_time, vehicle_type,
+        payment_method, fare, rating), or None if the ride can no longer be claimed
+    """
+    claimable = (Ride.id == ride_id, Ride.status.in_(ASSIGNABLE_STATUSES), Ride.driver_id.is_(None))
+    values = {'driver_id': driver_id, 'status': 'Assigned', 'assigned_time': now}
+    if db.engine.dialect.name == 'postgresql':
+        previous = select(Ride.id, Ride.status).where(Ride.id == ride_id).with_for_update().subquery('previous')
+        return db.session.execute(
+            Ride.__table__.update()
+            .where(*claimable, Ride.id == previous.c.id)
+            .values(values)
+            .returning(previous.c.status, Ride.request_time, Ride.vehicle_type,
+                       Ride.payment_method, Ride.fare, Ride.rating)
+        ).first()
+    current = db.session.query(
+        Ride.status, Ride.request_time, Ride.vehicle_type, Ride.payment_method, Ride.fare, Ride.rating
+    ).filter(*claimable).with_for_update().first()
+    if current is None:
+        return None
+    claimed = db.session.execute(Ride.__table__.update().where(*claimable).values(values)).rowcount
+    return current if claimed == 1 else None
+
 
+def assign_ride(ride_id: int, driver_id: int):
+    """
+    Atomically give a ride to a driver; the one path used by driver accepts,
+    the accept_offer socket event and admin assignment
+
+    Two conditional UPDATEs in one transaction claim the ride (still
+    assignable, no driver) and the driver (still online, flipped to On Trip);
+    their rowcounts decide the outcome, so concurrent callers cannot both pass
+    a stale read. The driver's offer is marked accepted and sibling offers
+    expired before the single commit.
+
+    Returns:
+        None on success, otherwise RIDE_UNAVAILABLE or DRIVER_UNAVAILABLE
+    """
+    now = datetime.utcnow()
+    try:
+        previous = _claim_ride(ride_id, driver_id, now)
+        if previous is None:
+            db.session.rollback()
+            return RIDE_UNAVAILABLE
+        ride_rollup.record_status_change(ride_id, previous.status, 'Assigned', previous)
+        driver_stats.record_assignment(ride_id, driver_id, previous.request_time)
+        pickup = db.session.query(Ride).filter(Ride.id == ride_id)
+        claimed = Driver.query.filter(
+            Driver.id == driver_id,
+            Driver.status.in_(ONLINE_STATUSES),
+        ).update({
+            Driver.status: 'On Trip',
+            Driver.current_lat: pickup.with_entities(Ride.pickup_lat).scalar_subquery(),
+            Driver.current_lon: pickup.with_entities(Ride.pickup_lon).scalar_subquery(),
+        }, synchronize_session=False)
+        if claimed != 1:
+            db.session.rollback()
+            return DRIVER_UNAVAILABLE
+        RideOffer.query.filter(
+            RideOffer.ride_id == ride_id,
+            RideOffer.driver_id == driver_id,
+        ).update({
+            RideOffer.status: 'accepted',
+            RideOffer.accepted_at: now,
+        }, synchronize_session=False)
+        losers = _close_pending_offers(ride_id, exclude_driver_id=driver_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    offer_scheduler.cancel(ride_id)
+    for loser_id in losers:
+        emit_offer_cancelled(loser_id, ride_id, 'taken')
+    return None
+
+
+def accept_offer(ride_id: int, driver_id: int) -> bool:
+    """First accept wins; True if this driver got the ride"""
+    return assign_ride(ride_id, driver_id) is None
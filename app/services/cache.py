@@ -0,0 +1,175 @@
+"""
+In-process LRU + TTL cache with optional SQLite backing.
+
+Entries live in an OrderedDict (least recently used first) and expire after
+a fixed TTL. When a backing file is configured every write is mirrored to a
+small SQLite table, and memory misses fall through to it, so warm entries
+survive restarts.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class SQLiteBacking:
+    """Key/value table in a local SQLite file; keys and values are stored as JSON"""
+
+    def __init__(self, path: str, table: str = 'cache'):
+        self._lock = threading.Lock()
+        self._table = table
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"DELETE FROM {table} WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, key: str):
+        """Return (value, expires_at) or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table}")
+            self._conn.commit()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl_seconds after being set"""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 300, backing: Optional[SQLiteBacking] = None):
+        self._lock = threading.Lock()
+        # key -> (expires_at epoch seconds, value)
+        self._data: OrderedDict = OrderedDict()
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.backing = backing
+        # key -> lock held while one caller computes a missing value
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.backing_hits = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+        if self.backing is not None:
+            stored = self.backing.get(self._backing_key(key))
+            if stored is not None:
+                value, expires_at = stored
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self.hits += 1
+                    self.backing_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.backing is not None:
+            self.backing.set(self._backing_key(key), value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        """Insert as most recently used and evict beyond maxsize; caller holds the lock"""
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Cached value, or compute() stored under key
+
+        Single-flight: concurrent callers missing the same key wait for the
+        first one's result instead of all computing it.
+
+        Returns:
+            tuple: (value, was_cached)
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value, True
+        with self._lock:
+            flight = self._flights.setdefault(key, threading.Lock())
+        with flight:
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > time.time():
+                    return entry[1], True
+            try:
+                value = compute()
+                self.set(key, value)
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+        return value, False
+
+    def delete(self, key: Hashable):
+        """Invalidate key in memory and in the backing file, so a miss cannot reload it"""
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backing is not None:
+            self.backing.delete(self._backing_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.backing is not None:
+            self.backing.clear()
+
+    @staticmethod
+    def _backing_key(key) -> str:
+        return json.dumps(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'backing_hits': self.backing_hits,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'persistent': self.backing is not None,
+        }
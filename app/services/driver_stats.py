@@ -0,0 +1,123 @@
+"""
+Incrementally maintained driver_stats table.
+
+A ride counts towards its driver's completed rides and lifetime fare while
+its status is Completed, towards the rating totals while it has a rating,
+and moves last_ride_at forward when it is given to the driver. Deltas come
+from the same Ride change tracking as the daily rollup and are upserted in
+the flush that writes the ride. assign_ride's bulk UPDATE calls
+record_assignment() itself.
+
+last_ride_at only moves forward: unassigning a ride does not roll it back.
+The migration that creates the table fills it from existing rides;
+rebuild() recomputes everything from the ride table
+(scripts/rebuild_driver_stats.py).
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict
+
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import db, Ride, DriverStats
+from app.services.ride_rollup import ride_changes, upsert_increments
+
+KEY_COLUMNS = ('driver_id',)
+SUM_COLUMNS = ('completed_rides', 'lifetime_fare', 'rating_count', 'rating_sum')
+LATEST_COLUMNS = ('last_ride_at',)
+
+
+def _add(deltas: Dict, values: dict, sign: int):
+    """Add (sign=1) or remove (sign=-1) one ride's contribution to its driver"""
+    driver_id = values['driver_id']
+    if driver_id is None:
+        return
+    completed = values['status'] == 'Completed'
+    rating = values['rating']
+    current = deltas.setdefault(driver_id, [0, Decimal('0'), 0, 0, None])
+    current[0] += sign * (1 if completed else 0)
+    current[1] += sign * (Decimal(str(values['fare'] or 0)) if completed else 0)
+    current[2] += sign * (1 if rating else 0)
+    current[3] += sign * (rating or 0)
+    if sign > 0:
+        ride_time = values['request_time'] or datetime.utcnow()
+        if current[4] is None or ride_time > current[4]:
+            current[4] = ride_time
+
+
+def apply_deltas(connection, deltas: Dict):
+    """Upsert per-driver deltas into driver_stats on the given connection"""
+    rows = [
+        dict(zip(KEY_COLUMNS + SUM_COLUMNS + LATEST_COLUMNS, (driver_id,) + tuple(sums)))
+        for driver_id, sums in deltas.items() if any(sums)
+    ]
+    upsert_increments(connection, DriverStats.__table__, KEY_COLUMNS, SUM_COLUMNS, rows, LATEST_COLUMNS)
+
+
+def record_assignment(ride_id: int, driver_id: int, request_time=None):
+    """Move last_ride_at after a bulk UPDATE gave a ride to a driver (request_time is read if not given)"""
+    if request_time is None:
+        request_time = db.session.query(Ride.request_time).filter(Ride.id == ride_id).scalar()
+    deltas = {}
+    _add(deltas, {'driver_id': driver_id, 'status': None, 'fare': None, 'rating': None,
+                  'request_time': request_time}, 1)
+    apply_deltas(db.session.connection(), deltas)
+
+
+def rebuild() -> int:
+    """
+    Recompute every driver_stats row with one GROUP BY over ride; commits
+
+    Returns:
+        int: Number of drivers written
+    """
+    table = DriverStats.__table__
+    is_completed = Ride.status == 'Completed'
+    source = select(
+        Ride.driver_id,
+        func.count(case((is_completed, 1))),
+        func.coalesce(func.sum(case((is_completed, Ride.fare))), 0),
+        func.count(Ride.rating),
+        func.coalesce(func.sum(Ride.rating), 0),
+        func.max(Ride.request_time),
+    ).where(Ride.driver_id.isnot(None)).group_by(Ride.driver_id)
+    try:
+        db.session.execute(table.delete())
+        written = db.session.execute(
+            table.insert().from_select(list(KEY_COLUMNS + SUM_COLUMNS + LATEST_COLUMNS), source)
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return written
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_driver_deltas(session, flush_context, instances):
+    """Turn pending Ride writes into per-driver deltas"""
+    deltas = {}
+    for old, new in ride_changes(session):
+        if old is not None:
+            _add(deltas, old, -1)
+        if new is not None:
+            _add(deltas, new, 1)
+    if deltas:
+        session.info.setdefault('driver_stats_deltas', []).append(deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_driver_deltas(session, flush_context):
+    pending = session.info.pop('driver_stats_deltas', None)
+    if not pending:
+        return
+    connection = session.connection()
+    for deltas in pending:
+        apply_deltas(connection, deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_driver_deltas(session):
+    session.info.pop('driver_stats_deltas', None)
@@ -0,0 +1,136 @@
+"""
+In-memory spatial index of driver positions for nearby search.
+
+The database (DriverLocation) remains the source of truth: the index is a
+process-local mirror that is rebuilt from it on startup and kept current by
+location updates, so radius queries only touch the grid cells around the
+search point instead of every online driver.
+"""
+
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.utils.distance import haversine_many, KM_PER_DEG_LAT
+
+
+class DriverGridIndex:
+    """Uniform lat/lon grid; each cell holds the ids of drivers positioned inside it"""
+
+    def __init__(self, cell_size_km: float = 1.0):
+        self._lock = threading.RLock()
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        # driver_id -> (lat, lon, heading, updated_at, cell)
+        self._positions: Dict[int, Tuple[float, float, Optional[float], Optional[datetime], Tuple[int, int]]] = {}
+        self.cell_deg = cell_size_km / KM_PER_DEG_LAT
+        self.ready = False
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg)))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def update(self, driver_id: int, lat: float, lon: float, heading: Optional[float] = None,
+               updated_at: Optional[datetime] = None):
+        """Insert or move a driver"""
+        cell = self._cell_of(lat, lon)
+        with self._lock:
+            previous = self._positions.get(driver_id)
+            if previous and previous[4] != cell:
+                self._discard_from_cell(driver_id, previous[4])
+            self._cells.setdefault(cell, set()).add(driver_id)
+            self._positions[driver_id] = (lat, lon, heading, updated_at or datetime.utcnow(), cell)
+
+    def update_if_newer(self, driver_id: int, lat: float, lon: float, heading: Optional[float] = None,
+                        updated_at: Optional[datetime] = None) -> bool:
+        """update() unless the indexed position is newer than updated_at; returns True if applied"""
+        with self._lock:
+            previous = self._positions.get(driver_id)
+            if previous and updated_at and previous[3] and previous[3] > updated_at:
+                return False
+            self.update(driver_id, lat, lon, heading, updated_at)
+            return True
+
+    def remove(self, driver_id: int):
+        """Drop a driver from the index (e.g. account deleted)"""
+        with self._lock:
+            previous = self._positions.pop(driver_id, None)
+            if previous:
+                self._discard_from_cell(driver_id, previous[4])
+
+    def _discard_from_cell(self, driver_id: int, cell: Tuple[int, int]):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(driver_id)
+            if not members:
+                del self._cells[cell]
+
+    def get(self, driver_id: int):
+        """Return (lat, lon, heading, updated_at) for a driver, or None"""
+        entry = self._positions.get(driver_id)
+        return entry[:4] if entry else None
+
+    def snapshot(self) -> Dict[int, tuple]:
+        """Return {driver_id: (lat, lon, heading, updated_at)} for every indexed driver"""
+        with self._lock:
+            return {driver_id: entry[:4] for driver_id, entry in self._positions.items()}
+
+    def nearby(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None,
+               max_age_seconds: Optional[int] = None) -> List[Tuple[float, int]]:
+        """Return (distance_km, driver_id) pairs within radius, closest first; skips stale positions"""
+        lat_span = int(math.ceil(radius_km / (self.cell_deg * KM_PER_DEG_LAT)))
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        lon_span = int(math.ceil(radius_km / (self.cell_deg * KM_PER_DEG_LAT * cos_lat)))
+        center_lat, center_lon = self._cell_of(lat, lon)
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds) if max_age_seconds else None
+
+        ids, lats, lons = [], [], []
+        with self._lock:
+            for i in range(center_lat - lat_span, center_lat + lat_span + 1):
+                for j in range(center_lon - lon_span, center_lon + lon_span + 1):
+                    for driver_id in self._cells.get((i, j), ()):
+                        d_lat, d_lon, _, updated_at, _ = self._positions[driver_id]
+                        if cutoff and updated_at and updated_at < cutoff:
+                            continue
+                        ids.append(driver_id)
+                        lats.append(d_lat)
+                        lons.append(d_lon)
+        if not ids:
+            return []
+        distances = haversine_many(lat, lon, lats, lons)
+        results = sorted(
+            (float(dist), driver_id) for dist, driver_id in zip(distances, ids) if dist <= radius_km
+        )
+        return results[:limit] if limit is not None else results
+
+    def rebuild(self):
+        """Replace the index contents with the rows currently in DriverLocation"""
+        from app.models import db, DriverLocation
+        rows = db.session.query(
+            DriverLocation.driver_id,
+            DriverLocation.lat,
+            DriverLocation.lon,
+            DriverLocation.heading,
+            DriverLocation.updated_at,
+        ).all()
+        with self._lock:
+            self._cells = {}
+            self._positions = {}
+            for driver_id, lat, lon, heading, updated_at in rows:
+                self.update(driver_id, lat, lon, heading, updated_at)
+            self.ready = True
+        return len(rows)
+
+
+# Process-wide index shared by the API and the assignment service
+driver_index = DriverGridIndex()
+
+
+def init_driver_index(app):
+    """Size the grid from config and warm it from the database"""
+    driver_index.cell_deg = app.config.get('DRIVER_INDEX_CELL_KM', 1.0) / KM_PER_DEG_LAT
+    with app.app_context():
+        count = driver_index.rebuild()
+    app.logger.info(f"Driver location index built with {count} drivers")
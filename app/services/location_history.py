@@ -0,0 +1,96 @@
+"""
+Driver location history: compact append-only trail of every GPS ping.
+
+Rows are written in batches by the location store's flush task, so
+capturing history adds nothing to the ping request itself. Each row carries
+its UTC day bucket (yyyymmdd) so retention is a range delete on an indexed
+integer rather than a scan over timestamps.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.models import db, DriverLocationHistory
+
+COORD_SCALE = 1_000_000
+INSERT_CHUNK_SIZE = 1000
+
+
+def day_bucket(moment: datetime) -> int:
+    """yyyymmdd integer for a UTC datetime"""
+    return moment.year * 10000 + moment.month * 100 + moment.day
+
+
+def to_row(driver_id: int, lat: float, lon: float, heading: Optional[float], recorded_at: datetime) -> dict:
+    """Encode one ping into the compact history row format"""
+    return {
+        'driver_id': driver_id,
+        'day': day_bucket(recorded_at),
+        'recorded_at': recorded_at,
+        'lat_e6': int(round(lat * COORD_SCALE)),
+        'lon_e6': int(round(lon * COORD_SCALE)),
+        'heading': int(round(heading)) % 360 if heading is not None else None,
+    }
+
+
+def write_rows(rows: List[dict]):
+    """Bulk insert encoded rows; caller owns the commit"""
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.bulk_insert_mappings(DriverLocationHistory, rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def get_trail(driver_id: int, start: datetime, end: datetime,
+              resolution_seconds: Optional[int] = None) -> List[dict]:
+    """
+    Return a driver's trail between start and end, oldest first
+
+    Args:
+        driver_id: driver to look up
+        start, end: UTC window (e.g. a ride's assigned_time .. end_time)
+        resolution_seconds: keep at most one point per interval of this length
+
+    Returns:
+        list: [{'lat', 'lon', 'heading', 'recorded_at'}, ...]
+    """
+    query = db.session.query(
+        DriverLocationHistory.recorded_at,
+        DriverLocationHistory.lat_e6,
+        DriverLocationHistory.lon_e6,
+        DriverLocationHistory.heading,
+    ).filter(
+        DriverLocationHistory.driver_id == driver_id,
+        DriverLocationHistory.day.between(day_bucket(start), day_bucket(end)),
+        DriverLocationHistory.recorded_at >= start,
+        DriverLocationHistory.recorded_at <= end,
+    ).order_by(DriverLocationHistory.recorded_at)
+
+    trail = []
+    last_bucket = None
+    for recorded_at, lat_e6, lon_e6, heading in query.yield_per(1000):
+        if resolution_seconds:
+            bucket = int((recorded_at - start).total_seconds() // resolution_seconds)
+            if bucket == last_bucket:
+                continue
+            last_bucket = bucket
+        trail.append({
+            'lat': lat_e6 / COORD_SCALE,
+            'lon': lon_e6 / COORD_SCALE,
+            'heading': heading,
+            'recorded_at': recorded_at,
+        })
+    return trail
+
+
+def purge_before(day: int) -> int:
+    """Delete every history row in day buckets older than day (yyyymmdd)"""
+    deleted = db.session.query(DriverLocationHistory).filter(
+        DriverLocationHistory.day < day
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def purge_expired(retention_days: int) -> int:
+    """Drop history older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return purge_before(day_bucket(cutoff))
@@ -0,0 +1,247 @@
+"""
+Driver location store with a write-behind buffer.
+
+GPS pings are applied to the in-memory driver index immediately and
+acknowledged; the latest position per driver is kept in a pending buffer
+that a background task flushes to DriverLocation in bulk. Every ping is
+also queued for the location history table and written in the same flush.
+Readers go through this module so they see buffered positions before they
+reach the database. Each position change also advances a per-process
+sequence number, which lets live feeds ask for only the drivers that moved
+since a cursor.
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.models import db, DriverLocation
+from app.services.geo_index import driver_index
+from app.services import location_history
+
+FLUSH_CHUNK_SIZE = 500
+# Hard cap on unflushed history rows so a database outage cannot exhaust memory
+MAX_PENDING_HISTORY = 50000
+PURGE_INTERVAL_SECONDS = 3600
+
+
+class LocationStore:
+    """Latest position per driver, written behind to DriverLocation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, dict] = {}
+        self._history: List[dict] = []
+        # Change tracking: cursors start at process start time (epoch ms) so a
+        # cursor issued by an earlier process is always detected as stale
+        self._base_seq = int(time.time() * 1000)
+        self._seq = self._base_seq
+        self._changed: Dict[int, int] = {}
+        self._removed: Dict[int, int] = {}
+        self._oldest_pending: Optional[float] = None
+        self._wake = threading.Event()
+        self._app = None
+        self._started = False
+        self.write_behind = True
+        self.flush_interval = 2.0
+        self.max_staleness = 10.0
+        self.history_enabled = True
+        self.history_retention_days = 30
+        self._last_purge = 0.0
+
+    def init_app(self, app):
+        """Read buffer settings from config and start the flush task"""
+        self._app = app
+        self.write_behind = app.config.get('LOCATION_WRITE_BEHIND', True)
+        self.flush_interval = app.config.get('LOCATION_FLUSH_INTERVAL_SECONDS', 2.0)
+        self.max_staleness = app.config.get('LOCATION_MAX_STALENESS_SECONDS', 10.0)
+        self.history_enabled = app.config.get('LOCATION_HISTORY_ENABLED', True)
+        self.history_retention_days = app.config.get('LOCATION_HISTORY_RETENTION_DAYS', 30)
+        if self.write_behind and not self._started:
+            self._started = True
+            from app import socketio
+            socketio.start_background_task(self._run)
+            atexit.register(self.flush)
+
+    def record(self, driver_id: int, lat: float, lon: float, heading: Optional[float] = None,
+               updated_at: Optional[datetime] = None):
+        """Accept a position; visible to readers immediately, persisted on the next flush"""
+        self.record_many(driver_id, [(lat, lon, heading, updated_at or datetime.utcnow())])
+
+    def record_many(self, driver_id: int, points: List[tuple]):
+        """
+        Accept several (lat, lon, heading, recorded_at) points for one driver
+
+        All points go to history; the newest becomes the driver's current position
+        unless the driver already has a newer one (a delayed offline batch).
+        """
+        if not points:
+            return
+        lat, lon, heading, updated_at = max(points, key=lambda p: p[3])
+        is_latest = driver_index.update_if_newer(driver_id, lat, lon, heading, updated_at)
+        entry = {'lat': lat, 'lon': lon, 'heading': heading, 'updated_at': updated_at}
+        history = [location_history.to_row(driver_id, *p) for p in points] if self.history_enabled else []
+        if is_latest:
+            with self._lock:
+                self._seq += 1
+                self._changed[driver_id] = self._seq
+                self._removed.pop(driver_id, None)
+        if not self.write_behind:
+            self._write({driver_id: entry} if is_latest else {}, history)
+            return
+        with self._lock:
+            current = self._pending.get(driver_id)
+            if is_latest and (current is None or current['updated_at'] <= updated_at):
+                self._pending[driver_id] = entry
+            self._queue_history(history)
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            overdue = time.monotonic() - self._oldest_pending >= self.max_staleness
+        if overdue:
+            self._wake.set()
+
+    def discard(self, driver_id: int):
+        """Forget a driver entirely (account deleted); drops any unflushed ping"""
+        with self._lock:
+            self._pending.pop(driver_id, None)
+            self._seq += 1
+            self._changed.pop(driver_id, None)
+            self._removed[driver_id] = self._seq
+        driver_index.remove(driver_id)
+
+    def cursor(self) -> int:
+        """Current change sequence number"""
+        return self._seq
+
+    def changes_since(self, cursor: int):
+        """
+        Drivers whose position changed after cursor
+
+        Returns:
+            tuple: (new_cursor, changed_driver_ids, removed_driver_ids); changed
+            is None when the cursor is unknown to this process and the caller
+            needs a full snapshot
+        """
+        with self._lock:
+            current = self._seq
+            if cursor < self._base_seq or cursor > current:
+                return current, None, []
+            changed = [d for d, seq in self._changed.items() if seq > cursor]
+            removed = [d for d, seq in self._removed.items() if seq > cursor]
+        return current, changed, removed
+
+    def positions(self, driver_ids: Optional[Iterable[int]] = None) -> Dict[int, tuple]:
+        """Return {driver_id: (lat, lon, heading, updated_at)} including unflushed pings"""
+        wanted = set(driver_ids) if driver_ids is not None else None
+        if driver_index.ready:
+            snapshot = driver_index.snapshot()
+            if wanted is None:
+                return snapshot
+            return {d: snapshot[d] for d in wanted if d in snapshot}
+
+        query = db.session.query(
+            DriverLocation.driver_id, DriverLocation.lat, DriverLocation.lon,
+            DriverLocation.heading, DriverLocation.updated_at
+        )
+        if wanted is not None:
+            query = query.filter(DriverLocation.driver_id.in_(wanted))
+        result = {row[0]: tuple(row[1:]) for row in query.all()}
+        with self._lock:
+            for driver_id, entry in self._pending.items():
+                if wanted is None or driver_id in wanted:
+                    result[driver_id] = (entry['lat'], entry['lon'], entry['heading'], entry['updated_at'])
+        return result
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _queue_history(self, rows: List[dict]):
+        """Append history rows, dropping the oldest beyond the cap; caller holds the lock"""
+        self._history.extend(rows)
+        overflow = len(self._history) - MAX_PENDING_HISTORY
+        if overflow > 0:
+            del self._history[:overflow]
+
+    def flush(self):
+        """Write all pending positions to DriverLocation"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            history, self._history = self._history, []
+            self._oldest_pending = None
+        if not batch and not history:
+            return 0
+        try:
+            if self._app is not None:
+                with self._app.app_context():
+                    self._write(batch, history)
+                    db.session.remove()
+            else:
+                self._write(batch, history)
+        except Exception as e:
+            # Put the batch back unless a newer ping arrived meanwhile
+            with self._lock:
+                for driver_id, entry in batch.items():
+                    self._pending.setdefault(driver_id, entry)
+                self._history, newer = history, self._history
+                self._queue_history(newer)
+                if self._pending and self._oldest_pending is None:
+                    self._oldest_pending = time.monotonic()
+            if self._app is not None:
+                self._app.logger.error(f"Driver location flush failed: {e}")
+            return 0
+        return len(batch)
+
+    def _write(self, batch: Dict[int, dict], history: Optional[List[dict]] = None):
+        """Bulk upsert: one SELECT per chunk for existing rows, then bulk update/insert"""
+        driver_ids = list(batch)
+        try:
+            if history:
+                location_history.write_rows(history)
+            for start in range(0, len(driver_ids), FLUSH_CHUNK_SIZE):
+                chunk = driver_ids[start:start + FLUSH_CHUNK_SIZE]
+                existing = dict(db.session.query(DriverLocation.driver_id, DriverLocation.id).filter(
+                    DriverLocation.driver_id.in_(chunk)
+                ).all())
+                updates, inserts = [], []
+                for driver_id in chunk:
+                    row = dict(batch[driver_id], driver_id=driver_id)
+                    if driver_id in existing:
+                        row['id'] = existing[driver_id]
+                        updates.append(row)
+                    else:
+                        inserts.append(row)
+                if updates:
+                    db.session.bulk_update_mappings(DriverLocation, updates)
+                if inserts:
+                    db.session.bulk_insert_mappings(DriverLocation, inserts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _run(self):
+        """Background flush loop"""
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if self.history_retention_days and time.monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                self.purge_history()
+
+    def purge_history(self):
+        """Drop location history past the retention window"""
+        try:
+            with self._app.app_context():
+                deleted = location_history.purge_expired(self.history_retention_days)
+                db.session.remove()
+            if deleted:
+                self._app.logger.info(f"Purged {deleted} driver location history rows")
+        except Exception as e:
+            self._app.logger.error(f"Driver location history purge failed: {e}")
+
+
+# Process-wide store used by the driver API and realtime handlers
+location_store = LocationStore()
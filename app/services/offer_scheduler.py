@@ -0,0 +1,127 @@
+"""
+Offer expiry scheduler.
+
+Keeps a min-heap of offer-wave deadlines, one live entry per ride, so the
+background task only ever touches rides whose wave is due instead of
+scanning ride_offer. When a wave times out the assigner expires its offers
+and, if the ride is still unassigned, offers it to a wider ring of drivers,
+which schedules the next deadline here.
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+EPOCH = datetime(1970, 1, 1)
+# Upper bound on how long the loop sleeps when the heap is empty
+IDLE_SLEEP_SECONDS = 5.0
+
+
+def _timestamp(moment: datetime) -> float:
+    """Naive UTC datetime to epoch seconds"""
+    return (moment - EPOCH).total_seconds()
+
+
+class OfferScheduler:
+    """Heap of (deadline, ride_id, wave); cancelled or superseded entries are skipped lazily"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, int]] = []
+        # ride_id -> (deadline, wave) of the entry that is still live
+        self._active: Dict[int, Tuple[float, int]] = {}
+        self._wake = threading.Event()
+        self._app = None
+        self._started = False
+
+    def __len__(self):
+        return len(self._active)
+
+    def init_app(self, app):
+        """Reload pending offers from the database and start the expiry task"""
+        self._app = app
+        if self._started:
+            return
+        self._started = True
+        try:
+            with app.app_context():
+                count = self.rebuild()
+            app.logger.info(f"Offer scheduler loaded {count} rides with pending offers")
+        except Exception as e:
+            app.logger.warning(f"Could not load pending offers: {e}")
+        from app import socketio
+        socketio.start_background_task(self._run)
+
+    def schedule(self, ride_id: int, expires_at: datetime, wave: int):
+        """Set (or replace) the deadline of a ride's current offer wave"""
+        deadline = _timestamp(expires_at)
+        with self._lock:
+            self._active[ride_id] = (deadline, wave)
+            heapq.heappush(self._heap, (deadline, ride_id, wave))
+            earliest = self._heap[0][1] == ride_id
+        if earliest:
+            self._wake.set()
+
+    def cancel(self, ride_id: int):
+        """Stop tracking a ride (assigned or cancelled)"""
+        with self._lock:
+            self._active.pop(ride_id, None)
+
+    def next_deadline(self) -> Optional[float]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[int, int]]:
+        """Remove and return (ride_id, wave) for every live entry whose deadline has passed"""
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, ride_id, wave = heapq.heappop(self._heap)
+                if self._active.get(ride_id) == (deadline, wave):
+                    del self._active[ride_id]
+                    due.append((ride_id, wave))
+        return due
+
+    def rebuild(self) -> int:
+        """Replace the heap with one entry per ride that still has pending offers"""
+        from app.models import db, RideOffer
+        rows = db.session.query(
+            RideOffer.ride_id,
+            func.max(RideOffer.wave),
+            func.max(RideOffer.expires_at),
+        ).filter(
+            RideOffer.status == 'pending'
+        ).group_by(RideOffer.ride_id).all()
+        with self._lock:
+            self._heap = []
+            self._active = {}
+        now = datetime.utcnow()
+        for ride_id, wave, expires_at in rows:
+            self.schedule(ride_id, expires_at or now, wave or 0)
+        return len(rows)
+
+    def _run(self):
+        """Background loop: sleep until the next deadline, then expire due waves"""
+        from app.models import db
+        from app.services.assigner import expire_offer_wave
+        while True:
+            deadline = self.next_deadline()
+            timeout = IDLE_SLEEP_SECONDS if deadline is None else min(IDLE_SLEEP_SECONDS, max(0.0, deadline - time.time()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+            for ride_id, wave in self.pop_due():
+                try:
+                    with self._app.app_context():
+                        expire_offer_wave(ride_id, wave)
+                        db.session.remove()
+                except Exception as e:
+                    self._app.logger.error(f"Offer expiry failed for ride {ride_id}: {e}")
+
+
+# Process-wide scheduler used by the assigner
+offer_scheduler = OfferScheduler()
@@ -0,0 +1,28 @@
+"""
+Fare pricing shared by every fare estimate endpoint
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+
+DEFAULT_VEHICLE_TYPE = 'Bajaj'
+
+
+def get_pricing() -> dict:
+    """Base fare and per-km rate per vehicle type from settings"""
+    from app.api import get_setting
+    return {
+        'base_fare': Decimal(get_setting('base_fare', '25')),
+        'per_km': {
+            'Bajaj': Decimal(get_setting('per_km_bajaj', '8')),
+            'Car': Decimal(get_setting('per_km_car', '12')),
+        },
+    }
+
+
+def quote_fare(distance_km, vehicle_type: str = DEFAULT_VEHICLE_TYPE, pricing: Optional[dict] = None) -> Decimal:
+    """Fare for a distance, rounded to cents; unknown vehicle types use the Bajaj rate"""
+    pricing = pricing or get_pricing()
+    per_km_rate = pricing['per_km'].get(vehicle_type, pricing['per_km'][DEFAULT_VEHICLE_TYPE])
+    fare = pricing['base_fare'] + Decimal(str(distance_km)) * per_km_rate
+    return fare.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -1,16 +1,164 @@
 """
 Push notification service (FCM)
-This is a placeholder implementation; wire real FCM credentials to send.
+
+Sending goes through a pluggable PushTransport chosen by PUSH_TRANSPORT:
+'log' (default placeholder), 'fake' (records messages, for tests) or 'fcm'
+(firebase_admin). Batch sends resolve every target's tokens with one query
+through a TTL token cache and send multicast batches of up to 500 tokens.
 """
 
-from typing import Optional
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import and_, or_
 from app.models import db, DeviceToken
 
+# FCM multicast limit
+MULTICAST_BATCH_SIZE = 500
+
+
+class PushTransport(ABC):
+    """Abstract base class for push providers"""
+
+    @abstractmethod
+    def send_multicast(self, tokens: List[str], title: str, body: str, data: Optional[dict] = None) -> List[str]:
+        """Send one message to up to MULTICAST_BATCH_SIZE tokens; return the tokens rejected as invalid"""
+        pass
+
+
+class LogPushTransport(PushTransport):
+    """Placeholder transport: logs instead of sending"""
+
+    def send_multicast(self, tokens, title, body, data=None):
+        current_app.logger.info(f"Push '{title}' to {len(tokens)} device(s) (log transport)")
+        return []
+
+
+class FakePushTransport(PushTransport):
+    """Local transport for tests: records every multicast and rejects configured tokens"""
+
+    def __init__(self, invalid_tokens: Iterable[str] = ()):
+        self.sent: List[dict] = []
+        self.invalid_tokens = set(invalid_tokens)
+
+    def send_multicast(self, tokens, title, body, data=None):
+        self.sent.append({'tokens': list(tokens), 'title': title, 'body': body, 'data': data or {}})
+        return [t for t in tokens if t in self.invalid_tokens]
+
+
+class FCMPushTransport(PushTransport):
+    """Firebase Cloud Messaging via firebase_admin"""
+
+    def __init__(self, credentials_path: Optional[str] = None):
+        try:
+            import firebase_admin
+            from firebase_admin import credentials, messaging
+        except ImportError:
+            raise ImportError("firebase-admin is required for FCM push. Install with: pip install firebase-admin")
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(credentials_path) if credentials_path else None
+            firebase_admin.initialize_app(cred)
+        self.messaging = messaging
+
+    def send_multicast(self, tokens, title, body, data=None):
+        messaging = self.messaging
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            # FCM data payload values must be strings
+            data={k: str(v) for k, v in (data or {}).items()},
+        )
+        response = messaging.send_each_for_multicast(message)
+        invalid_errors = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+        return [
+            tokens[i] for i, result in enumerate(response.responses)
+            if not result.success and isinstance(result.exception, invalid_errors)
+        ]
+
+
+class TokenCache:
+    """(user_type, user_id) -> tokens, loaded in bulk and expired after a TTL"""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, Tuple[str, ...]]] = {}
+        self.ttl_seconds = ttl_seconds
+
+    def get_many(self, targets: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Tuple[str, ...]]:
+        """Tokens for every target; all cache misses are loaded with a single query"""
+        now = time.monotonic()
+        result, missing = {}, set()
+        with self._lock:
+            for key in targets:
+                entry = self._entries.get(key)
+                if entry and now - entry[0] < self.ttl_seconds:
+                    result[key] = entry[1]
+                else:
+                    missing.add(key)
+        if not missing:
+            return result
+
+        by_type: Dict[str, set] = {}
+        for user_type, user_id in missing:
+            by_type.setdefault(user_type, set()).add(user_id)
+        rows = db.session.query(DeviceToken.user_type, DeviceToken.user_id, DeviceToken.fcm_token).filter(
+            or_(*[
+                and_(DeviceToken.user_type == user_type, DeviceToken.user_id.in_(user_ids))
+                for user_type, user_ids in by_type.items()
+            ])
+        ).all()
+        loaded = {key: [] for key in missing}
+        for user_type, user_id, token in rows:
+            loaded[(user_type, user_id)].append(token)
+        with self._lock:
+            for key, tokens in loaded.items():
+                self._entries[key] = (now, tuple(tokens))
+                result[key] = tuple(tokens)
+        return result
+
+    def invalidate(self, user_type: str = None, user_id: int = None):
+        """Drop one user's entry, or everything when called without arguments"""
+        with self._lock:
+            if user_type is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((user_type, user_id), None)
+
+
+token_cache = TokenCache()
+_transport: Optional[PushTransport] = None
+
+
+def get_push_transport() -> PushTransport:
+    """Factory: build (once) the transport selected by PUSH_TRANSPORT"""
+    global _transport
+    if _transport is None:
+        transport_type = current_app.config.get('PUSH_TRANSPORT', 'log').lower()
+        token_cache.ttl_seconds = current_app.config.get('PUSH_TOKEN_CACHE_TTL_SECONDS', 300)
+        if transport_type == 'fcm':
+            _transport = FCMPushTransport(current_app.config.get('FCM_CREDENTIALS_PATH'))
+        elif transport_type == 'fake':
+            _transport = FakePushTransport()
+        elif transport_type == 'log':
+            _transport = LogPushTransport()
+        else:
+            raise ValueError(f"Unknown push transport: {transport_type}")
+    return _transport
+
+
+def set_push_transport(transport: Optional[PushTransport]):
+    """Swap the transport (tests); None rebuilds it from config on next use"""
+    global _transport
+    _transport = transport
+
 
 def register_device_token(user_type: str, user_id: int, token: str, platform: Optional[str] = None):
     """Create or update device token for a user"""
     existing = DeviceToken.query.filter_by(fcm_token=token).first()
     if existing:
+        token_cache.invalidate(existing.user_type, existing.user_id)
         existing.user_type = user_type
         existing.user_id = user_id
         existing.platform = platform
@@ -22,15 +170,42 @@ def register_device_token(user_type: str, user_id: int, token: str, platform: Op
             platform=platform,
         ))
     db.session.commit()
+    token_cache.invalidate(user_type, user_id)
 
 
-def send_push_to_user(user_type: str, user_id: int, title: str, body: str, data: Optional[dict] = None):
-    """Send push to all tokens registered for a user. Placeholder no-op."""
-    # TODO: integrate firebase_admin SDK and send message to tokens
-    tokens = DeviceToken.query.filter_by(user_type=user_type, user_id=user_id).all()
-    # For now, just return count
-    return len(tokens)
+def send_push_to_users(targets: Iterable[Tuple[str, int]], title: str, body: str, data: Optional[dict] = None) -> int:
+    """
+    Send one notification to many users
 
+    Args:
+        targets: (user_type, user_id) pairs
 
+    Returns:
+        int: number of device tokens the message was sent to
+    """
+    tokens_by_user = token_cache.get_many(set(targets))
+    owner = {token: key for key, tokens in tokens_by_user.items() for token in tokens}
+    tokens = list(owner)
+    if not tokens:
+        return 0
 
+    transport = get_push_transport()
+    invalid = []
+    for start in range(0, len(tokens), MULTICAST_BATCH_SIZE):
+        invalid.extend(transport.send_multicast(tokens[start:start + MULTICAST_BATCH_SIZE], title, body, data))
 
+    if invalid:
+        try:
+            DeviceToken.query.filter(DeviceToken.fcm_token.in_(invalid)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to remove invalid push tokens: {e}")
+        for token in invalid:
+            token_cache.invalidate(*owner[token])
+    return len(tokens)
+
+
+def send_push_to_user(user_type: str, user_id: int, title: str, body: str, data: Optional[dict] = None):
+    """Send push to all tokens registered for a user"""
+    return send_push_to_users([(user_type, user_id)], title, body, data)
@@ -0,0 +1,416 @@
+"""
+Background PDF/Excel report generation.
+
+export-report only records a ReportJob and hands its id to the work queue;
+a worker builds the file from aggregate queries plus a chunked ride query,
+saves it as private content through the storage service and marks the job
+done; files are only served through the admin download endpoint. A request
+for the same format and date range reuses a job that is still pending or
+that finished within REPORT_CACHE_TTL_SECONDS instead of building it again,
+and purge_expired_reports() removes jobs and files once they have expired.
+"""
+
+import hashlib
+import io
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Tuple
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+from flask import current_app
+from sqlalchemy import and_, case, func, or_
+
+from app.models import db, Driver, Ride, Passenger, ReportJob
+from app.utils import to_eat
+from app.utils.csv_stream import YIELD_PER
+from app.services.storage_service import get_storage_service
+from app.services.work_queue import work_queue
+
+REPORT_FOLDER = 'reports'
+PENDING_STATUSES = ('queued', 'running')
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+EXTENSIONS = {'pdf': 'pdf', 'excel': 'xlsx'}
+# Jobs are purged this long after they stop being reused, so a job handed
+# out just before it expired can still be downloaded
+PURGE_GRACE_SECONDS = 600
+
+# Excel column widths are estimated from this many leading ride rows
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 50
+
+
+def params_hash(format_type: str, start_date: datetime, end_date: datetime) -> str:
+    """Cache key for a report: format plus the exact UTC range"""
+    key = f"{format_type}|{start_date.isoformat()}|{end_date.isoformat()}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def report_filename(job: ReportJob) -> str:
+    """Download name, e.g. ride_report_20260901_20260930.pdf"""
+    return f"ride_report_{job.start_date.strftime('%Y%m%d')}_{job.end_date.strftime('%Y%m%d')}.{EXTENSIONS[job.format]}"
+
+
+def submit_report(format_type: str, start_date: datetime, end_date: datetime,
+                  admin_id=None) -> Tuple[ReportJob, bool]:
+    """
+    Queue a report build, or return the job that already covers these parameters
+
+    Args:
+        format_type: 'pdf' or 'excel'
+        start_date: Naive UTC start of the range, inclusive
+        end_date: Naive UTC end of the range, inclusive
+        admin_id: Requesting admin, if any
+
+    Returns:
+        tuple: (job, cached) where cached is True if an existing job was reused
+    """
+    digest = params_hash(format_type, start_date, end_date)
+    fresh_after = datetime.utcnow() - timedelta(seconds=current_app.config.get('REPORT_CACHE_TTL_SECONDS', 3600))
+    existing = ReportJob.query.filter(
+        ReportJob.params_hash == digest,
+        or_(
+            # A pending job older than the TTL was lost with its worker
+            and_(ReportJob.status.in_(PENDING_STATUSES), ReportJob.created_at >= fresh_after),
+            and_(ReportJob.status == 'done', ReportJob.finished_at >= fresh_after),
+        )
+    ).order_by(ReportJob.id.desc()).first()
+    if existing:
+        return existing, True
+
+    job = ReportJob(
+        params_hash=digest,
+        format=format_type,
+        start_date=start_date,
+        end_date=end_date,
+        status='queued',
+        requested_by=admin_id
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    work_queue.submit('report', build_report_job, job.id)
+    work_queue.submit('report_purge', purge_expired_reports)
+    # Eager mode and a full queue build inline in another session
+    db.session.refresh(job)
+    return job, False
+
+
+def build_report_job(job_id: int):
+    """Work queue task: build one report and store it; failures are kept on the job"""
+    job = db.session.get(ReportJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        if job.format == 'excel':
+            data = build_excel_report(job.start_date, job.end_date)
+        else:
+            data = build_pdf_report(job.start_date, job.end_date)
+        # Job id keeps rebuilds of the same range apart in storage
+        filename = report_filename(job).replace('.', f'_{job.id}.')
+        job.file_path = get_storage_service().save_bytes(data, REPORT_FOLDER, filename, CONTENT_TYPES[job.format])
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Report job {job_id} failed: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)[:500]
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def purge_expired_reports() -> int:
+    """
+    Delete report jobs, and their stored files, that are past
+    REPORT_CACHE_TTL_SECONDS plus PURGE_GRACE_SECONDS; commits
+
+    Runs after each new submission, so storage holds at most about one
+    TTL's worth of reports.
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    ttl = current_app.config.get('REPORT_CACHE_TTL_SECONDS', 3600)
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl + PURGE_GRACE_SECONDS)
+    expired = ReportJob.query.filter(
+        or_(
+            ReportJob.finished_at < cutoff,
+            # Pending jobs whose worker was lost never finish
+            and_(ReportJob.finished_at.is_(None), ReportJob.created_at < cutoff),
+        )
+    ).all()
+    if not expired:
+        return 0
+    storage = get_storage_service()
+    for job in expired:
+        if job.file_path:
+            storage.delete_bytes(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+    return len(expired)
+
+
+def report_summary(start_date: datetime, end_date: datetime) -> dict:
+    """Headline numbers for the range: one aggregate over ride plus two counts"""
+    is_completed = Ride.status == 'Completed'
+    totals = db.session.query(
+        func.count(Ride.id),
+        func.count(case((is_completed, 1))),
+        func.coalesce(func.sum(case((is_completed, Ride.fare))), 0),
+        func.avg(Ride.rating)
+    ).filter(
+        Ride.request_time >= start_date,
+        Ride.request_time <= end_date
+    ).one()
+    return {
+        'total_rides': totals[0],
+        'completed_rides': totals[1],
+        'total_revenue': float(totals[2] or 0),
+        'avg_rating': round(float(totals[3]), 2) if totals[3] is not None else 0,
+        'total_drivers': db.session.query(func.count(Driver.id)).scalar(),
+        'total_passengers': db.session.query(func.count(Passenger.id)).scalar(),
+    }
+
+
+def _ride_rows(start_date: datetime, end_date: datetime):
+    """Column query for the rides table; passenger and driver names come from joins"""
+    return db.session.query(
+        Ride.id,
+        Passenger.username.label('passenger_name'),
+        Driver.name.label('driver_name'),
+        Ride.pickup_address,
+        Ride.dest_address,
+        Ride.fare,
+        Ride.status,
+        Ride.request_time,
+        Ride.rating
+    ).outerjoin(Passenger, Ride.passenger_id == Passenger.id).outerjoin(
+        Driver, Ride.driver_id == Driver.id
+    ).filter(
+        Ride.request_time >= start_date,
+        Ride.request_time <= end_date
+    )
+
+
+def _column_widths(headers, rows) -> list:
+    """Widest value per column (header included) plus padding, capped at MAX_COLUMN_WIDTH"""
+    widths = [len(str(header)) for header in headers]
+    for row in rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def _set_column_widths(ws, widths):
+    # Write-only sheets take column dimensions only before the first row
+    for i, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+
+def _cell(ws, value, font=None, fill=None, alignment=None) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if alignment:
+        cell.alignment = alignment
+    return cell
+
+
+def _excel_ride_row(ride) -> list:
+    return [
+        ride.id,
+        ride.passenger_name or 'N/A',
+        ride.driver_name or 'N/A',
+        ride.pickup_address or 'N/A',
+        ride.dest_address,
+        float(ride.fare),
+        ride.status,
+        to_eat(ride.request_time).strftime('%Y-%m-%d %H:%M'),
+        ride.rating if ride.rating else 'N/A'
+    ]
+
+
+def build_excel_report(start_date: datetime, end_date: datetime) -> bytes:
+    """
+    Excel report with a summary sheet and one row per ride
+
+    Uses a write-only workbook: rows are serialized as they are fetched, so
+    memory does not grow with the ride count. Ride column widths come from
+    the first WIDTH_SAMPLE_ROWS rows instead of a scan of every cell.
+    """
+    summary = report_summary(start_date, end_date)
+    wb = openpyxl.Workbook(write_only=True)
+
+    # Summary sheet
+    ws_summary = wb.create_sheet("Summary")
+    header_fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
+    stripe_fill = PatternFill(start_color="F8FAFC", end_color="F8FAFC", fill_type="solid")
+    center = Alignment(horizontal="center")
+
+    headers = ['📊 Metric', '📈 Value']
+    summary_data = [
+        ['🚗 Total Rides', summary['total_rides']],
+        ['✅ Completed Rides', summary['completed_rides']],
+        ['💰 Total Revenue', f"ETB {summary['total_revenue']:.2f}"],
+        ['👨‍💼 Total Drivers', summary['total_drivers']],
+        ['👥 Total Passengers', summary['total_passengers']],
+        ['⭐ Average Rating', f"{summary['avg_rating']}/5.0"]
+    ]
+    _set_column_widths(ws_summary, _column_widths(headers, summary_data))
+
+    # Title and period (write-only sheets cannot merge cells)
+    ws_summary.append([_cell(ws_summary, "🚗 RIDE Management System - Analytics Report",
+                             Font(bold=True, size=16, color="FFFFFF"), header_fill)])
+    ws_summary.append([_cell(ws_summary, f"📅 Report Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}",
+                             Font(size=12, color="6B7280"))])
+    ws_summary.append([])
+    ws_summary.append([_cell(ws_summary, header, Font(bold=True, color="FFFFFF"), header_fill, center)
+                       for header in headers])
+    for row, values in enumerate(summary_data, 5):
+        # Alternate row colors
+        fill = stripe_fill if row % 2 == 0 else None
+        ws_summary.append([_cell(ws_summary, value, Font(size=11), fill) for value in values])
+
+    # Rides sheet
+    ws_rides = wb.create_sheet("Rides")
+    ride_headers = ['ID', 'Passenger', 'Driver', 'Pickup', 'Destination', 'Fare', 'Status', 'Date', 'Rating']
+    rides = (
+        _excel_ride_row(ride)
+        for ride in _ride_rows(start_date, end_date).order_by(Ride.id).yield_per(YIELD_PER)
+    )
+    sample = list(islice(rides, WIDTH_SAMPLE_ROWS))
+    _set_column_widths(ws_rides, _column_widths(ride_headers, sample))
+
+    ride_header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    ws_rides.append([_cell(ws_rides, header, Font(bold=True), ride_header_fill) for header in ride_headers])
+    for row in sample:
+        ws_rides.append(row)
+    for row in rides:
+        ws_rides.append(row)
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def build_pdf_report(start_date: datetime, end_date: datetime) -> bytes:
+    """PDF report with the headline numbers and the 20 most recent rides"""
+    summary = report_summary(start_date, end_date)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Create custom styles for better formatting
+    title_style = styles['Title']
+    title_style.textColor = colors.HexColor('#1f2937')
+    title_style.fontSize = 24
+    title_style.spaceAfter = 20
+
+    heading_style = styles['Heading2']
+    heading_style.textColor = colors.HexColor('#374151')
+    heading_style.fontSize = 16
+    heading_style.spaceAfter = 12
+
+    # Title with better styling
+    title = Paragraph("🚗 RIDE Management System", title_style)
+    subtitle = Paragraph("Analytics & Performance Report", styles['Heading2'])
+    story.append(title)
+    story.append(subtitle)
+    story.append(Spacer(1, 20))
+
+    # Report period with better formatting
+    period_text = f"📅 Report Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}"
+    period_style = styles['Normal']
+    period_style.fontSize = 12
+    period_style.textColor = colors.HexColor('#6b7280')
+    period = Paragraph(period_text, period_style)
+    story.append(period)
+    story.append(Spacer(1, 30))
+
+    # Summary data
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Rides', str(summary['total_rides'])],
+        ['Completed Rides', str(summary['completed_rides'])],
+        ['Total Revenue', f"${summary['total_revenue']:.2f}"],
+        ['Total Drivers', str(summary['total_drivers'])],
+        ['Total Passengers', str(summary['total_passengers'])],
+        ['Average Rating', f"{summary['avg_rating']}/5.0"]
+    ]
+
+    # Add section header
+    section_header = Paragraph("📊 Key Performance Indicators", heading_style)
+    story.append(section_header)
+    story.append(Spacer(1, 12))
+
+    summary_table = Table(summary_data)
+    summary_table.setStyle(TableStyle([
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 0), (-1, 0), 12),
+        # Data rows styling
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8fafc')),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 11),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#374151')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
+    ]))
+
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+
+    # Recent rides table (limit to 20 most recent)
+    recent_rides = _ride_rows(start_date, end_date).order_by(Ride.request_time.desc()).limit(20).all()
+    rides_data = [['ID', 'Passenger', 'Driver', 'Destination', 'Fare', 'Status', 'Date']]
+
+    for ride in recent_rides:
+        rides_data.append([
+            str(ride.id),
+            ride.passenger_name or 'N/A',
+            ride.driver_name or 'N/A',
+            ride.dest_address[:30] + '...' if len(ride.dest_address) > 30 else ride.dest_address,
+            f"${float(ride.fare):.2f}",
+            ride.status,
+            to_eat(ride.request_time).strftime('%m/%d/%Y')
+        ])
+
+    rides_table = Table(rides_data)
+    rides_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8)
+    ]))
+
+    story.append(rides_table)
+
+    # Build PDF
+    doc.build(story)
+    return buffer.getvalue()
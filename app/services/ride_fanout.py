@@ -0,0 +1,71 @@
+"""
+Side effects of a new ride request, run on the background work queue.
+
+Each task takes a ride id and loads what it needs in its own session, so it
+can run (and be retried) after the request that created the ride returned.
+"""
+
+from app.models import Ride, Driver
+from app.services.assigner import ONLINE_STATUSES, broadcast_offers
+from app.services.work_queue import work_queue
+
+
+def fan_out_new_ride(ride_id: int):
+    """Queue push, offer broadcast and dispatcher notification for a committed ride"""
+    work_queue.submit('ride_push', push_new_ride_to_drivers, ride_id)
+    work_queue.submit('ride_offers', broadcast_ride_offers, ride_id)
+    work_queue.submit('dispatcher_notify', notify_dispatchers_of_ride, ride_id)
+
+
+def push_new_ride_to_drivers(ride_id: int):
+    """Push the ride to online drivers with a matching vehicle type (constant query count)"""
+    from app.services.push import send_push_to_users
+    ride = Ride.query.get(ride_id)
+    if not ride or ride.status != 'Requested':
+        return
+    driver_ids = [row[0] for row in Driver.query.with_entities(Driver.id).filter(
+        Driver.status.in_(ONLINE_STATUSES),
+        Driver.vehicle_type == ride.vehicle_type
+    ).all()]
+    if not driver_ids:
+        return
+    send_push_to_users(
+        [('driver', driver_id) for driver_id in driver_ids],
+        'New Ride Available',
+        f"New ride request: {ride.pickup_address or 'Pickup location'} to {ride.dest_address}",
+        {
+            'type': 'new_ride_request',
+            'ride_id': ride.id,
+            'vehicle_type': ride.vehicle_type,
+            'fare': float(ride.fare),
+        }
+    )
+
+
+def broadcast_ride_offers(ride_id: int):
+    """Start the offer waves for a ride that is still unassigned"""
+    ride = Ride.query.get(ride_id)
+    if not ride or ride.status != 'Requested' or ride.driver_id is not None:
+        return
+    broadcast_offers(ride)
+
+
+def notify_dispatchers_of_ride(ride_id: int):
+    """Emit new_ride_notification to the dispatchers room"""
+    from app.utils.socket_utils import emit_new_ride_notification
+    ride = Ride.query.get(ride_id)
+    if not ride:
+        return
+    passenger = ride.passenger
+    emit_new_ride_notification({
+        'ride_id': ride.id,
+        'passenger_name': (passenger.username if passenger and passenger.username else f"Passenger #{ride.passenger_id}"),
+        'passenger_phone': getattr(passenger, 'phone_number', 'N/A'),
+        'pickup_address': ride.pickup_address or 'Location not specified',
+        'dest_address': ride.dest_address,
+        'fare': float(ride.fare),
+        'vehicle_type': ride.vehicle_type,
+        'payment_method': ride.payment_method,
+        'distance_km': float(ride.distance_km),
+        'request_time': ride.request_time.isoformat() if ride.request_time else None,
+    })
@@ -0,0 +1,247 @@
+"""
+Incrementally maintained ride_daily_rollup table.
+
+Each ride contributes one ride, its fare and its rating to the row for
+(EAT day of request_time, vehicle type, status, payment method). Session
+events turn every ORM insert, update or delete of a Ride into +/- deltas
+that are upserted in the same transaction, so the rollup commits or rolls
+back together with the ride. Bulk UPDATEs bypass the ORM and must call
+record_status_change() themselves (see assigner.assign_ride).
+
+The migration that creates the table fills it from existing rides.
+rebuild() recomputes a day range from the ride table; run it
+(scripts/rebuild_ride_rollup.py) whenever the rollup is suspected to have
+drifted.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, event, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models import db, Ride, RideDailyRollup
+from app.utils import to_eat, eat_date
+
+# Ride attributes that decide a ride's rollup row or its contribution
+# (driver_id is for driver_stats, which reuses ride_changes)
+TRACKED_ATTRIBUTES = ('request_time', 'vehicle_type', 'status', 'payment_method', 'fare', 'rating', 'driver_id')
+KEY_COLUMNS = ('day', 'vehicle_type', 'status', 'payment_method')
+SUM_COLUMNS = ('ride_count', 'fare_sum', 'rating_count', 'rating_sum')
+
+
+def rollup_key(request_time, vehicle_type, status, payment_method) -> Tuple:
+    """Rollup row for a ride; None values fall back to the Ride column defaults"""
+    return (
+        to_eat(request_time or datetime.utcnow()).date(),
+        vehicle_type or 'Bajaj',
+        status or 'Requested',
+        payment_method or 'Cash',
+    )
+
+
+def _contribution(values: dict):
+    """(key, [ride_count, fare_sum, rating_count, rating_sum]) for one ride"""
+    key = rollup_key(values['request_time'], values['vehicle_type'], values['status'], values['payment_method'])
+    rating = values['rating']
+    return key, [1, Decimal(str(values['fare'] or 0)), 1 if rating else 0, rating or 0]
+
+
+def _add(deltas: Dict, values: dict, sign: int):
+    key, sums = _contribution(values)
+    current = deltas.setdefault(key, [0, Decimal('0'), 0, 0])
+    for i, amount in enumerate(sums):
+        current[i] += sign * amount
+
+
+def upsert_increments(connection, table, key_columns, sum_columns, rows, latest_columns=()):
+    """
+    Add each row's sum_columns onto the row with the same key_columns, inserting
+    missing rows; latest_columns keep the later of the stored and new value.
+    One INSERT ... ON CONFLICT / ON DUPLICATE KEY on SQLite, PostgreSQL and MySQL.
+    """
+    if not rows:
+        return
+
+    def latest(current, new):
+        return case((new.isnot(None) & (current.is_(None) | (new > current)), new), else_=current)
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        updates = {name: table.c[name] + stmt.excluded[name] for name in sum_columns}
+        updates.update({name: latest(table.c[name], stmt.excluded[name]) for name in latest_columns})
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns], set_=updates
+        ), rows)
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        updates = {name: table.c[name] + stmt.inserted[name] for name in sum_columns}
+        updates.update({name: latest(table.c[name], stmt.inserted[name]) for name in latest_columns})
+        connection.execute(stmt.on_duplicate_key_update(updates), rows)
+    else:
+        for row in rows:
+            values = {name: table.c[name] + row[name] for name in sum_columns}
+            values.update({name: latest(table.c[name], literal(row[name], table.c[name].type))
+                           for name in latest_columns})
+            matched = connection.execute(
+                update(table)
+                .where(*[table.c[name] == row[name] for name in key_columns])
+                .values(values)
+            ).rowcount
+            if not matched:
+                connection.execute(insert(table).values(row))
+
+
+def apply_deltas(connection, deltas: Dict):
+    """Upsert summed deltas into ride_daily_rollup on the given connection"""
+    rows = [
+        dict(zip(KEY_COLUMNS + SUM_COLUMNS, key + tuple(sums)))
+        for key, sums in deltas.items() if any(sums)
+    ]
+    upsert_increments(connection, RideDailyRollup.__table__, KEY_COLUMNS, SUM_COLUMNS, rows)
+
+
+def record_status_change(ride_id: int, old_status: str, new_status: str, ride=None):
+    """
+    Move a ride between status rows after a bulk UPDATE changed its status
+
+    ride may carry the request_time, vehicle_type, payment_method, fare and
+    rating the UPDATE returned; otherwise they are read.
+    """
+    if old_status == new_status:
+        return
+    if ride is None:
+        ride = db.session.query(
+            Ride.request_time, Ride.vehicle_type, Ride.payment_method, Ride.fare, Ride.rating
+        ).filter(Ride.id == ride_id).first()
+        if ride is None:
+            return
+    values = dict(ride._mapping)
+    deltas = {}
+    _add(deltas, dict(values, status=old_status), -1)
+    _add(deltas, dict(values, status=new_status), 1)
+    apply_deltas(db.session.connection(), deltas)
+
+
+def rebuild(start_day: Optional[date] = None, end_day: Optional[date] = None) -> int:
+    """
+    Recompute rollup rows for an inclusive day range (everything by default)
+
+    Deletes the range and re-inserts it from one GROUP BY over ride, in the
+    caller's session; commits. Rides written while it runs may be counted
+    twice or missed, so run it when traffic is low.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    table = RideDailyRollup.__table__
+    day = eat_date(Ride.request_time, db.engine.dialect.name)
+    source = select(
+        day.label('day'),
+        Ride.vehicle_type,
+        Ride.status,
+        Ride.payment_method,
+        func.count(Ride.id),
+        func.coalesce(func.sum(Ride.fare), 0),
+        func.count(Ride.rating),
+        func.coalesce(func.sum(Ride.rating), 0),
+    ).group_by(day, Ride.vehicle_type, Ride.status, Ride.payment_method)
+    cleanup = table.delete()
+    if start_day is not None:
+        source = source.where(day >= start_day)
+        cleanup = cleanup.where(table.c.day >= start_day)
+    if end_day is not None:
+        source = source.where(day <= end_day)
+        cleanup = cleanup.where(table.c.day <= end_day)
+    try:
+        db.session.execute(cleanup)
+        written = db.session.execute(
+            table.insert().from_select(list(KEY_COLUMNS + SUM_COLUMNS), source)
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return written
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history loads the previous value on assignment, so before_flush
+# knows which row a ride is leaving even if the attribute was expired
+for _name in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Ride, _name), 'set', _load_old_value, active_history=True)
+
+
+def ride_changes(session) -> List[Tuple[Optional[dict], Optional[dict]]]:
+    """
+    (old, new) TRACKED_ATTRIBUTES values for every Ride about to be flushed
+
+    old is None for inserts and new is None for deletes; updates that touch
+    none of the tracked attributes are skipped. Call from before_flush.
+    """
+    changes = []
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Ride):
+                changes.append((None, {name: getattr(obj, name) for name in TRACKED_ATTRIBUTES}))
+        for obj in session.dirty:
+            if not isinstance(obj, Ride):
+                continue
+            state = inspect(obj)
+            old, changed = {}, False
+            for name in TRACKED_ATTRIBUTES:
+                history = state.attrs[name].history
+                if history.has_changes():
+                    changed = True
+                    old[name] = history.deleted[0] if history.deleted else None
+                else:
+                    old[name] = getattr(obj, name)
+            if changed:
+                changes.append((old, {name: getattr(obj, name) for name in TRACKED_ATTRIBUTES}))
+        for obj in session.deleted:
+            if isinstance(obj, Ride):
+                state = inspect(obj)
+                old = {}
+                for name in TRACKED_ATTRIBUTES:
+                    history = state.attrs[name].history
+                    old[name] = history.deleted[0] if history.deleted else getattr(obj, name)
+                changes.append((old, None))
+    return changes
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_ride_deltas(session, flush_context, instances):
+    """Turn pending Ride inserts, updates and deletes into rollup deltas"""
+    deltas = {}
+    for old, new in ride_changes(session):
+        if old is not None:
+            _add(deltas, old, -1)
+        if new is not None:
+            _add(deltas, new, 1)
+    if deltas:
+        session.info.setdefault('ride_rollup_deltas', []).append(deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_ride_deltas(session, flush_context):
+    pending = session.info.pop('ride_rollup_deltas', None)
+    if not pending:
+        return
+    connection = session.connection()
+    for deltas in pending:
+        apply_deltas(connection, deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_ride_deltas(session):
+    session.info.pop('ride_rollup_deltas', None)
@@ -0,0 +1,41 @@
+"""
+Route distance cache for fare estimates.
+
+Pickup and destination are snapped to a coarse grid (ROUTE_CACHE_GRID_METERS,
+~50 m by default) so the small pin moves a passenger makes while adjusting
+the map hit the same entry instead of calling the routing service again.
+"""
+
+import math
+import os
+
+from app.services.cache import TTLCache, SQLiteBacking
+from app.utils.distance import KM_PER_DEG_LAT
+
+route_cache = TTLCache(maxsize=10000, ttl_seconds=86400)
+_grid_meters = 50.0
+
+
+def init_route_cache(app):
+    """Size the cache from config and attach the SQLite file if one is configured"""
+    global _grid_meters
+    route_cache.maxsize = app.config.get('ROUTE_CACHE_SIZE', 10000)
+    route_cache.ttl_seconds = app.config.get('ROUTE_CACHE_TTL_SECONDS', 86400)
+    _grid_meters = app.config.get('ROUTE_CACHE_GRID_METERS', 50.0)
+    path = app.config.get('ROUTE_CACHE_DB_PATH')
+    if path and route_cache.backing is None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        route_cache.backing = SQLiteBacking(path, table='route_cache')
+
+
+def _snap(lat: float, lon: float):
+    """Grid cell indices of a point; lon cells widen with latitude to stay ~square"""
+    step_lat = _grid_meters / (KM_PER_DEG_LAT * 1000)
+    step_lon = step_lat / max(math.cos(math.radians(lat)), 0.01)
+    return int(math.floor(lat / step_lat)), int(math.floor(lon / step_lon))
+
+
+def route_key(pickup_lat: float, pickup_lon: float, dest_lat: float, dest_lon: float):
+    """Cache key for a trip: snapped endpoints only, since the route does not depend on vehicle type"""
+    return _snap(pickup_lat, pickup_lon) + _snap(dest_lat, dest_lon)
@@ -0,0 +1,249 @@
+"""
+Routing providers for trip distance.
+
+get_route() is the single entry point used by fare estimates. It checks the
+route cache, then asks the configured provider (ROUTING_PROVIDER) through a
+circuit breaker. When the provider is slow or down, the breaker opens and
+requests are answered by the offline model, which multiplies the
+great-circle distance by a per-area detour factor. Successful live lookups
+keep calibrating those factors.
+"""
+
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import List, Optional
+
+import requests
+from flask import current_app
+
+from app.services.route_cache import route_cache, route_key
+from app.utils.distance import haversine_km
+
+Route = namedtuple('Route', ['distance_km', 'provider'])
+
+
+class RoutingError(Exception):
+    """Provider could not answer (timeout, connection or bad response)"""
+
+
+class NoRouteError(RoutingError):
+    """Provider answered that no route exists between the points"""
+
+
+class RoutingProvider(ABC):
+    """Abstract base class for routing backends"""
+
+    name = 'base'
+
+    @abstractmethod
+    def route(self, pickup_lat: float, pickup_lon: float, dest_lat: float, dest_lon: float) -> Route:
+        """Return the driving route between two points or raise RoutingError"""
+        pass
+
+
+class OSRMRoutingProvider(RoutingProvider):
+    """OSRM HTTP API (public demo server or self-hosted)"""
+
+    name = 'osrm'
+
+    def __init__(self, base_url: str = 'http://router.project-osrm.org', timeout: float = 3.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def route(self, pickup_lat, pickup_lon, dest_lat, dest_lon):
+        url = (f"{self.base_url}/route/v1/driving/"
+               f"{pickup_lon},{pickup_lat};{dest_lon},{dest_lat}?overview=false")
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            route_data = response.json()
+        except requests.exceptions.RequestException as e:
+            raise RoutingError(f"OSRM request failed: {e}")
+        except ValueError as e:
+            raise RoutingError(f"Invalid OSRM response: {e}")
+        if route_data.get('code') == 'NoRoute' or not route_data.get('routes'):
+            raise NoRouteError('No route found between the locations')
+        try:
+            return Route(route_data['routes'][0]['distance'] / 1000.0, self.name)
+        except (KeyError, IndexError, TypeError) as e:
+            raise RoutingError(f"Invalid OSRM response: {e}")
+
+
+class LocalRoutingProvider(RoutingProvider):
+    """Network-free stand-in for development and tests: straight-line distance"""
+
+    name = 'local'
+
+    def route(self, pickup_lat, pickup_lon, dest_lat, dest_lon):
+        return Route(haversine_km(pickup_lat, pickup_lon, dest_lat, dest_lon), self.name)
+
+
+class OfflineRoutingProvider(RoutingProvider):
+    """
+    Great-circle distance times a detour factor for the area of the pickup
+
+    Areas are {'name', 'bbox': [min_lat, max_lat, min_lon, max_lon], 'factor'};
+    the first area containing the pickup wins, otherwise default_factor.
+    """
+
+    name = 'offline'
+    # Calibration: weight of each observed trip, and trips shorter than this are ignored
+    CALIBRATION_WEIGHT = 0.05
+    MIN_CALIBRATION_KM = 0.5
+
+    def __init__(self, areas: Optional[List[dict]] = None, default_factor: float = 1.3):
+        self._lock = threading.Lock()
+        self.areas = [dict(area) for area in (areas or [])]
+        self.default_factor = default_factor
+
+    def _area_for(self, lat: float, lon: float) -> Optional[dict]:
+        for area in self.areas:
+            min_lat, max_lat, min_lon, max_lon = area['bbox']
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                return area
+        return None
+
+    def factor_for(self, lat: float, lon: float) -> float:
+        area = self._area_for(lat, lon)
+        return area['factor'] if area else self.default_factor
+
+    def route(self, pickup_lat, pickup_lon, dest_lat, dest_lon):
+        straight = haversine_km(pickup_lat, pickup_lon, dest_lat, dest_lon)
+        return Route(straight * self.factor_for(pickup_lat, pickup_lon), self.name)
+
+    def observe(self, pickup_lat, pickup_lon, dest_lat, dest_lon, routed_km: float):
+        """Move the area's factor towards the ratio seen on a live route"""
+        straight = haversine_km(pickup_lat, pickup_lon, dest_lat, dest_lon)
+        if straight < self.MIN_CALIBRATION_KM:
+            return
+        ratio = min(max(routed_km / straight, 1.0), 3.0)
+        with self._lock:
+            area = self._area_for(pickup_lat, pickup_lon)
+            current = area['factor'] if area else self.default_factor
+            updated = current + self.CALIBRATION_WEIGHT * (ratio - current)
+            if area:
+                area['factor'] = updated
+            else:
+                self.default_factor = updated
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after reset_timeout lets one trial call through"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self._lock = threading.Lock()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ResilientRouter:
+    """Primary provider guarded by a circuit breaker, degrading to the offline model"""
+
+    def __init__(self, primary: RoutingProvider, fallback: OfflineRoutingProvider, breaker: CircuitBreaker):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+
+    def route(self, pickup_lat, pickup_lon, dest_lat, dest_lon) -> Route:
+        if self.primary is not self.fallback and self.breaker.allow():
+            try:
+                result = self.primary.route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+            except NoRouteError:
+                # A real answer from a healthy router, not an outage
+                self.breaker.record_success()
+                raise
+            except RoutingError as e:
+                self.breaker.record_failure()
+                current_app.logger.warning(f"Routing provider '{self.primary.name}' failed, using offline model: {e}")
+            except Exception as e:
+                # e.g. a malformed response; still release the half-open trial
+                self.breaker.record_failure()
+                current_app.logger.error(f"Routing provider '{self.primary.name}' raised unexpectedly, using offline model: {e}")
+            else:
+                self.breaker.record_success()
+                self.fallback.observe(pickup_lat, pickup_lon, dest_lat, dest_lon, result.distance_km)
+                return result
+        return self.fallback.route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+
+
+_router: Optional[ResilientRouter] = None
+
+
+def get_router() -> ResilientRouter:
+    """Factory: build (once) the router selected by ROUTING_PROVIDER"""
+    global _router
+    if _router is None:
+        config = current_app.config
+        areas = config.get('ROUTING_DETOUR_AREAS') or []
+        if isinstance(areas, str):
+            areas = json.loads(areas)
+        fallback = OfflineRoutingProvider(areas, config.get('ROUTING_DEFAULT_DETOUR_FACTOR', 1.3))
+        provider_type = config.get('ROUTING_PROVIDER', 'osrm').lower()
+        if provider_type == 'osrm':
+            primary = OSRMRoutingProvider(
+                config.get('ROUTING_OSRM_URL', 'http://router.project-osrm.org'),
+                config.get('ROUTING_TIMEOUT_SECONDS', 3.0),
+            )
+        elif provider_type == 'local':
+            primary = LocalRoutingProvider()
+        elif provider_type == 'offline':
+            primary = fallback
+        else:
+            raise ValueError(f"Unknown routing provider: {provider_type}")
+        breaker = CircuitBreaker(
+            config.get('ROUTING_BREAKER_FAILURES', 3),
+            config.get('ROUTING_BREAKER_RESET_SECONDS', 30.0),
+        )
+        _router = ResilientRouter(primary, fallback, breaker)
+    return _router
+
+
+def get_route(pickup_lat: float, pickup_lon: float, dest_lat: float, dest_lon: float) -> Route:
+    """Route distance for a trip: cache first, then the router; offline estimates are not cached"""
+    key = route_key(pickup_lat, pickup_lon, dest_lat, dest_lon)
+    cached = route_cache.get(key)
+    if cached is not None:
+        return Route(cached / 1000.0, 'cache')
+    result = get_router().route(pickup_lat, pickup_lon, dest_lat, dest_lon)
+    if result.provider != OfflineRoutingProvider.name:
+        # Stored in meters, as before
+        route_cache.set(key, result.distance_km * 1000.0)
+    return result
@@ -0,0 +1,141 @@
+"""
+Cached view of the Setting and Commission tables.
+
+Both tables are small and read on every fare estimate and completed ride,
+so they are loaded once into a process-wide snapshot. Any commit that
+writes a Setting or Commission row drops the snapshot (SQLAlchemy session
+events), and the drop is published on Redis pub/sub so other worker
+processes reload too. Without Redis, other workers pick up changes after
+SETTINGS_CACHE_TTL_SECONDS.
+"""
+
+import os
+import threading
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import db, Setting, Commission
+
+INVALIDATION_CHANNEL = 'settings:invalidate'
+
+
+class SettingsStore:
+    """Process-wide snapshot of settings and the active commission rate per vehicle type"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settings: Optional[Dict[str, str]] = None
+        self._commissions: Dict[str, Decimal] = {}
+        self._loaded_at = 0.0
+        self._app = None
+        self._redis = None
+        # Lets the listener ignore this process's own broadcasts
+        self._instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.ttl_seconds = 60
+
+    def init_app(self, app):
+        """Read TTL, hook session events and subscribe to cross-worker invalidations"""
+        self._app = app
+        self.ttl_seconds = app.config.get('SETTINGS_CACHE_TTL_SECONDS', 60)
+        redis_url = app.config.get('SETTINGS_PUBSUB_URL')
+        if redis_url and self._redis is None:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url)
+                from app import socketio
+                socketio.start_background_task(self._listen)
+            except Exception as e:
+                self._redis = None
+                app.logger.warning(f"Settings pub/sub unavailable, relying on TTL: {e}")
+
+    def get(self, key: str, default=None):
+        """Setting value by key, or default"""
+        settings = self._snapshot()
+        if settings is None:
+            return default
+        return settings.get(key, default)
+
+    def commission_rate(self, vehicle_type: str) -> Optional[Decimal]:
+        """Latest active Commission rate for a vehicle type, or None"""
+        if self._snapshot() is None:
+            return None
+        return self._commissions.get(vehicle_type)
+
+    def invalidate(self, broadcast: bool = True):
+        """Drop the snapshot; the next read reloads it"""
+        with self._lock:
+            self._settings = None
+        if broadcast and self._redis is not None:
+            try:
+                self._redis.publish(INVALIDATION_CHANNEL, self._instance_id)
+            except Exception as e:
+                self._app.logger.warning(f"Failed to broadcast settings invalidation: {e}")
+
+    def _snapshot(self) -> Optional[Dict[str, str]]:
+        settings = self._settings
+        if settings is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return settings
+        with self._lock:
+            if self._settings is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return self._settings
+            try:
+                self._load()
+            except Exception as e:
+                # Database not available: callers fall back to their defaults
+                if self._app is not None:
+                    self._app.logger.warning(f"Could not load settings: {e}")
+                return None
+            return self._settings
+
+    def _load(self):
+        """Two queries: every setting, and active commissions newest first; caller holds the lock"""
+        settings = dict(db.session.query(Setting.key, Setting.value).all())
+        commissions = {}
+        rows = db.session.query(Commission.vehicle_type, Commission.commission_rate).filter(
+            Commission.is_active.is_(True)
+        ).order_by(Commission.effective_date.desc()).all()
+        for vehicle_type, rate in rows:
+            commissions.setdefault(vehicle_type, rate)
+        self._commissions = commissions
+        self._settings = settings
+        self._loaded_at = time.monotonic()
+
+    def _listen(self):
+        """Background task: reload when another worker changes settings"""
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        for message in pubsub.listen():
+            sender = message.get('data')
+            if isinstance(sender, bytes):
+                sender = sender.decode()
+            if sender != self._instance_id:
+                self.invalidate(broadcast=False)
+
+
+# Process-wide store used by get_setting, pricing and earnings
+settings_store = SettingsStore()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_settings_writes(session, flush_context):
+    """Remember whether this transaction touched Setting or Commission rows"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Setting, Commission)):
+            session.info['settings_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('settings_changed', False):
+        settings_store.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_writes(session):
+    session.info.pop('settings_changed', None)
@@ -31,6 +31,25 @@ class StorageService(ABC):
     def get_file_url(self, file_path: str) -> str:
         """Get public URL for file"""
         pass
+    
+    @abstractmethod
+    def save_bytes(self, data: bytes, folder: str, filename: str,
+                   content_type: str = 'application/octet-stream') -> str:
+        """Store private generated content (e.g. reports) and return its path/key; never publicly served"""
+        pass
+    
+    @abstractmethod
+    def delete_bytes(self, file_path: str) -> bool:
+        """Delete content stored with save_bytes"""
+        pass
+    
+    def get_local_path(self, file_path: str) -> Optional[str]:
+        """Filesystem path for content stored with save_bytes, or None when storage is remote"""
+        return None
+    
+    def get_private_url(self, file_path: str) -> str:
+        """Short-lived URL for content stored with save_bytes on remote storage"""
+        return ''
 
 
 def generate_file_path(entity_type: str, entity_id: int, file_type: str, 
@@ -132,6 +151,32 @@ class LocalStorageService(StorageService):
             return ''
         # Return relative path for local storage
         return f"/{file_path}"
+    
+    def save_bytes(self, data: bytes, folder: str, filename: str,
+                   content_type: str = 'application/octet-stream') -> str:
+        """Write generated content under the instance folder, outside the static tree"""
+        full_folder = os.path.join(current_app.instance_path, folder)
+        os.makedirs(full_folder, exist_ok=True)
+        with open(os.path.join(full_folder, filename), 'wb') as f:
+            f.write(data)
+        return f"{folder}/{filename}"
+    
+    def delete_bytes(self, file_path: str) -> bool:
+        """Delete generated content from the instance folder"""
+        full_path = self.get_local_path(file_path)
+        if full_path and os.path.exists(full_path):
+            try:
+                os.remove(full_path)
+                return True
+            except OSError:
+                return False
+        return False
+    
+    def get_local_path(self, file_path: str) -> Optional[str]:
+        """Absolute path of content stored with save_bytes"""
+        if not file_path:
+            return None
+        return os.path.abspath(os.path.join(current_app.instance_path, file_path))
 
 
 class S3StorageService(StorageService):
@@ -201,6 +246,33 @@ class S3StorageService(StorageService):
         except Exception:
             return False
     
+    def save_bytes(self, data: bytes, folder: str, filename: str,
+                   content_type: str = 'application/octet-stream') -> str:
+        """Upload generated content to S3 and return its key; always private, whatever S3_USE_PUBLIC_URLS says"""
+        s3_key = f"{folder}/{filename}"
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            Body=data,
+            ContentType=content_type,
+            ACL='private'
+        )
+        return s3_key
+    
+    def delete_bytes(self, file_path: str) -> bool:
+        """Delete generated content from S3"""
+        return self.delete_file(file_path)
+    
+    def get_private_url(self, file_path: str) -> str:
+        """Signed URL for generated content (expires in 1 hour)"""
+        if not file_path:
+            return ''
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': file_path},
+            ExpiresIn=3600
+        )
+    
     def get_file_url(self, file_path: str) -> str:
         """Get public URL for S3 file"""
         if not file_path:
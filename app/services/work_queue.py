@@ -0,0 +1,141 @@
+"""
+Background work queue for request side effects.
+
+Handlers commit their own rows, submit follow-up work (pushes, offers,
+notifications) by stage name and return. A fixed pool of workers drains a
+bounded queue, runs each task inside an app context with retries, and keeps
+per-stage counters and timings. When the queue is full the task runs in the
+caller's thread, so work is slowed down rather than dropped.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict
+
+
+class WorkQueue:
+    """Bounded task queue drained by a pool of background workers"""
+
+    def __init__(self):
+        self._queue = None
+        self._app = None
+        self._started = False
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, dict] = defaultdict(self._empty_stats)
+        self.max_retries = 2
+        self.retry_delay = 0.5
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'submitted': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'inline': 0,
+            'wait_ms_total': 0.0, 'wait_ms_max': 0.0,
+            'run_ms_total': 0.0, 'run_ms_max': 0.0,
+        }
+
+    def init_app(self, app):
+        """Size the queue and pool from config and start the workers"""
+        self._app = app
+        self.max_retries = app.config.get('WORK_QUEUE_MAX_RETRIES', 2)
+        self.retry_delay = app.config.get('WORK_QUEUE_RETRY_DELAY_SECONDS', 0.5)
+        if app.config.get('WORK_QUEUE_EAGER', False) or self._started:
+            return
+        self._started = True
+        self._queue = queue.Queue(maxsize=app.config.get('WORK_QUEUE_MAX_SIZE', 1000))
+        from app import socketio
+        for _ in range(app.config.get('WORK_QUEUE_WORKERS', 4)):
+            socketio.start_background_task(self._worker)
+
+    def submit(self, stage: str, func: Callable, *args, **kwargs) -> bool:
+        """
+        Queue func(*args, **kwargs) under a stage name
+
+        Pass ids rather than ORM objects; the task runs in its own session.
+
+        Returns:
+            bool: True if queued, False if it ran inline (eager mode or queue full)
+        """
+        task = (stage, func, args, kwargs, time.perf_counter())
+        with self._stats_lock:
+            self._stats[stage]['submitted'] += 1
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(task)
+                return True
+            except queue.Full:
+                pass
+        with self._stats_lock:
+            self._stats[stage]['inline'] += 1
+        self._execute(task)
+        return False
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics(self) -> dict:
+        """Per-stage counters plus average and max queue wait / run time in ms"""
+        with self._stats_lock:
+            stages = {}
+            for stage, s in self._stats.items():
+                done = s['succeeded'] + s['failed']
+                stages[stage] = {
+                    'submitted': s['submitted'],
+                    'succeeded': s['succeeded'],
+                    'failed': s['failed'],
+                    'retries': s['retries'],
+                    'inline': s['inline'],
+                    'avg_wait_ms': round(s['wait_ms_total'] / done, 2) if done else 0.0,
+                    'max_wait_ms': round(s['wait_ms_max'], 2),
+                    'avg_run_ms': round(s['run_ms_total'] / done, 2) if done else 0.0,
+                    'max_run_ms': round(s['run_ms_max'], 2),
+                }
+        return {
+            'queue_depth': self.depth(),
+            'queue_capacity': self._queue.maxsize if self._queue is not None else 0,
+            'stages': stages,
+        }
+
+    def _execute(self, task):
+        """Run one task with retries and record its timings"""
+        from app.models import db
+        stage, func, args, kwargs, submitted_at = task
+        started = time.perf_counter()
+        wait_ms = (started - submitted_at) * 1000
+        ok = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._app.app_context():
+                    try:
+                        func(*args, **kwargs)
+                    finally:
+                        db.session.remove()
+                ok = True
+                break
+            except Exception as e:
+                self._app.logger.error(f"Work queue task '{stage}' failed (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries:
+                    with self._stats_lock:
+                        self._stats[stage]['retries'] += 1
+                    time.sleep(self.retry_delay * (2 ** attempt))
+        run_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            s = self._stats[stage]
+            s['succeeded' if ok else 'failed'] += 1
+            s['wait_ms_total'] += wait_ms
+            s['wait_ms_max'] = max(s['wait_ms_max'], wait_ms)
+            s['run_ms_total'] += run_ms
+            s['run_ms_max'] = max(s['run_ms_max'], run_ms)
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                self._execute(task)
+            finally:
+                self._queue.task_done()
+
+
+# Process-wide queue used by request handlers
+work_queue = WorkQueue()
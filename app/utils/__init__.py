@@ -14,6 +14,15 @@ def to_eat(utc_dt):
         return None
     return utc_dt.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=3)))
 
+def eat_date(column, dialect_name):
+    """SQL expression for the EAT calendar day of a naive UTC datetime column."""
+    from sqlalchemy import func, cast, text, Date
+    if dialect_name == 'sqlite':
+        return func.date(column, '+3 hours', type_=Date)
+    if dialect_name in ('mysql', 'mariadb'):
+        return func.date(func.date_add(column, text('INTERVAL 3 HOUR')), type_=Date)
+    return cast(column + timedelta(hours=3), Date)
+
 def handle_file_upload(file_storage, existing_path=None):
     """Handle file upload with security checks"""
     if not file_storage or not file_storage.filename:
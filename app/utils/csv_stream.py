@@ -0,0 +1,60 @@
+"""
+Streamed CSV responses.
+
+The header goes out as soon as the response starts; rows are pulled from a
+lazy iterable (typically a Query with yield_per) inside the response
+generator and flushed every few hundred rows, so memory stays flat
+whatever the table size.
+"""
+
+import csv
+import io
+from typing import Callable, Iterable, Optional, Sequence
+
+from flask import Response, current_app, stream_with_context
+
+# Rows fetched per database round trip and written per response chunk
+YIELD_PER = 1000
+CHUNK_ROWS = 500
+
+
+def csv_response(header: Sequence[str], rows: Iterable, filename: str,
+                 row_func: Optional[Callable] = None, chunk_rows: int = CHUNK_ROWS) -> Response:
+    """
+    Stream rows as a CSV attachment
+
+    Args:
+        header: Column titles, written first
+        rows: Lazy iterable of rows; only iterated once the response streams
+        filename: Download file name
+        row_func: Optional mapping from a row to the list of CSV values
+        chunk_rows: Rows buffered per yielded chunk
+    """
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+        written = 0
+        try:
+            for row in rows:
+                writer.writerow(row_func(row) if row_func else row)
+                written += 1
+                if written % chunk_rows == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+        except Exception as e:
+            # Headers are already sent; a truncated file is all we can signal
+            current_app.logger.error(f"CSV export {filename} failed after {written} rows: {e}")
+            raise
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    # Let reverse proxies pass chunks through instead of buffering the file
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,68 @@
+"""
+Great-circle distance helpers shared by dispatch, fare and analytics code.
+
+Scalar calls use plain math; the batch functions take NumPy arrays so that
+thousands of driver distances are computed in one vectorized call instead
+of one interpreted loop iteration per driver.
+"""
+
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance in km between two points"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def haversine_many(lat, lon, lats, lons):
+    """
+    Distances in km from one origin to many points
+
+    Args:
+        lat, lon: origin coordinates in degrees
+        lats, lons: sequences or arrays of point coordinates in degrees
+
+    Returns:
+        np.ndarray: distances, same length as lats/lons
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    lat0 = math.radians(lat)
+    lon0 = math.radians(lon)
+    a = np.sin((lats - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(lats1, lons1, lats2, lons2):
+    """
+    Pairwise distances in km between two point sets
+
+    Returns:
+        np.ndarray: shape (len(lats1), len(lats2)); row i holds the distances
+        from point i of the first set to every point of the second set
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lon1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lon2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Lat/lon box that fully contains the circle of radius_km around a point
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lon, max_lon) in degrees
+    """
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
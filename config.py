@@ -37,6 +37,72 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@rideapp.com'
     
+    # Driver location index (grid cell edge in km)
+    DRIVER_INDEX_CELL_KM = float(os.environ.get('DRIVER_INDEX_CELL_KM') or 1.0)
+    # Locations older than this are ignored by nearby search
+    DRIVER_LOCATION_MAX_AGE_SECONDS = int(os.environ.get('DRIVER_LOCATION_MAX_AGE_SECONDS') or 300)
+    
+    # Driver GPS write-behind buffer
+    LOCATION_WRITE_BEHIND = True
+    LOCATION_FLUSH_INTERVAL_SECONDS = float(os.environ.get('LOCATION_FLUSH_INTERVAL_SECONDS') or 2.0)
+    LOCATION_MAX_STALENESS_SECONDS = float(os.environ.get('LOCATION_MAX_STALENESS_SECONDS') or 10.0)
+    # Driver location history (trail replay / audits)
+    LOCATION_HISTORY_ENABLED = os.environ.get('LOCATION_HISTORY_ENABLED', 'true').lower() in ['true', 'on', '1']
+    LOCATION_HISTORY_RETENTION_DAYS = int(os.environ.get('LOCATION_HISTORY_RETENTION_DAYS') or 30)
+    # Lifetime of the signed token a driver's socket presents to driver_join
+    DRIVER_SOCKET_TOKEN_MAX_AGE_SECONDS = int(os.environ.get('DRIVER_SOCKET_TOKEN_MAX_AGE_SECONDS') or 7 * 86400)
+    # Dispatcher live map delta feed (0 disables)
+    LOCATION_FEED_INTERVAL_SECONDS = float(os.environ.get('LOCATION_FEED_INTERVAL_SECONDS') or 2.0)
+    
+    # Ride offer waves: each wave multiplies radius and driver limit by the growth factors
+    OFFER_TTL_SECONDS = int(os.environ.get('OFFER_TTL_SECONDS') or 25)
+    OFFER_RADIUS_KM = float(os.environ.get('OFFER_RADIUS_KM') or 5.0)
+    OFFER_LIMIT = int(os.environ.get('OFFER_LIMIT') or 5)
+    OFFER_RADIUS_GROWTH = float(os.environ.get('OFFER_RADIUS_GROWTH') or 2.0)
+    OFFER_LIMIT_GROWTH = float(os.environ.get('OFFER_LIMIT_GROWTH') or 2.0)
+    OFFER_MAX_WAVES = int(os.environ.get('OFFER_MAX_WAVES') or 3)
+    
+    # Background work queue for request side effects (push, offers, notifications)
+    WORK_QUEUE_WORKERS = int(os.environ.get('WORK_QUEUE_WORKERS') or 4)
+    WORK_QUEUE_MAX_SIZE = int(os.environ.get('WORK_QUEUE_MAX_SIZE') or 1000)
+    WORK_QUEUE_MAX_RETRIES = int(os.environ.get('WORK_QUEUE_MAX_RETRIES') or 2)
+    WORK_QUEUE_RETRY_DELAY_SECONDS = float(os.environ.get('WORK_QUEUE_RETRY_DELAY_SECONDS') or 0.5)
+    WORK_QUEUE_EAGER = False
+    
+    # Push notifications: 'log' (placeholder), 'fake' (tests) or 'fcm'
+    PUSH_TRANSPORT = os.environ.get('PUSH_TRANSPORT') or 'log'
+    FCM_CREDENTIALS_PATH = os.environ.get('FCM_CREDENTIALS_PATH')
+    PUSH_TOKEN_CACHE_TTL_SECONDS = int(os.environ.get('PUSH_TOKEN_CACHE_TTL_SECONDS') or 300)
+    
+    # Route distance cache for fare estimates (set ROUTE_CACHE_DB_PATH to persist across restarts)
+    ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE') or 10000)
+    ROUTE_CACHE_TTL_SECONDS = int(os.environ.get('ROUTE_CACHE_TTL_SECONDS') or 86400)
+    ROUTE_CACHE_GRID_METERS = float(os.environ.get('ROUTE_CACHE_GRID_METERS') or 50.0)
+    ROUTE_CACHE_DB_PATH = os.environ.get('ROUTE_CACHE_DB_PATH')
+    
+    # Routing: 'osrm', 'local' (straight line, no network) or 'offline' (detour-factor model)
+    ROUTING_PROVIDER = os.environ.get('ROUTING_PROVIDER') or 'osrm'
+    ROUTING_OSRM_URL = os.environ.get('ROUTING_OSRM_URL') or 'http://router.project-osrm.org'
+    ROUTING_TIMEOUT_SECONDS = float(os.environ.get('ROUTING_TIMEOUT_SECONDS') or 3.0)
+    ROUTING_BREAKER_FAILURES = int(os.environ.get('ROUTING_BREAKER_FAILURES') or 3)
+    ROUTING_BREAKER_RESET_SECONDS = float(os.environ.get('ROUTING_BREAKER_RESET_SECONDS') or 30.0)
+    # Offline model: road distance ~= straight line x factor; areas as JSON
+    # [{"name": ..., "bbox": [min_lat, max_lat, min_lon, max_lon], "factor": ...}]
+    ROUTING_DEFAULT_DETOUR_FACTOR = float(os.environ.get('ROUTING_DEFAULT_DETOUR_FACTOR') or 1.3)
+    ROUTING_DETOUR_AREAS = os.environ.get('ROUTING_DETOUR_AREAS') or [
+        {'name': 'Addis Ababa', 'bbox': [8.83, 9.10, 38.65, 38.92], 'factor': 1.35},
+    ]
+    
+    # Settings/commission cache; other workers are told to reload via Redis pub/sub when configured
+    SETTINGS_CACHE_TTL_SECONDS = int(os.environ.get('SETTINGS_CACHE_TTL_SECONDS') or 60)
+    SETTINGS_PUBSUB_URL = os.environ.get('SETTINGS_PUBSUB_URL') or os.environ.get('REDIS_URL')
+    
+    # Analytics read the ride_daily_rollup table (filled by its migration; rebuild with scripts/rebuild_ride_rollup.py)
+    ANALYTICS_USE_ROLLUP = os.environ.get('ANALYTICS_USE_ROLLUP', 'true').lower() in ['true', 'on', '1']
+    
+    # Finished PDF/Excel reports are reused for identical requests this long
+    REPORT_CACHE_TTL_SECONDS = int(os.environ.get('REPORT_CACHE_TTL_SECONDS') or 3600)
+    
     @staticmethod
     def allowed_file(filename):
         """Check if file extension is allowed"""
@@ -58,6 +124,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    LOCATION_WRITE_BEHIND = False  # Write pings through so tests see them in the DB
+    WORK_QUEUE_EAGER = True  # Run queued side effects inline
+    PUSH_TRANSPORT = 'fake'
+    ROUTING_PROVIDER = 'local'
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,24 @@
+"""Add composite lat/lon index to driver_location
+
+Revision ID: 3c1d9a7e5b20
+Revises: 8f7a2b3c4d5e
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d9a7e5b20'
+down_revision = '8f7a2b3c4d5e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_driver_location_lat_lon', 'driver_location', ['lat', 'lon'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_driver_location_lat_lon', table_name='driver_location')
@@ -0,0 +1,37 @@
+"""Add driver_location_history table
+
+Revision ID: 5e8b2d41c7a9
+Revises: 3c1d9a7e5b20
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2d41c7a9'
+down_revision = '3c1d9a7e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('driver_location_history',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False),
+        sa.Column('lat_e6', sa.Integer(), nullable=False),
+        sa.Column('lon_e6', sa.Integer(), nullable=False),
+        sa.Column('heading', sa.SmallInteger(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_driver_location_history_day', 'driver_location_history', ['day'], unique=False)
+    op.create_index('ix_driver_location_history_driver_time', 'driver_location_history', ['driver_id', 'recorded_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_driver_location_history_driver_time', table_name='driver_location_history')
+    op.drop_index('ix_driver_location_history_day', table_name='driver_location_history')
+    op.drop_table('driver_location_history')
@@ -0,0 +1,45 @@
+"""Add report_job table
+
+Revision ID: a9d3c6e1f058
+Revises: f2c8b5a7d913
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3c6e1f058'
+down_revision = 'f2c8b5a7d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('params_hash', sa.String(length=64), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=False),
+        sa.Column('end_date', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('file_path', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('requested_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by'], ['admin.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_report_job_params_hash', 'report_job', ['params_hash'], unique=False)
+    op.create_index('ix_report_job_status', 'report_job', ['status'], unique=False)
+    op.create_index('ix_report_job_created_at', 'report_job', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_report_job_created_at', table_name='report_job')
+    op.drop_index('ix_report_job_status', table_name='report_job')
+    op.drop_index('ix_report_job_params_hash', table_name='report_job')
+    op.drop_table('report_job')
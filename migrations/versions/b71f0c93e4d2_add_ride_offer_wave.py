@@ -0,0 +1,26 @@
+"""Add wave to ride_offer
+
+Revision ID: b71f0c93e4d2
+Revises: 5e8b2d41c7a9
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71f0c93e4d2'
+down_revision = '5e8b2d41c7a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ride_offer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('wave', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('ride_offer', schema=None) as batch_op:
+        batch_op.drop_column('wave')
@@ -0,0 +1,34 @@
+"""Add composite ride indexes for keyset pagination and a lower(name) driver index
+
+Revision ID: c3e7a1d95b26
+Revises: a9d3c6e1f058
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1d95b26'
+down_revision = 'a9d3c6e1f058'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_ride_request_time_id', 'ride', ['request_time', 'id'], unique=False)
+    op.create_index('ix_ride_status_request_time_id', 'ride', ['status', 'request_time', 'id'], unique=False)
+    op.create_index('ix_ride_vehicle_type_request_time_id', 'ride', ['vehicle_type', 'request_time', 'id'], unique=False)
+    op.create_index('ix_ride_driver_request_time_id', 'ride', ['driver_id', 'request_time', 'id'], unique=False)
+    op.create_index('ix_ride_passenger_request_time_id', 'ride', ['passenger_id', 'request_time', 'id'], unique=False)
+    op.create_index('ix_driver_name_lower', 'driver', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_driver_name_lower', table_name='driver')
+    op.drop_index('ix_ride_passenger_request_time_id', table_name='ride')
+    op.drop_index('ix_ride_driver_request_time_id', table_name='ride')
+    op.drop_index('ix_ride_vehicle_type_request_time_id', table_name='ride')
+    op.drop_index('ix_ride_status_request_time_id', table_name='ride')
+    op.drop_index('ix_ride_request_time_id', table_name='ride')
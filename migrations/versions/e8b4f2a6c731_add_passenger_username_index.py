@@ -0,0 +1,24 @@
+"""Add lower(username) passenger index for directory search
+
+Revision ID: e8b4f2a6c731
+Revises: c3e7a1d95b26
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4f2a6c731'
+down_revision = 'c3e7a1d95b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_passenger_username_lower', 'passenger', [sa.text('lower(username)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_passenger_username_lower', table_name='passenger')
@@ -0,0 +1,59 @@
+"""Add driver_stats table
+
+Revision ID: f2c8b5a7d913
+Revises: d4a6e2f81b37
+Create Date: 2026-10-17 13:00:00.000000
+
+The table is filled from existing rides with the same GROUP BY as
+driver_stats.rebuild().
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8b5a7d913'
+down_revision = 'd4a6e2f81b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('driver_stats',
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('completed_rides', sa.Integer(), nullable=False),
+        sa.Column('lifetime_fare', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False),
+        sa.Column('rating_sum', sa.Integer(), nullable=False),
+        sa.Column('last_ride_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['driver_id'], ['driver.id'], ),
+        sa.PrimaryKeyConstraint('driver_id')
+    )
+
+    # Backfill, so the driver list and details show real totals straight after the upgrade
+    ride = sa.table('ride',
+        sa.column('driver_id', sa.Integer()),
+        sa.column('status', sa.String()),
+        sa.column('fare', sa.Numeric()),
+        sa.column('rating', sa.Integer()),
+        sa.column('request_time', sa.DateTime()),
+    )
+    stats = sa.table('driver_stats',
+        *[sa.column(name) for name in ('driver_id', 'completed_rides', 'lifetime_fare',
+                                       'rating_count', 'rating_sum', 'last_ride_at')]
+    )
+    is_completed = ride.c.status == 'Completed'
+    source = sa.select(
+        ride.c.driver_id,
+        sa.func.count(sa.case((is_completed, 1))),
+        sa.func.coalesce(sa.func.sum(sa.case((is_completed, ride.c.fare))), 0),
+        sa.func.count(ride.c.rating),
+        sa.func.coalesce(sa.func.sum(ride.c.rating), 0),
+        sa.func.max(ride.c.request_time),
+    ).where(ride.c.driver_id.isnot(None)).group_by(ride.c.driver_id)
+    op.execute(stats.insert().from_select(list(stats.c.keys()), source))
+
+
+def downgrade():
+    op.drop_table('driver_stats')
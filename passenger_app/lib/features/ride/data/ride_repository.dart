@@ -25,6 +25,37 @@ class RideRepository {
     return FareEstimate.fromJson(response.data);
   }
 
+  /// Prices every vehicle type for one destination in a single request.
+  Future<List<FareEstimate>> estimateFares({
+    required LatLng pickup,
+    required LatLng destination,
+    List<String> vehicleTypes = const ['Bajaj', 'Car'],
+  }) async {
+    final response = await _apiClient.post(
+      '/api/passenger/fare-estimates',
+      data: {
+        'pickup_lat': pickup.latitude,
+        'pickup_lon': pickup.longitude,
+        'destinations': [
+          {'lat': destination.latitude, 'lon': destination.longitude},
+        ],
+        'vehicle_types': vehicleTypes,
+      },
+    );
+    final estimate = (response.data['estimates'] as List).first as Map<String, dynamic>;
+    if (estimate['error'] != null) {
+      throw Exception(estimate['error']);
+    }
+    final fares = estimate['fares'] as Map<String, dynamic>;
+    return fares.entries
+        .map((e) => FareEstimate(
+              distanceKm: (estimate['distance_km'] as num).toDouble(),
+              estimatedFare: (e.value as num).toDouble(),
+              vehicleType: e.key,
+            ))
+        .toList();
+  }
+
   Future<Map<String, dynamic>> requestRide({
     required String pickupAddress,
     required double pickupLat,
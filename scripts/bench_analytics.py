@@ -0,0 +1,159 @@
+"""
+Benchmark: analytics aggregation on a large ride table
+Seeds a fixture of rides spread over the last 400 days (1M by default) and
+times the analytics computation for each period, from the ride table and
+from the daily rollup, reporting wall time and peak Python memory. With
+--baseline it also measures loading the period's rows as ORM objects,
+which is what the endpoint used to do.
+
+Usage:
+    python scripts/bench_analytics.py [--rides 1000000] [--baseline]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file. Run against a
+scratch database only - it inserts its own passenger, drivers and rides. An
+existing fixture with at least --rides rides is reused.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_URL'):
+    _db_file = os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{_db_file}'
+
+PERIODS = ['today', 'week', 'month', 'year']
+STATUSES = ['Completed'] * 7 + ['Canceled', 'Requested', 'Assigned', 'On Trip']
+CHUNK = 10000
+
+
+def seed(db, n_rides, n_drivers=200):
+    """Bulk-insert rides with Core inserts, then feedback on every fifth ride"""
+    from sqlalchemy import select, literal
+    from app.models import Passenger, Driver, Ride, Feedback
+    tag = str(int(time.time() * 1000))
+    passenger = Passenger(username='bench', email=f'bench-{tag}@example.com',
+                          phone_number=f'09{tag[-8:]}', password_hash='x')
+    drivers = [
+        Driver(name=f'Bench Driver {i}', phone_number=f'07{tag[-4:]}{i:04d}',
+               vehicle_details='Bench', status='Available')
+        for i in range(n_drivers)
+    ]
+    db.session.add(passenger)
+    db.session.add_all(drivers)
+    db.session.commit()
+    driver_ids = [d.id for d in drivers]
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    inserted = 0
+    while inserted < n_rides:
+        batch = []
+        for _ in range(min(CHUNK, n_rides - inserted)):
+            status = rng.choice(STATUSES)
+            batch.append({
+                'passenger_id': passenger.id,
+                'driver_id': None if status == 'Requested' else rng.choice(driver_ids),
+                'pickup_lat': 9.0192, 'pickup_lon': 38.7525,
+                'dest_address': 'Benchmark',
+                'distance_km': 5,
+                'fare': round(rng.uniform(40, 400), 2),
+                'vehicle_type': rng.choice(['Bajaj', 'Car']),
+                'payment_method': rng.choice(['Cash', 'Cash', 'Telebirr', 'CBE Birr']),
+                'status': status,
+                'rating': rng.randint(1, 5) if status == 'Completed' and rng.random() < 0.2 else None,
+                'request_time': now - timedelta(seconds=rng.randint(0, 400 * 86400)),
+            })
+        db.session.execute(Ride.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{n_rides} rides", end='\r', flush=True)
+    print()
+
+    ride = Ride.__table__
+    db.session.execute(Feedback.__table__.insert().from_select(
+        ['ride_id', 'rating', 'feedback_type'],
+        select(ride.c.id, (ride.c.id % 5) + 1, literal('Rating')).where(
+            ride.c.status == 'Completed', ride.c.id % 5 == 0
+        )
+    ))
+    db.session.commit()
+
+
+def measure(func):
+    """Run func once; returns (result, seconds, peak MiB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rides', type=int, default=1000000)
+    parser.add_argument('--baseline', action='store_true',
+                        help='also time loading every ride of the period as ORM objects')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db, Ride
+    from app.api.data import _compute_analytics, _analytics_window
+    from app.services import ride_rollup
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print(f"BENCH: analytics over {args.rides} rides")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(db.func.count(Ride.id)).scalar()
+        if existing < args.rides:
+            started = time.perf_counter()
+            seed(db, args.rides - existing)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+            # Core inserts bypass the session events that maintain the rollup
+            started = time.perf_counter()
+            written = ride_rollup.rebuild()
+            print(f"Rollup rebuilt in {time.perf_counter() - started:.1f}s ({written} rows)\n")
+
+        failed = False
+        for period in PERIODS:
+            for source, use_rollup in (('rides', False), ('rollup', True)):
+                app.config['ANALYTICS_USE_ROLLUP'] = use_rollup
+                db.session.expire_all()
+                result, elapsed, peak = measure(lambda: _compute_analytics(period))
+                kpis = result['kpis']
+                print(f"{period:>6} {source:>6}: {elapsed * 1000:8.1f} ms  peak {peak:6.2f} MiB  "
+                      f"rides {kpis['total_rides']:>8}  revenue {kpis['total_revenue']:>14,.2f}")
+                if len(result['charts']['revenue_over_time']['labels']) > 7:
+                    failed = True
+
+            if args.baseline:
+                start_date = _analytics_window(period)[0]
+                rows, elapsed, peak = measure(
+                    lambda: Ride.query.filter(Ride.request_time >= start_date).all()
+                )
+                print(f"{period:>6} {'orm':>6}: baseline row load {elapsed * 1000:8.1f} ms  peak {peak:6.2f} MiB  "
+                      f"({len(rows)} ORM objects)")
+                del rows
+                db.session.expunge_all()
+
+    print("=" * 60)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark: concurrent ride assignment throughput
+Many drivers race for a pool of open rides through assigner.assign_ride and
+the script reports assignments per second, attempt latency and whether any
+ride or driver was double-booked.
+
+Usage:
+    python scripts/bench_assign_ride.py [--rides 500] [--drivers 100]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file. Run against a
+scratch database only - it creates its own passenger, drivers and rides.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_URL'):
+    _db_file = os.path.join(tempfile.mkdtemp(), 'bench_assign.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{_db_file}'
+
+
+def seed(db, n_rides, n_drivers):
+    """Create the ride pool and driver fleet; returns (ride_ids, driver_ids)"""
+    from app.models import Passenger, Driver, Ride
+    tag = str(int(time.time() * 1000))
+    passenger = Passenger(username='bench', email=f'bench-{tag}@example.com',
+                          phone_number=f'09{tag[-8:]}', password_hash='x')
+    db.session.add(passenger)
+    db.session.flush()
+    drivers = [
+        Driver(name=f'Bench Driver {i}', phone_number=f'07{tag[-4:]}{i:04d}',
+               vehicle_details='Bench', status='Available')
+        for i in range(n_drivers)
+    ]
+    rides = [
+        Ride(passenger_id=passenger.id, pickup_lat=9.0192, pickup_lon=38.7525,
+             dest_address='Benchmark', distance_km=1, fare=50, status='Requested')
+        for _ in range(n_rides)
+    ]
+    db.session.add_all(drivers + rides)
+    db.session.commit()
+    return [r.id for r in rides], [d.id for d in drivers]
+
+
+def release_drivers(db, driver_ids):
+    """Put every driver back online so the next pass can claim rides again"""
+    from app.models import Driver
+    Driver.query.filter(Driver.id.in_(driver_ids)).update({Driver.status: 'Available'}, synchronize_session=False)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rides', type=int, default=500)
+    parser.add_argument('--drivers', type=int, default=100)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db, Ride
+    from app.services.assigner import assign_ride, RIDE_UNAVAILABLE
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        ride_ids, driver_ids = seed(db, args.rides, args.drivers)
+
+    open_rides = set(ride_ids)
+    open_lock = threading.Lock()
+    latencies, wins, errors = [], [], []
+    stats_lock = threading.Lock()
+    barrier = threading.Barrier(len(driver_ids))
+
+    def driver_worker(driver_id):
+        """Keep claiming random open rides; go back online after each win"""
+        from app.models import Driver
+        with app.app_context():
+            barrier.wait()
+            while True:
+                with open_lock:
+                    if not open_rides:
+                        break
+                    ride_id = random.choice(tuple(open_rides))
+                started = time.perf_counter()
+                try:
+                    failure = assign_ride(ride_id, driver_id)
+                except Exception as e:
+                    with stats_lock:
+                        errors.append(str(e))
+                    db.session.remove()
+                    continue
+                elapsed = time.perf_counter() - started
+                with stats_lock:
+                    latencies.append(elapsed)
+                if failure is None:
+                    with stats_lock:
+                        wins.append((ride_id, driver_id))
+                    with open_lock:
+                        open_rides.discard(ride_id)
+                    # Finish the trip instantly so the driver can claim again
+                    Driver.query.filter_by(id=driver_id).update({Driver.status: 'Available'})
+                    db.session.commit()
+                elif failure == RIDE_UNAVAILABLE:
+                    with open_lock:
+                        open_rides.discard(ride_id)
+            db.session.remove()
+
+    print("\n" + "=" * 60)
+    print(f"BENCH: {args.drivers} drivers racing for {args.rides} rides")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    threads = [threading.Thread(target=driver_worker, args=(d,)) for d in driver_ids]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        assigned = Ride.query.filter(Ride.id.in_(ride_ids), Ride.status == 'Assigned').count()
+        release_drivers(db, driver_ids)
+
+    won_rides = [ride_id for ride_id, _ in wins]
+    double_booked = len(won_rides) - len(set(won_rides))
+    ordered = sorted(latencies)
+    print(f"Wall time:          {wall:.2f}s")
+    print(f"Assignments:        {len(wins)} ({len(wins) / wall:.1f}/s)")
+    print(f"Attempts:           {len(latencies)} ({len(latencies) / wall:.1f}/s)")
+    if ordered:
+        print(f"Latency p50 / p95:  {statistics.median(ordered) * 1000:.1f} ms / "
+              f"{ordered[int(len(ordered) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"Errors:             {len(errors)}" + (f" (e.g. {errors[0][:80]})" if errors else ''))
+    print(f"Rides assigned:     {assigned}/{args.rides}")
+    print(f"Double-booked:      {double_booked}")
+    print("=" * 60)
+    return 0 if double_booked == 0 and assigned == len(wins) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Benchmark: passenger directory page latency
+Seeds a large passenger table (500k by default) with rides spread over a
+tenth of them, then times /api/passengers for the first page, a deep page
+and uid, phone and name searches. Reports the median and worst of several
+runs per case and fails if a median is over --budget-ms, or if the
+no-match search plans a full scan of passenger instead of an index seek.
+
+Usage:
+    python scripts/bench_passenger_directory.py [--passengers 500000] [--rides 1000000] [--budget-ms 100]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file. Run against a
+scratch database only - it inserts its own passengers and rides. An
+existing fixture with at least --passengers passengers is reused.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_URL'):
+    _db_file = os.path.join(tempfile.mkdtemp(), 'bench_passengers.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{_db_file}'
+
+NAMES = ['Abebe', 'Almaz', 'Bekele', 'Chaltu', 'Dawit', 'Eleni', 'Fikru', 'Genet', 'Hana', 'Kebede']
+CHUNK = 10000
+RUNS = 20
+
+
+def seed(db, n_passengers, n_rides):
+    """Bulk-insert passengers with PAX uids, then rides for every tenth passenger"""
+    from app.models import Passenger, Ride
+    tag = str(int(time.time()))
+    rng = random.Random(n_passengers)
+    first_id = (db.session.query(db.func.max(Passenger.id)).scalar() or 0) + 1
+    inserted = 0
+    while inserted < n_passengers:
+        batch = []
+        for i in range(inserted, min(inserted + CHUNK, n_passengers)):
+            passenger_id = first_id + i
+            batch.append({
+                'id': passenger_id,
+                'passenger_uid': f'PAX-{passenger_id:05d}',
+                'username': f'{rng.choice(NAMES)} {i}',
+                'email': f'bench-{tag}-{i}@example.com',
+                'phone_number': f'09{tag[-2:]}{i:07d}',
+                'password_hash': 'x',
+            })
+        db.session.execute(Passenger.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{n_passengers} passengers", end='\r', flush=True)
+    print()
+
+    now = datetime.utcnow()
+    riders = list(range(first_id, first_id + n_passengers, 10))
+    inserted = 0
+    while inserted < n_rides:
+        batch = []
+        for _ in range(min(CHUNK, n_rides - inserted)):
+            batch.append({
+                'passenger_id': rng.choice(riders),
+                'pickup_lat': 9.0192, 'pickup_lon': 38.7525,
+                'dest_address': 'Benchmark',
+                'distance_km': 5,
+                'fare': 100,
+                'status': 'Completed',
+                'request_time': now - timedelta(seconds=rng.randint(0, 400 * 86400)),
+            })
+        db.session.execute(Ride.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{n_rides} rides", end='\r', flush=True)
+    print()
+
+
+def scans_passenger(db, statement, parameters):
+    """True if the database plans a full scan of passenger for this SELECT"""
+    dialect = db.engine.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as conn:
+        plan = ' '.join(str(col) for row in conn.exec_driver_sql(prefix + statement, parameters) for col in row)
+    if dialect == 'sqlite':
+        return 'SCAN passenger' in plan
+    return 'Seq Scan on passenger' in plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--passengers', type=int, default=500000)
+    parser.add_argument('--rides', type=int, default=1000000)
+    parser.add_argument('--budget-ms', type=float, default=100.0)
+    args = parser.parse_args()
+
+    from sqlalchemy import event
+    from app import create_app
+    from app.models import db, Passenger
+    from app.api.data import get_passengers
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print(f"BENCH: passenger directory over {args.passengers} passengers")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(db.func.count(Passenger.id)).scalar()
+        if existing < args.passengers:
+            started = time.perf_counter()
+            seed(db, args.passengers - existing, args.rides)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s\n")
+        deep_cursor = db.session.query(Passenger.id).order_by(Passenger.id.desc()).offset(100).limit(1).scalar()
+        uid, phone, name = db.session.query(
+            Passenger.passenger_uid, Passenger.phone_number, Passenger.username
+        ).order_by(Passenger.id.desc()).offset(1000).first()
+
+    cases = [
+        ('first page', ''),
+        ('deep page', f'cursor={deep_cursor}'),
+        ('uid prefix', f'search={uid[:-1]}'),
+        ('phone prefix', f'search={phone[:-2]}'),
+        ('name prefix', f"search={name.split()[0]}"),
+        ('no match', 'search=Zzzz'),
+    ]
+
+    # Call the view without the admin_required login check
+    view = get_passengers.__wrapped__
+    failed = False
+
+    # A search that matches nothing must seek an index, not read every passenger
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM passenger' in statement:
+            statements.append((statement, parameters))
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        with app.test_request_context('/api/passengers?search=Zzzz'):
+            view()
+            db.session.remove()
+        event.remove(db.engine, 'before_cursor_execute', capture)
+        if not statements or scans_passenger(db, *statements[0]):
+            failed = True
+            print("no match search scans passenger instead of using an index\n")
+
+    for label, query in cases:
+        timings = []
+        for _ in range(RUNS):
+            with app.test_request_context(f'/api/passengers?{query}'):
+                started = time.perf_counter()
+                response = view()
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.remove()
+        # Errors come back as (response, status)
+        data = (response[0] if isinstance(response, tuple) else response).get_json()
+        median = statistics.median(timings)
+        if median > args.budget_ms or 'error' in data:
+            failed = True
+        print(f"{label:>13}: median {median:7.2f} ms  max {max(timings):7.2f} ms  "
+              f"rows {len(data.get('passengers', [])):>3}")
+
+    print("\n" + "=" * 60)
+    print("FAIL" if failed else f"OK: every median under {args.budget_ms:.0f} ms")
+    print("=" * 60)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Benchmark: Excel report export on large ride ranges
+Seeds one fixture per size (100k and 1M rides by default), each in its own
+30-day window, and times build_excel_report over that window, reporting
+wall time, peak Python memory and file size. With --baseline it also
+builds the same rows into a regular in-memory workbook and sizes every
+column by scanning all of its cells, which is what the export used to do.
+
+Usage:
+    python scripts/bench_report_export.py [--sizes 100000,1000000] [--baseline]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file. Run against a
+scratch database only - it inserts its own passenger, drivers and rides. A
+window that already holds at least its size in rides is reused.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_URL'):
+    _db_file = os.path.join(tempfile.mkdtemp(), 'bench_report_export.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{_db_file}'
+
+STATUSES = ['Completed'] * 7 + ['Canceled', 'Requested', 'Assigned', 'On Trip']
+WINDOW_DAYS = 30
+CHUNK = 10000
+
+
+def window(index):
+    """Disjoint 30-day UTC window for the index-th fixture size"""
+    start = datetime(2020 + index, 1, 1)
+    return start, start + timedelta(days=WINDOW_DAYS) - timedelta(seconds=1)
+
+
+def seed(db, n_rides, start, n_drivers=200):
+    """Bulk-insert n_rides rides inside [start, start + WINDOW_DAYS) with Core inserts"""
+    from app.models import Passenger, Driver, Ride
+    tag = str(int(time.time() * 1000))
+    passenger = Passenger(username='bench', email=f'bench-{tag}@example.com',
+                          phone_number=f'09{tag[-8:]}', password_hash='x')
+    drivers = [
+        Driver(name=f'Bench Driver {i}', phone_number=f'07{tag[-4:]}{i:04d}',
+               vehicle_details='Bench', status='Available')
+        for i in range(n_drivers)
+    ]
+    db.session.add(passenger)
+    db.session.add_all(drivers)
+    db.session.commit()
+    driver_ids = [d.id for d in drivers]
+
+    rng = random.Random(n_rides)
+    inserted = 0
+    while inserted < n_rides:
+        batch = []
+        for _ in range(min(CHUNK, n_rides - inserted)):
+            status = rng.choice(STATUSES)
+            batch.append({
+                'passenger_id': passenger.id,
+                'driver_id': None if status == 'Requested' else rng.choice(driver_ids),
+                'pickup_lat': 9.0192, 'pickup_lon': 38.7525,
+                'pickup_address': 'Bole, Addis Ababa',
+                'dest_address': rng.choice(['Piassa', 'Megenagna', 'CMC Michael', 'Mexico Square, near the station']),
+                'distance_km': 5,
+                'fare': round(rng.uniform(40, 400), 2),
+                'vehicle_type': rng.choice(['Bajaj', 'Car']),
+                'payment_method': 'Cash',
+                'status': status,
+                'rating': rng.randint(1, 5) if status == 'Completed' and rng.random() < 0.2 else None,
+                'request_time': start + timedelta(seconds=rng.randint(0, WINDOW_DAYS * 86400 - 1)),
+            })
+        db.session.execute(Ride.__table__.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{n_rides} rides", end='\r', flush=True)
+    print()
+
+
+def legacy_excel(start_date, end_date):
+    """Regular workbook holding every cell, widths from a scan of every cell"""
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+    from app.models import Ride
+    from app.services.reports import _ride_rows, _excel_ride_row
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['ID', 'Passenger', 'Driver', 'Pickup', 'Destination', 'Fare', 'Status', 'Date', 'Rating'])
+    for ride in _ride_rows(start_date, end_date).order_by(Ride.id).yield_per(1000):
+        ws.append(_excel_ride_row(ride))
+    for column in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in column)
+        ws.column_dimensions[get_column_letter(column[0].column)].width = min(max_length + 2, 50)
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def measure(func):
+    """Run func once; returns (result, seconds, peak MiB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000',
+                        help='comma-separated ride counts, one fixture window each')
+    parser.add_argument('--baseline', action='store_true',
+                        help='also time the in-memory workbook with a full width scan')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    from app import create_app
+    from app.models import db, Ride
+    from app.services.reports import build_excel_report
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print(f"BENCH: Excel report export for {', '.join(str(s) for s in sizes)} rides")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    failed = False
+    with app.app_context():
+        db.create_all()
+        for index, size in enumerate(sizes):
+            start_date, end_date = window(index)
+            existing = db.session.query(db.func.count(Ride.id)).filter(
+                Ride.request_time >= start_date, Ride.request_time <= end_date
+            ).scalar()
+            if existing < size:
+                started = time.perf_counter()
+                seed(db, size - existing, start_date)
+                print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            runs = [('write-only', build_excel_report)]
+            if args.baseline:
+                runs.append(('in-memory', legacy_excel))
+            for label, build in runs:
+                db.session.expunge_all()
+                data, elapsed, peak = measure(lambda: build(start_date, end_date))
+                print(f"{size:>8} rides {label:>10}: {elapsed:8.1f} s  peak {peak:8.2f} MiB  "
+                      f"file {len(data) / (1024 * 1024):7.2f} MiB")
+                if not data.startswith(b'PK'):
+                    failed = True
+                del data
+            print()
+
+    print("=" * 60)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Rebuild the driver_stats table from the ride table
+The migration that creates the table fills it; run this if the stats are
+suspected to have drifted (e.g. rides edited with raw SQL).
+
+Usage:
+    python scripts/rebuild_driver_stats.py
+
+Uses DATABASE_URL / the app configuration.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    from app import create_app
+    from app.services import driver_stats
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print("Rebuilding driver_stats")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            written = driver_stats.rebuild()
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            return 1
+    print(f"Wrote stats for {written} drivers in {time.perf_counter() - started:.1f}s")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Rebuild the ride_daily_rollup table from the ride table
+The migration that creates the table fills it; run this if the rollup is
+suspected to have drifted (e.g. rides edited with raw SQL).
+
+Usage:
+    python scripts/rebuild_ride_rollup.py [--start 2026-01-01] [--end 2026-01-31]
+
+Days are EAT calendar days and both bounds are inclusive; without bounds the
+whole table is rebuilt. Uses DATABASE_URL / the app configuration.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--start', type=date.fromisoformat, help='first day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, help='last day to rebuild (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.services import ride_rollup
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print("Rebuilding ride_daily_rollup "
+          f"({args.start or 'beginning'} .. {args.end or 'today'})")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            written = ride_rollup.rebuild(args.start, args.end)
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            return 1
+    print(f"Wrote {written} rollup rows in {time.perf_counter() - started:.1f}s")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Stress Test: concurrent ride offer acceptance
+Fires N simultaneous accept_offer calls for the same ride and checks that
+exactly one driver wins, for several rounds.
+
+Usage:
+    python scripts/stress_accept_offer.py [--drivers 50] [--rounds 20]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file. Run against a
+scratch database only - it creates its own passenger, drivers and rides.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_URL'):
+    _db_file = os.path.join(tempfile.mkdtemp(), 'stress_accept.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{_db_file}'
+
+
+def seed(db, n_drivers):
+    """Create one passenger and n available drivers; returns (passenger_id, driver_ids)"""
+    from app.models import Passenger, Driver
+    tag = datetime.utcnow().strftime('%H%M%S%f')
+    passenger = Passenger(
+        username='stress',
+        email=f'stress-{tag}@example.com',
+        phone_number=f'09{tag[-8:]}',
+        password_hash='x',
+    )
+    db.session.add(passenger)
+    drivers = [
+        Driver(name=f'Stress Driver {i}', phone_number=f'07{tag[-5:]}{i:03d}',
+               vehicle_details='Stress', status='Available')
+        for i in range(n_drivers)
+    ]
+    db.session.add_all(drivers)
+    db.session.commit()
+    return passenger.id, [d.id for d in drivers]
+
+
+def new_ride(db, passenger_id, driver_ids):
+    """Create a Requested ride with a pending offer for every driver"""
+    from app.models import Ride, RideOffer
+    ride = Ride(
+        passenger_id=passenger_id, pickup_lat=9.0192, pickup_lon=38.7525,
+        dest_address='Stress test', distance_km=1, fare=50, status='Requested',
+    )
+    db.session.add(ride)
+    db.session.flush()
+    expires_at = datetime.utcnow() + timedelta(seconds=60)
+    db.session.add_all([
+        RideOffer(ride_id=ride.id, driver_id=d, status='pending', expires_at=expires_at)
+        for d in driver_ids
+    ])
+    db.session.commit()
+    return ride.id
+
+
+def run_round(app, db, ride_id, driver_ids):
+    """All drivers accept at once; returns (winner ids, error messages)"""
+    from app.services.assigner import accept_offer
+    barrier = threading.Barrier(len(driver_ids))
+    winners, errors = [], []
+    lock = threading.Lock()
+
+    def worker(driver_id):
+        with app.app_context():
+            barrier.wait()
+            try:
+                ok = accept_offer(ride_id, driver_id)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                return
+            finally:
+                db.session.remove()
+            if ok:
+                with lock:
+                    winners.append(driver_id)
+
+    threads = [threading.Thread(target=worker, args=(d,)) for d in driver_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return winners, errors
+
+
+def check_round(db, ride_id, winners):
+    """Verify the database agrees with the single winner"""
+    from app.models import Ride, RideOffer
+    ride = Ride.query.get(ride_id)
+    accepted = RideOffer.query.filter_by(ride_id=ride_id, status='accepted').all()
+    pending = RideOffer.query.filter_by(ride_id=ride_id, status='pending').count()
+    problems = []
+    if len(winners) != 1:
+        problems.append(f'{len(winners)} winners')
+    elif ride.driver_id != winners[0] or ride.status != 'Assigned':
+        problems.append(f'ride row shows driver {ride.driver_id} / {ride.status}')
+    if len(accepted) != 1:
+        problems.append(f'{len(accepted)} accepted offers')
+    if pending:
+        problems.append(f'{pending} offers still pending')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--drivers', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db
+    app = create_app()
+
+    print("\n" + "=" * 60)
+    print(f"STRESS: {args.drivers} concurrent accepts x {args.rounds} rounds")
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print("=" * 60 + "\n")
+
+    failed = 0
+    with app.app_context():
+        db.create_all()
+        passenger_id, driver_ids = seed(db, args.drivers)
+        for n in range(1, args.rounds + 1):
+            ride_id = new_ride(db, passenger_id, driver_ids)
+            winners, errors = run_round(app, db, ride_id, driver_ids)
+            db.session.expire_all()
+            problems = check_round(db, ride_id, winners)
+            status = 'OK ' if not problems else 'FAIL'
+            detail = '; '.join(problems) or f'winner driver {winners[0]}'
+            if errors:
+                detail += f' ({len(errors)} errors, e.g. {errors[0][:80]})'
+            print(f"[{status}] round {n:3d} ride {ride_id}: {detail}")
+            failed += bool(problems)
+
+    print("\n" + "=" * 60)
+    print(f"{args.rounds - failed}/{args.rounds} rounds had exactly one winner")
+    print("=" * 60)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
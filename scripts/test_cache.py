@@ -0,0 +1,55 @@
+"""
+Test the TTL cache and its SQLite backing
+Checks that delete() invalidates a key in memory and in the backing file,
+so the next get() misses instead of reloading the deleted value.
+
+Usage:
+    python scripts/test_cache.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.cache import TTLCache, SQLiteBacking
+
+
+def _backed_cache():
+    path = os.path.join(tempfile.mkdtemp(), 'test_cache.db')
+    return TTLCache(maxsize=10, ttl_seconds=60, backing=SQLiteBacking(path)), path
+
+
+def test_delete_then_get():
+    """A deleted key is gone from memory and from the backing"""
+    cache, _ = _backed_cache()
+    cache.set('route', 1234.5)
+    assert cache.get('route') == 1234.5
+    cache.delete('route')
+    assert cache.get('route') is None
+    assert cache.backing.get(cache._backing_key('route')) is None
+
+
+def test_delete_survives_restart():
+    """A new cache on the same file does not see a deleted key"""
+    cache, path = _backed_cache()
+    cache.set(('a', 1), 'kept')
+    cache.set(('b', 2), 'deleted')
+    cache.delete(('b', 2))
+    restarted = TTLCache(maxsize=10, ttl_seconds=60, backing=SQLiteBacking(path))
+    assert restarted.get(('a', 1)) == 'kept'
+    assert restarted.get(('b', 2)) is None
+
+
+if __name__ == '__main__':
+    failed = 0
+    for test in (test_delete_then_get, test_delete_survives_restart):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError:
+            failed += 1
+            print(f"❌ {test.__name__}")
+    sys.exit(1 if failed else 0)
@@ -21,6 +21,9 @@ document.addEventListener('DOMContentLoaded', () => {
         let currentReportParams = 'period=all';
         let allDrivers = [], allRidesHistory = [], allFeedback = [], allPendingRides = [], allActiveRides = [], allPassengers = [], allPendingDrivers = [], recentNotifications = [];
         let rideHistoryPage = 1, RIDES_PER_PAGE = 10, lastPendingCount = 0;
+        // Keyset paging: cursor that starts each visited ride history page
+        let rideHistoryCursors = [null], rideHistoryNextCursor = null, rideHistorySearchTimer = null;
+        let passengerPage = 1, PASSENGERS_PER_PAGE = 25, passengerCursors = [null], passengerNextCursor = null, passengerSearchTimer = null;
         
         // --- ERROR HANDLING & OFFLINE SUPPORT ---
         let isOnline = navigator.onLine;
@@ -96,6 +99,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('✅ Connected to SocketIO server');
                 socketConnected = true;
                 socket.emit('join_dispatcher_room');
+                // Catch up on driver movements missed while disconnected
+                window.syncDriverLocations?.();
             });
             
             socket.on('disconnect', () => {
@@ -126,6 +131,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log(`Joined room: ${data.room}`);
             });
             
+            socket.on('driver_locations_delta', (data) => {
+                window.applyDriverLocationDelta?.(data);
+            });
+            
         } catch (error) {
             console.error('SocketIO connection failed:', error);
         }
@@ -748,19 +757,31 @@ document.addEventListener('DOMContentLoaded', () => {
         } 
     });
     
-    document.getElementById('export-pdf-btn').addEventListener('click', () => { 
-        console.log('PDF export clicked with params:', currentReportParams);
-        const exportUrl = `${API_BASE_URL}/export-report?format=pdf&${currentReportParams}`;
-        console.log('Export URL:', exportUrl);
-        window.location.href = exportUrl; 
-    });
+    // Reports are built by a background job: submit, poll until done, then download
+    const exportReport = async (format) => {
+        const params = Object.fromEntries(new URLSearchParams(currentReportParams));
+        const job = await postData('export-report', { format, ...params });
+        if (job.error) { showErrorNotification(`Report failed: ${job.error}`); return; }
+        if (job.status !== 'done') showInfoNotification('Generating report, the download will start when it is ready...');
+        let current = job;
+        for (let attempt = 0; attempt < 120 && ['queued', 'running'].includes(current.status); attempt++) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const r = await fetch(`${API_BASE_URL}/report-jobs/${job.job_id}`, { cache: 'no-store', credentials: 'include' });
+            if (!r.ok) { showErrorNotification(`Report status check failed (${r.status})`); return; }
+            current = await r.json();
+        }
+        if (current.status === 'done' && current.download_url) {
+            window.location.href = current.download_url;
+        } else if (current.status === 'failed') {
+            showErrorNotification(`Report failed: ${current.error || 'unknown error'}`);
+        } else {
+            showWarningNotification('Report is still being generated. Try exporting again in a minute.');
+        }
+    };
     
-    document.getElementById('export-excel-btn').addEventListener('click', () => { 
-        console.log('Excel export clicked with params:', currentReportParams);
-        const exportUrl = `${API_BASE_URL}/export-report?format=excel&${currentReportParams}`;
-        console.log('Export URL:', exportUrl);
-        window.location.href = exportUrl; 
-    });
+    document.getElementById('export-pdf-btn').addEventListener('click', () => exportReport('pdf'));
+    
+    document.getElementById('export-excel-btn').addEventListener('click', () => exportReport('excel'));
 
     // Analytics export is now handled by linking to report section
 
@@ -1204,20 +1225,28 @@ document.addEventListener('DOMContentLoaded', () => {
 
       const updateDriversTable = () => { const searchTerm = document.getElementById('driver-search-input').value.toLowerCase(); const statusFilter = document.getElementById('driver-status-filter').value; const filtered = allDrivers.filter(d => (d.name.toLowerCase().includes(searchTerm) || d.phone_number.includes(searchTerm) || (d.driver_uid && d.driver_uid.toLowerCase().includes(searchTerm))) && (statusFilter === 'All' || d.status === statusFilter)); const tbody = document.getElementById('drivers-table-body'); tbody.innerHTML = ''; if (!filtered.length) { tbody.innerHTML = '<tr><td colspan="8" class="text-center p-4">No drivers found.</td></tr>'; return; } filtered.forEach(d => { const row = tbody.insertRow(); const blockedBadge = d.is_blocked ? '<span class="ml-2 px-2 py-1 text-xs bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-200 rounded">BLOCKED</span>' : ''; const blockBtn = d.is_blocked ? `<button class="action-btn text-green-600" onclick="unblockUser(${d.id}, 'driver', '${d.name}')" title="Unblock">🔓</button>` : `<button class="action-btn text-red-600" onclick="blockUser(${d.id}, 'driver', '${d.name}')" title="Block">🔒</button>`; row.innerHTML = `<td class="p-2 font-mono text-xs">${d.driver_uid||'N/A'}</td><td class="flex items-center"><img src="/${d.profile_picture}" class="h-8 w-8 rounded-full mr-3 object-cover" onerror="this.src='/static/img/default_avatar.png'"><span class="cursor-pointer hover:text-blue-600" onclick="showDriverDetails(${d.id})">${d.name}</span>${blockedBadge}</td><td><a href="tel:${d.phone_number}" class="text-blue-500">${d.phone_number}</a></td><td>${d.vehicle_type}</td><td><select class="driver-status-select status-select-${d.status.replace(' ','-')}" data-driver-id="${d.id}">${['Available','On Trip','Offline'].map(s => `<option value="${s}" ${d.status===s?'selected':''}>${s}</option>`).join('')}</select></td><td>${d.avg_rating.toFixed(1)} ★</td><td class="space-x-2"><button class="action-btn view" data-driver-id="${d.id}" title="View Details">👁️</button><button class="action-btn text-blue-600" onclick="openDispatcherMessageModal('driver', ${d.id}, '${d.name.replace(/'/g, "\\'")}')" title="Message">💬</button><button class="action-btn edit" data-driver-id="${d.id}" title="Edit">✏️</button><button class="action-btn delete" data-driver-id="${d.id}" title="Delete">🗑️</button>${blockBtn}</td>`; }); };
       
+      // Passengers are paged and searched on the server (uid, phone or name prefix)
+      const loadPassengers = async () => {
+          const params = new URLSearchParams({ limit: PASSENGERS_PER_PAGE });
+          const cursor = passengerCursors[passengerPage - 1];
+          if (cursor) params.set('cursor', cursor);
+          const search = document.getElementById('passenger-search-input').value.trim();
+          if (search) params.set('search', search);
+          const data = await fetchData('passengers', params.toString(), false);
+          allPassengers = data?.passengers || [];
+          passengerNextCursor = data?.next_cursor || null;
+          updatePassengersTable();
+      };
+      
       const updatePassengersTable = () => {
-          const searchTerm = document.getElementById('passenger-search-input').value.toLowerCase();
-          const filtered = allPassengers.filter(p =>
-              p.username.toLowerCase().includes(searchTerm) ||
-              p.phone_number.includes(searchTerm) ||
-              (p.passenger_uid && p.passenger_uid.toLowerCase().includes(searchTerm))
-          );
+          document.getElementById('passenger-page-info').textContent = `Page ${passengerPage}`;
           const tbody = document.getElementById('passengers-table-body');
           tbody.innerHTML = '';
-          if (!filtered.length) {
+          if (!allPassengers.length) {
               tbody.innerHTML = '<tr><td colspan="6" class="text-center p-4">No passengers found.</td></tr>';
               return;
           }
-          filtered.forEach(p => {
+          allPassengers.forEach(p => {
               const row = tbody.insertRow();
               const blockedBadge = p.is_blocked ? '<span class="ml-2 px-2 py-1 text-xs bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-200 rounded">BLOCKED</span>' : '';
               const blockBtn = p.is_blocked 
@@ -1244,7 +1273,8 @@ document.addEventListener('DOMContentLoaded', () => {
       };
 
       const updateActiveRidesTable = (rides) => { const tbody = document.getElementById('active-rides-table-body'); tbody.innerHTML = ''; if (!rides?.length) { tbody.innerHTML = '<tr><td colspan="5" class="text-center p-4">No active rides</td></tr>'; return; } rides.forEach(r => { const row = tbody.insertRow(); row.innerHTML = `<td class="p-2">${r.user_name}</td><td>${r.driver_name}</td><td class="text-xs max-w-xs truncate">${r.dest_address}</td><td><span class="status-badge status-${r.status.replace(' ','-')}">${r.status}</span></td><td class="space-x-2"><button class="px-3 py-1 bg-green-500 text-white text-xs rounded complete-ride-btn" data-ride-id="${r.id}">Complete</button><button class="px-3 py-1 bg-yellow-500 text-white text-xs rounded reassign-ride-btn" data-ride-id="${r.id}">Re-assign</button></td>`; }); };
-      const updateRideHistoryTable = () => { const tbody = document.getElementById('rides-history-table-body'); tbody.innerHTML = ''; if (!allRidesHistory?.length) { tbody.innerHTML = '<tr><td colspan="8" class="text-center p-4">No ride history.</td></tr>'; return; } const search = document.getElementById('ride-history-search').value.toLowerCase(); const filtered = allRidesHistory.filter(r => r.user_name.toLowerCase().includes(search) || r.driver_name?.toLowerCase().includes(search)); const pageInfo = document.getElementById('ride-history-page-info'); const totalPages = Math.ceil(filtered.length / RIDES_PER_PAGE); rideHistoryPage = Math.min(rideHistoryPage, totalPages) || 1; pageInfo.textContent = `Page ${rideHistoryPage} of ${totalPages}`; const paginated = filtered.slice((rideHistoryPage - 1) * RIDES_PER_PAGE, rideHistoryPage * RIDES_PER_PAGE); paginated.forEach(r => { const row = tbody.insertRow(); row.innerHTML = `<td class="p-2">${r.id}</td><td>${r.user_name}</td><td>${r.driver_name}</td><td>${r.fare} ETB</td><td><span class="status-badge status-${r.status}">${r.status}</span></td><td>${r.rating ? '★'.repeat(r.rating) : 'N/A'}</td><td>${r.request_time}</td><td><button class="action-btn view view-ride-btn" data-ride-id="${r.id}">👁️</button></td>`; }); };
+      const loadRideHistory = async () => { const params = new URLSearchParams({ limit: RIDES_PER_PAGE }); const cursor = rideHistoryCursors[rideHistoryPage - 1]; if (cursor) params.set('cursor', cursor); const search = document.getElementById('ride-history-search').value.trim(); if (search) params.set('search', search); const data = await fetchData('all-rides-data', params.toString()); allRidesHistory = data?.rides || []; rideHistoryNextCursor = data?.next_cursor || null; updateRideHistoryTable(); };
+      const updateRideHistoryTable = () => { const tbody = document.getElementById('rides-history-table-body'); tbody.innerHTML = ''; document.getElementById('ride-history-page-info').textContent = `Page ${rideHistoryPage}`; if (!allRidesHistory?.length) { tbody.innerHTML = '<tr><td colspan="8" class="text-center p-4">No ride history.</td></tr>'; return; } allRidesHistory.forEach(r => { const row = tbody.insertRow(); row.innerHTML = `<td class="p-2">${r.id}</td><td>${r.user_name}</td><td>${r.driver_name}</td><td>${r.fare} ETB</td><td><span class="status-badge status-${r.status}">${r.status}</span></td><td>${r.rating ? '★'.repeat(r.rating) : 'N/A'}</td><td>${r.request_time}</td><td><button class="action-btn view view-ride-btn" data-ride-id="${r.id}">👁️</button></td>`; }); };
       const refreshFeedback = async () => { 
           // Don't show errors for empty feedback - it's expected
           allFeedback = await fetchData('all-feedback', '', false) || []; 
@@ -1268,9 +1298,6 @@ document.addEventListener('DOMContentLoaded', () => {
           const list = document.getElementById('support-tickets-list'); 
           list.innerHTML = ''; 
           
-          // Get ride history for context (don't show errors if empty)
-          const rideHistory = await fetchData('all-rides-data', '', true) || [];
-          
           // Calculate ticket statistics
           const totalTickets = tickets.length;
           const openTickets = tickets.filter(t => t.status === 'Open').length;
@@ -1309,9 +1336,6 @@ document.addEventListener('DOMContentLoaded', () => {
                   'Closed': 'bg-gray-100 text-gray-800'
               };
               
-              // Find ride details for context
-              const rideDetails = ticket.ride_id ? rideHistory.find(r => r.id === ticket.ride_id) : null;
-              
               item.className = `border border-gray-200 dark:border-gray-700 rounded-lg p-4 ${ticket.status === 'Resolved' ? 'opacity-60' : ''}`;
               item.innerHTML = `
                   <div class="flex justify-between items-start mb-2">
@@ -1377,9 +1401,10 @@ document.addEventListener('DOMContentLoaded', () => {
       // View passenger details from support ticket
       window.viewPassengerDetailsFromTicket = async (passengerName) => {
           try {
-              // Find passenger by name in the passengers list
-              const passengers = await fetchData('passengers', '', false) || [];
-              const passenger = passengers.find(p => p.username === passengerName);
+              // Find passenger by name through the directory search
+              const params = new URLSearchParams({ search: passengerName, limit: 200 });
+              const result = await fetchData('passengers', params.toString(), false);
+              const passenger = (result?.passengers || []).find(p => p.username === passengerName);
               
               if (passenger) {
                   const data = await fetchData(`passenger-details/${passenger.id}`, '', false);
@@ -1608,11 +1633,13 @@ document.addEventListener('DOMContentLoaded', () => {
           }
       });
       document.getElementById('driver-search-input').addEventListener('input', updateDriversTable);
-      document.getElementById('passenger-search-input').addEventListener('input', updatePassengersTable);
+      document.getElementById('passenger-search-input').addEventListener('input', () => { clearTimeout(passengerSearchTimer); passengerSearchTimer = setTimeout(() => { passengerPage = 1; passengerCursors = [null]; loadPassengers(); }, 300); });
+      document.getElementById('passenger-prev').addEventListener('click', () => { if (passengerPage > 1) { passengerPage--; loadPassengers(); } });
+      document.getElementById('passenger-next').addEventListener('click', () => { if (passengerNextCursor) { passengerCursors[passengerPage] = passengerNextCursor; passengerPage++; loadPassengers(); } });
       document.getElementById('driver-status-filter').addEventListener('change', updateDriversTable);
-      document.getElementById('ride-history-search').addEventListener('input', () => { rideHistoryPage = 1; updateRideHistoryTable(); });
-      document.getElementById('ride-history-prev').addEventListener('click', () => { if (rideHistoryPage > 1) { rideHistoryPage--; updateRideHistoryTable(); } });
-      document.getElementById('ride-history-next').addEventListener('click', () => { rideHistoryPage++; updateRideHistoryTable(); });
+      document.getElementById('ride-history-search').addEventListener('input', () => { clearTimeout(rideHistorySearchTimer); rideHistorySearchTimer = setTimeout(() => { rideHistoryPage = 1; rideHistoryCursors = [null]; loadRideHistory(); }, 300); });
+      document.getElementById('ride-history-prev').addEventListener('click', () => { if (rideHistoryPage > 1) { rideHistoryPage--; loadRideHistory(); } });
+      document.getElementById('ride-history-next').addEventListener('click', () => { if (rideHistoryNextCursor) { rideHistoryCursors[rideHistoryPage] = rideHistoryNextCursor; rideHistoryPage++; loadRideHistory(); } });
 
       document.getElementById('rides-history-table-body').addEventListener('click', async e => {
           const btn = e.target.closest('.view-ride-btn');
@@ -2471,21 +2498,17 @@ document.addEventListener('DOMContentLoaded', () => {
           }, 1000); // 1 second debounce
       };
       const refreshAllData = async () => { 
-          const [drivers, rides, passengers, pendingDrivers] = await Promise.all([ 
+          const [drivers, pendingDrivers] = await Promise.all([ 
               fetchData('drivers'), 
-              fetchData('all-rides-data'),
-              fetchData('passengers'),
-              fetchData('pending-drivers').catch(() => [])
+              fetchData('pending-drivers').catch(() => []),
+              loadRideHistory(),
+              loadPassengers()
           ]); 
           allDrivers = drivers || []; 
-          allRidesHistory = rides || []; 
-          allPassengers = passengers || [];
           allPendingDrivers = pendingDrivers || [];
           
           // Update tables - they handle empty data internally
           updateDriversTable(); 
-          updatePassengersTable();
-          updateRideHistoryTable();
           updatePendingDriversTable();
           
           // Update pending drivers badge
@@ -3528,6 +3551,10 @@ document.addEventListener('DOMContentLoaded', () => {
       // Driver Map
       let driverMap = null;
       let driverMarkers = [];
+      let driverMarkersById = {};
+      let driverLocationCursor = null;
+      // Drivers the last full load could not place (not in the drivers list), and a reload guard
+      let unplacedDriverIds = new Set(), driverMapReloading = false;
 
       window.refreshDriverMap = async () => {
           if (!driverMap) {
@@ -3540,12 +3567,15 @@ document.addEventListener('DOMContentLoaded', () => {
           // Clear existing markers
           driverMarkers.forEach(m => driverMap.removeLayer(m));
           driverMarkers = [];
+          driverMarkersById = {};
 
           try {
               const drivers = await fetchData('drivers') || [];
               
-              // Get driver locations from DriverLocation model as fallback
-              const driverLocations = await fetchData('driver-locations') || {};
+              // Get driver locations from DriverLocation model as fallback; since=0 also returns the delta cursor
+              const snapshot = await fetchData('driver-locations', 'since=0', false);
+              const driverLocations = snapshot?.drivers || {};
+              driverLocationCursor = snapshot ? snapshot.cursor : null;
               
               // Merge current_lat/lon with DriverLocation data
               const driversWithLocation = drivers.filter(d => {
@@ -3561,6 +3591,9 @@ document.addEventListener('DOMContentLoaded', () => {
                   return d;
               });
 
+              const placedIds = new Set(driversWithLocation.map(d => String(d.id)));
+              unplacedDriverIds = new Set(Object.keys(driverLocations).filter(id => !placedIds.has(id)));
+
               driversWithLocation.forEach(driver => {
                   const color = driver.status === 'Available' ? 'green' : 
                                driver.status === 'On Trip' ? 'blue' : 'gray';
@@ -3587,6 +3620,7 @@ document.addEventListener('DOMContentLoaded', () => {
                       `);
                   
                   driverMarkers.push(marker);
+                  driverMarkersById[driver.id] = marker;
               });
 
               // Fit map to show all drivers
@@ -3599,6 +3633,46 @@ document.addEventListener('DOMContentLoaded', () => {
           }
       };
 
+      // Move markers from a driver_locations_delta message or a since= response
+      window.applyDriverLocationDelta = (delta) => {
+          if (!driverMap || !delta) return;
+          if (driverLocationCursor !== null && delta.cursor <= driverLocationCursor) return;
+          // A driver who came online after the map loaded has no marker yet; the
+          // delta has no name or status, so reload to get the full driver record
+          const unknownIds = Object.keys(delta.drivers || {}).filter(id => !driverMarkersById[id] && !unplacedDriverIds.has(id));
+          if (unknownIds.length) {
+              if (!driverMapReloading) {
+                  driverMapReloading = true;
+                  window.refreshDriverMap().finally(() => { driverMapReloading = false; });
+              }
+              return;
+          }
+          Object.entries(delta.drivers || {}).forEach(([driverId, loc]) => {
+              driverMarkersById[driverId]?.setLatLng([loc.lat, loc.lon]);
+          });
+          (delta.removed || []).forEach(driverId => {
+              const marker = driverMarkersById[driverId];
+              if (marker) {
+                  driverMap.removeLayer(marker);
+                  driverMarkers = driverMarkers.filter(m => m !== marker);
+                  delete driverMarkersById[driverId];
+              }
+          });
+          driverLocationCursor = delta.cursor;
+      };
+
+      window.syncDriverLocations = async () => {
+          if (!driverMap || driverLocationCursor === null) return;
+          const delta = await fetchData('driver-locations', `since=${driverLocationCursor}`, false);
+          if (!delta) return;
+          if (delta.full) {
+              // Server no longer knows our cursor (e.g. restart) - reload everything
+              window.refreshDriverMap();
+              return;
+          }
+          window.applyDriverLocationDelta(delta);
+      };
+
       // Initialize map when driver-map pane is shown
       document.querySelector('[data-pane="driver-map"]')?.addEventListener('click', () => {
           setTimeout(() => {